@@ -0,0 +1,339 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import aiohttp
+from aiohttp import ClientSession, TCPConnector
+
+from codec import JsonCodec, default_codec
+
+
+@dataclass
+class BackendResponse:
+    """Ответ backend API, полностью прочитанный из соединения"""
+    status: int
+    body: bytes
+    codec: JsonCodec = field(default=default_codec, repr=False, compare=False)
+
+    def json(self) -> Any:
+        """Разбор тела ответа как JSON (пустое тело -> None)"""
+        if not self.body:
+            return None
+        return self.codec.loads(self.body)
+
+
+# Методы без побочных эффектов, одинаковые параллельные запросы которых объединяются
+COALESCED_METHODS = frozenset({"GET", "HEAD"})
+# Идемпотентные методы, которые можно безопасно повторять
+RETRIED_METHODS = frozenset({"GET", "DELETE"})
+# Коды ответа, при которых повтор запроса имеет смысл (прокси или backend временно недоступны)
+RETRIED_STATUSES = frozenset({502, 503, 504})
+
+
+class BackendUnavailableError(Exception):
+    """Backend API недоступен: автомат защиты разомкнут, запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """Автомат защиты: после серии отказов запросы сразу отклоняются до пробного запроса"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.opened_total = 0
+        self.rejected_total = 0
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос; в полуоткрытом состоянии пропускается один пробный"""
+        if self.state == self.OPEN:
+            if self._clock() - self.opened_at < self.reset_timeout:
+                self.rejected_total += 1
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self.rejected_total += 1
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_total += 1
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+        self._probing = False
+
+    def release(self):
+        """Пробный запрос отменен без результата"""
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+            "retry_in": round(retry_in, 3),
+        }
+
+
+class _Flight:
+    """Выполняющийся запрос и число ожидающих его вызовов"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[BackendResponse]"):
+        self.task = task
+        self.waiters = 0
+
+
+class BackendClient:
+    """Долгоживущий HTTP клиент backend API с пулом соединений"""
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 100,
+        pool_size_per_host: int = 0,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        coalesce_reads: bool = True,
+        on_request: Optional[Callable[[str, str, str, float], None]] = None,
+        timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.1,
+        backoff_max: float = 2.0,
+        breaker: Optional[CircuitBreaker] = None,
+        codec: Optional[JsonCodec] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.coalesce_reads = coalesce_reads
+        # Наблюдатель завершенных запросов: (метод, путь, статус или тип ошибки, длительность)
+        self.on_request = on_request
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        # Разбор ответов и кодирование тел запросов (orjson/msgspec, если установлены)
+        self.codec = codec or default_codec
+
+        self._session: Optional[ClientSession] = None
+        self._connector: Optional[TCPConnector] = None
+        self._flights: Dict[Tuple[str, str, Optional[str]], _Flight] = {}
+        self.requests_total = 0
+        self.coalesced_total = 0
+        self.retries_total = 0
+
+    async def start(self):
+        """Создание сессии и пула соединений"""
+        if self._session is not None and not self._session.closed:
+            return
+        self._connector = TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = ClientSession(connector=self._connector)
+
+    async def close(self):
+        """Закрытие сессии и всех соединений пула"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._connector = None
+
+    @property
+    def session(self) -> Optional[ClientSession]:
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        token: Optional[str] = None,
+        payload: Any = None,
+        data: Optional[Union[str, bytes]] = None,
+        timeout: Optional[float] = None,
+    ) -> BackendResponse:
+        """Выполнение запроса к backend API через общую сессию
+
+        GET и DELETE повторяются с экспоненциальной задержкой со случайным
+        разбросом при ошибках соединения, таймаутах и ответах 502/503/504. При
+        разомкнутом автомате защиты сразу выбрасывается BackendUnavailableError.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if self.coalesce_reads and method in COALESCED_METHODS and payload is None and data is None:
+            return await self._coalesced(method, path, token, timeout)
+        return await self._call(method, path, token, payload, data, timeout)
+
+    async def probe(self, path: str, timeout: Optional[float] = None) -> BackendResponse:
+        """Одиночный GET для проверки доступности backend API
+
+        Запрос идет через общую сессию, но в обход автомата защиты, повторов и
+        объединения чтений: неудачная проверка не размыкает автомат для запросов
+        пользователей, а разомкнутый автомат не скрывает восстановление backend.
+        """
+        return await self._send("GET", path, timeout=self.timeout if timeout is None else timeout)
+
+    async def _coalesced(self, method: str, path: str, token: Optional[str], timeout: float) -> BackendResponse:
+        """Одиночное выполнение одинаковых параллельных чтений (ключ: метод, путь, токен)"""
+        key = (method, path, token)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.create_task(self._call(method, path, token, timeout=timeout)))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced_total += 1
+
+        flight.waiters += 1
+        try:
+            # shield: отмена одного вызывающего не прерывает запрос остальных
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Результат больше никому не нужен
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: Tuple[str, str, Optional[str]], flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _call(
+        self,
+        method: str,
+        path: str,
+        token: Optional[str] = None,
+        payload: Any = None,
+        data: Optional[Union[str, bytes]] = None,
+        timeout: Optional[float] = None,
+    ) -> BackendResponse:
+        """Запрос с учетом автомата защиты и повторами идемпотентных методов"""
+        retries = self.max_retries if method in RETRIED_METHODS else 0
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise BackendUnavailableError(f"Backend API circuit is open, {method} {path} rejected")
+            error: Optional[BaseException] = None
+            response: Optional[BackendResponse] = None
+            try:
+                response = await self._send(method, path, token, payload, data, timeout)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+                self.breaker.record_failure()
+            else:
+                if response.status < 500:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if response.status not in RETRIED_STATUSES:
+                    return response
+
+            if attempt >= retries:
+                if response is not None:
+                    return response
+                raise error
+            attempt += 1
+            self.retries_total += 1
+            await asyncio.sleep(self.backoff(attempt))
+
+    def backoff(self, attempt: int) -> float:
+        """Задержка перед повтором: случайная в пределах экспоненциально растущего окна"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        token: Optional[str] = None,
+        payload: Any = None,
+        data: Optional[Union[str, bytes]] = None,
+        timeout: Optional[float] = None,
+    ) -> BackendResponse:
+        # Сессия создается лениво, если клиент используется до start()
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        headers: Dict[str, str] = {}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if payload is not None:
+            data = self.codec.dumps(payload)
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+
+        self.requests_total += 1
+        started = time.perf_counter()
+        try:
+            async with self._session.request(
+                method,
+                f"{self.base_url}{path}",
+                data=data,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                body = await response.read()
+                status = str(response.status)
+                return BackendResponse(status=response.status, body=body, codec=self.codec)
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            if self.on_request is not None:
+                self.on_request(method, path, status, time.perf_counter() - started)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений для настройки его размера"""
+        stats: Dict[str, Any] = {
+            "limit": self.pool_size,
+            "limit_per_host": self.pool_size_per_host,
+            "dns_cache_ttl": self.dns_cache_ttl,
+            "keepalive_timeout": self.keepalive_timeout,
+            "requests_total": self.requests_total,
+            "coalesced_total": self.coalesced_total,
+            "retries_total": self.retries_total,
+            "in_flight_reads": len(self._flights),
+            "active": 0,
+            "idle": 0,
+        }
+        connector = self._connector
+        if connector is None or connector.closed:
+            return stats
+        # Внутренние структуры aiohttp: занятые и простаивающие соединения
+        stats["active"] = len(getattr(connector, "_acquired", ()))
+        stats["idle"] = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        return stats
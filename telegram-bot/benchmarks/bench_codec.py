@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк кодеков JSON: разбор ответа GET /api/subscriptions в модели
+и кодирование больших ответов для каждого установленного кодека
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_schema import make_payload
+from codec import CODECS, get_codec
+from schema import decode_subscriptions
+
+
+def bench(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payload = make_payload(count)
+    body = get_codec("json").dumps(payload)
+    print(f"Ответ со списком из {count} подписок ({len(body) / 1024:.0f} KiB):")
+    print(f"{'кодек':<10} {'loads, ms':>10} {'+ модели, ms':>13} {'dumps, ms':>10}")
+    baseline = None
+    for name in CODECS:
+        codec = get_codec(name)
+        loads = bench(lambda: codec.loads(body), 5)
+        decode = bench(lambda: decode_subscriptions(codec.loads(body)), 3)
+        dumps = bench(lambda: codec.dumps(payload), 5)
+        print(f"{name:<10} {loads * 1000:10.3f} {decode * 1000:13.3f} {dumps * 1000:10.3f}")
+        if name == "json":
+            baseline = decode
+    fastest = get_codec()
+    if baseline is not None and fastest.name != "json":
+        decode = bench(lambda: decode_subscriptions(fastest.loads(body)), 3)
+        print(f"\nразбор в модели с {fastest.name}: {baseline / decode:.1f}x быстрее стандартного json")
+
+
+if __name__ == "__main__":
+    main()
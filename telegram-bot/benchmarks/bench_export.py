@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк выгрузки /export: время и пиковая память при записи в буфер на диске
+"""
+
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_stats import make_subscriptions
+from exporter import CSV_FIELDS, build_export, fingerprint
+
+SPOOL_SIZE = 1024 * 1024
+
+
+def build_in_memory(subscriptions):
+    """Выгрузка целиком в строку (для сравнения)"""
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator="\r\n")
+    writer.writerow(CSV_FIELDS)
+    for sub in subscriptions:
+        writer.writerow((sub.id, sub.name, sub.price, sub.currency, sub.billing_period.value,
+                         sub.next_payment, sub.category, sub.description or "", sub.is_active))
+    return text.getvalue().encode()
+
+
+def measure(label, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<22} {elapsed * 1000:8.1f} ms   пик памяти {peak / 1024:9.1f} KB")
+    return result
+
+
+def main():
+    for count in (1000, 10000, 50000):
+        subscriptions = make_subscriptions(count)
+        print(f"{count} подписок:")
+        measure("хеш содержимого", lambda: fingerprint(subscriptions, "csv"))
+        measure("CSV в памяти", lambda: build_in_memory(subscriptions))
+        for export_format in ("csv", "ics"):
+            spool = measure(f"{export_format.upper()} в буфер", lambda: build_export(subscriptions, export_format, SPOOL_SIZE))
+            spool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный бенчмарк конвейера обработки обновлений бота
+
+Сгенерированные объекты Update передаются напрямую в диспетчер SubTrackerBot.
+Telegram заменен фиктивной сессией, backend API - FakeBackend (fake_backend.py)
+с настраиваемой задержкой и долей ошибок. Для сценариев /list, /stats и полного диалога /add
+выводятся пропускная способность, p50/p99 задержки обработки обновления и
+память на 1000 активных чатов.
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Update
+
+from fake_backend import FakeBackend
+
+BOT_TOKEN = "123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ"
+
+
+class FakeTelegramSession(BaseSession):
+    """Сессия Telegram Bot API без сетевых запросов: вызовы только подсчитываются
+
+    Загрузка файлов отдает содержимое из files (путь файла -> байты) частями по chunk_size.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.files: Dict[str, bytes] = {}
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[method.__api_method__] += 1
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        self.calls["downloadFile"] += 1
+        # URL файла: .../file/bot<токен>/<путь файла>
+        path = url.partition("/file/bot")[2].partition("/")[2]
+        content = self.files.get(path)
+        if content is None:
+            if raise_for_status:
+                raise FileNotFoundError(path)
+            return
+        for offset in range(0, len(content), chunk_size):
+            yield content[offset:offset + chunk_size]
+
+    async def close(self):
+        pass
+
+
+def message_update(update_id: int, chat_id: int, text: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": text,
+        },
+    })
+
+
+def callback_update(update_id: int, chat_id: int, data: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "text": "...",
+            },
+        },
+    })
+
+
+def scenario_updates(scenario: str, chat_id: int, first_id: int) -> List[Update]:
+    """Последовательность обновлений одного чата для сценария"""
+    if scenario == "list":
+        steps = [("message", "/list")]
+    elif scenario == "stats":
+        steps = [("message", "/stats")]
+    else:
+        steps = [
+            ("message", "/add"),
+            ("message", f"Subscription {chat_id}"),
+            ("message", "9.99"),
+            ("callback", "currency_USD"),
+            ("callback", "cycle_monthly"),
+            ("callback", "category_other"),
+            ("message", "2025-01-15"),
+        ]
+    return [
+        message_update(first_id + i, chat_id, value) if kind == "message" else callback_update(first_id + i, chat_id, value)
+        for i, (kind, value) in enumerate(steps)
+    ]
+
+
+def make_bot(backend_url: str):
+    """Создание бота с фиктивной сессией Telegram и вошедшими пользователями"""
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", BOT_TOKEN)
+    os.environ["BACKEND_API_URL"] = backend_url
+    from bot import SubTrackerBot
+
+    app = SubTrackerBot()
+    session = FakeTelegramSession()
+    for middleware in app.bot.session.middleware:
+        session.middleware(middleware)
+    app.bot.session = session
+    return app
+
+
+async def run_scenario(app, backend: FakeBackend, scenario: str, chats: int, rounds: int, concurrency: int) -> Tuple[List[float], float]:
+    """Прогон сценария: чаты обрабатываются параллельно, обновления внутри чата - по порядку"""
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_chat(chat_id: int):
+        async with semaphore:
+            for round_number in range(rounds):
+                for update in scenario_updates(scenario, chat_id, (chat_id * rounds + round_number) * 10):
+                    started = time.perf_counter()
+                    await app.dp.feed_update(app.bot, update)
+                    latencies.append(time.perf_counter() - started)
+
+    for chat_id in range(1, chats + 1):
+        app.user_tokens[chat_id] = backend.token_for(chat_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_chat(chat_id) for chat_id in range(1, chats + 1)))
+    return latencies, time.perf_counter() - started
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def measure_memory(backend: FakeBackend, scenario: str, chats: int, rounds: int, concurrency: int) -> float:
+    """Прирост памяти после сценария в пересчете на 1000 чатов (KiB)"""
+    app = make_bot(backend.url)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    await run_scenario(app, backend, scenario, chats, rounds, concurrency)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    await app.backend.close()
+    return (after - before) / 1024 / chats * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=1000, help="число активных чатов")
+    parser.add_argument("--rounds", type=int, default=1, help="повторов сценария в каждом чате")
+    parser.add_argument("--concurrency", type=int, default=100, help="одновременно обрабатываемых чатов")
+    parser.add_argument("--subscriptions", type=int, default=20, help="подписок у каждого пользователя")
+    parser.add_argument("--latency", type=float, default=5.0, help="задержка backend API, мс")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайный разброс задержки backend API, мс")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов backend API с ошибкой 500 (0-1)")
+    parser.add_argument("--scenario", choices=("list", "stats", "add", "all"), default="all")
+    parser.add_argument("--no-memory", action="store_true", help="не измерять память (tracemalloc)")
+    args = parser.parse_args()
+
+    backend = FakeBackend(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        subscriptions=args.subscriptions,
+    )
+    await backend.start()
+    scenarios = ("list", "stats", "add") if args.scenario == "all" else (args.scenario,)
+    print(f"{args.chats} чатов, {args.rounds} повтор(ов), параллельно {args.concurrency}, "
+          f"задержка backend {args.latency} мс, ошибок {args.error_rate:.0%}, {args.subscriptions} подписок")
+    print(f"{'сценарий':<8} {'обновлений':>10} {'upd/s':>10} {'p50, ms':>9} {'p99, ms':>9} {'KiB/1k чатов':>13}")
+    try:
+        for scenario in scenarios:
+            app = make_bot(backend.url)
+            latencies, elapsed = await run_scenario(app, backend, scenario, args.chats, args.rounds, args.concurrency)
+            await app.backend.close()
+            memory = "-" if args.no_memory else f"{await measure_memory(backend, scenario, args.chats, args.rounds, args.concurrency):.0f}"
+            print(f"{scenario:<8} {len(latencies):>10} {len(latencies) / elapsed:>10.0f} "
+                  f"{percentile(latencies, 0.5) * 1000:>9.2f} {percentile(latencies, 0.99) * 1000:>9.2f} {memory:>13}")
+        print(f"запросов к backend: {backend.stats()['requests']}, внесено ошибок {backend.errors_injected}")
+    finally:
+        await backend.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк планировщика напоминаний: добавление, память и удаление при большом числе напоминаний
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Subscription
+from reminders import ReminderScheduler
+from storage import MemoryStore
+
+PER_CHAT = 10
+
+
+async def noop_send(chat_id, text):
+    pass
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    start = date(2024, 1, 1)
+    subscriptions = [
+        [
+            Subscription(
+                id=f"{chat_id}-{i}",
+                user_id=str(chat_id),
+                name=f"Subscription {i}",
+                price="9.99",
+                currency="USD",
+                billing_period="monthly",
+                next_payment=(start + timedelta(days=(chat_id + i) % 365)).isoformat(),
+                category="Other",
+                is_active=True,
+            )
+            for i in range(PER_CHAT)
+        ]
+        for chat_id in range(count // PER_CHAT)
+    ]
+
+    scheduler = ReminderScheduler(MemoryStore(), noop_send)
+    tracemalloc.start()
+    started = time.perf_counter()
+    for chat_id, subs in enumerate(subscriptions):
+        scheduler.sync_chat(chat_id, subs)
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    stats = scheduler.stats()
+    print(f"{stats['scheduled']} напоминаний в {stats['days']} днях: "
+          f"добавление {elapsed / stats['scheduled'] * 1e6:.2f} мкс, память {memory / stats['scheduled']:.0f} байт на напоминание")
+
+    started = time.perf_counter()
+    for chat_id, subs in enumerate(subscriptions):
+        scheduler.sync_chat(chat_id, subs)
+    elapsed = time.perf_counter() - started
+    print(f"повторная сверка без изменений: {elapsed / stats['scheduled'] * 1e6:.2f} мкс на подписку")
+
+    started = time.perf_counter()
+    for chat_id, subs in enumerate(subscriptions):
+        scheduler.remove(chat_id, subs[0].id)
+    elapsed = time.perf_counter() - started
+    print(f"удаление: {elapsed / len(subscriptions) * 1e6:.2f} мкс")
+
+
+if __name__ == "__main__":
+    main()
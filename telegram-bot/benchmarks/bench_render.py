@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк постраничного вывода /list для пользователей с большим числом подписок
+
+Время форматирования одной страницы не должно зависеть от длины списка:
+форматируются только подписки этой страницы.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Subscription
+from render import ListRenderer
+
+
+def make_subscriptions(count):
+    """Генерация списка подписок"""
+    return [
+        Subscription(
+            id=f"sub{i}",
+            user_id="12345",
+            name=f"Subscription {i}",
+            price="9.99",
+            currency="USD",
+            billing_period="monthly",
+            next_payment="2024-01-15",
+            category="Other",
+            is_active=True,
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    renderer = ListRenderer()
+    print(f"{'подписок':>8} {'первая, ms':>11} {'последняя, ms':>14}")
+    for count in (100, 1000, 5000, 50000):
+        subscriptions = make_subscriptions(count)
+        last = renderer.page_count(count) - 1
+        first_page = min(timeit.repeat(lambda: renderer.render_page(subscriptions, 0), number=100, repeat=5)) / 100
+        last_page = min(timeit.repeat(lambda: renderer.render_page(subscriptions, last), number=100, repeat=5)) / 100
+        print(f"{count:>8} {first_page * 1000:>11.3f} {last_page * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
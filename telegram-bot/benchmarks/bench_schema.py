@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк декодирования и кодирования подписок:
+прежнее преобразование ключей через re.sub в строковую модель против таблиц
+schema.py и модели с разобранными ценой, датой и циклом оплаты
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Subscription, CreateSubscriptionRequest
+from schema import decode_subscriptions, encode_create_request
+
+
+@dataclass
+class LegacySubscription:
+    """Прежняя модель Subscription: обычный dataclass со строковыми полями"""
+    id: str
+    user_id: str
+    name: str
+    price: str
+    currency: str
+    billing_period: str
+    next_payment: str
+    category: str
+    is_active: bool
+    description: Optional[str] = None
+
+
+def legacy_camel_to_snake(name):
+    """Прежняя реализация SubTrackerBot.camel_to_snake"""
+    import re
+    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
+    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+def legacy_convert_keys(data):
+    """Прежняя реализация SubTrackerBot.convert_keys"""
+    if isinstance(data, dict):
+        return {legacy_camel_to_snake(k): legacy_convert_keys(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [legacy_convert_keys(item) for item in data]
+    else:
+        return data
+
+
+def legacy_snake_to_camel(name):
+    """Прежняя реализация SubTrackerBot.snake_to_camel (без отладочного вывода)"""
+    components = name.split('_')
+    return components[0] + ''.join(x.capitalize() for x in components[1:])
+
+
+def legacy_convert_keys_to_camel(data):
+    """Прежняя реализация SubTrackerBot.convert_keys_to_camel (без отладочного вывода)"""
+    if isinstance(data, dict):
+        return {legacy_snake_to_camel(k): legacy_convert_keys_to_camel(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [legacy_convert_keys_to_camel(item) for item in data]
+    else:
+        return data
+
+
+def make_payload(count):
+    """Генерация ответа GET /api/subscriptions"""
+    return [
+        {
+            "id": f"sub{i}",
+            "userId": "12345",
+            "name": f"Subscription {i}",
+            "price": f"{i % 100}.99",
+            "currency": "USD",
+            "billingPeriod": "monthly",
+            "nextPayment": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "category": "Other",
+            "isActive": True,
+            "description": None,
+        }
+        for i in range(count)
+    ]
+
+
+def bench(label, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<40} {best * 1000:10.3f} ms")
+    return best
+
+
+def retained(func):
+    """Память, удерживаемая результатом декодирования (без самого ответа backend)"""
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payload = make_payload(count)
+    print(f"Декодирование {count} подписок:")
+    legacy = lambda: [LegacySubscription(**legacy_convert_keys(sub)) for sub in payload]
+    old = bench("convert_keys + Subscription(**)", legacy, 3)
+    new = bench("schema.decode_subscriptions", lambda: decode_subscriptions(payload), 3)
+    print(f"{'ускорение':<40} {old / new:10.1f}x")
+
+    print(f"\nПамять на подписку ({count} подписок):")
+    old = retained(legacy) / count
+    new = retained(lambda: decode_subscriptions(payload)) / count
+    print(f"{'convert_keys + Subscription(**)':<40} {old:10.0f} байт")
+    print(f"{'schema.decode_subscriptions':<40} {new:10.0f} байт")
+
+    request = CreateSubscriptionRequest(
+        user_id="12345", name="Netflix", price="15.99", currency="USD",
+        billing_period="monthly", next_payment="2024-01-15", category="Video"
+    )
+    print("\nКодирование запроса создания подписки (10000 раз):")
+    old = bench("asdict + convert_keys_to_camel", lambda: legacy_convert_keys_to_camel(asdict(request)), 10000)
+    new = bench("schema.encode_create_request", lambda: encode_create_request(request), 10000)
+    print(f"{'ускорение':<40} {old / new:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк расчета статистики /stats для пользователей с большим числом подписок
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Subscription
+from stats import compute_stats, render_stats
+
+CYCLES = ("monthly", "yearly", "weekly")
+CURRENCIES = ("USD", "EUR", "RUB")
+CATEGORIES = ("Entertainment", "Productivity", "Music", "Video", "Other")
+
+
+def make_subscriptions(count):
+    """Генерация списка подписок"""
+    return [
+        Subscription(
+            id=f"sub{i}",
+            user_id="12345",
+            name=f"Subscription {i}",
+            price=f"{i % 100}.99",
+            currency=CURRENCIES[i % len(CURRENCIES)],
+            billing_period=CYCLES[i % len(CYCLES)],
+            next_payment="2024-01-15",
+            category=CATEGORIES[i % len(CATEGORIES)],
+            is_active=True,
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    for count in (100, 1000, 10000):
+        subscriptions = make_subscriptions(count)
+        best = min(timeit.repeat(lambda: render_stats(compute_stats(subscriptions)), number=10, repeat=5)) / 10
+        print(f"{count:>6} подписок: {best * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,56 @@
 import asyncio
+import logging
 import os
-from typing import Dict, Optional, Any
-from dataclasses import dataclass, asdict
-from enum import Enum
-import aiohttp
-from aiohttp import ClientSession, web
-import json
-from datetime import datetime
+import signal
+from typing import AsyncIterator, Dict, List, Optional, Any
+from dataclasses import asdict
+from aiohttp import web
+from datetime import date, datetime
 from dotenv import load_dotenv
 
 # Загрузка переменных окружения из файла .env
 load_dotenv()
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, Update
 from aiogram.filters import Command, CommandObject
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
 
+from backend_client import BackendClient, CircuitBreaker
+from codec import get_codec
+from models import (
+    User,
+    BillingCycle,
+    Subscription,
+    CreateSubscriptionRequest,
+    LoginRequest,
+    LoginResponse,
+)
+from cache import SubscriptionCache
+from tokens import TokenManager
+from schema import decode_subscription, decode_subscriptions, encode_create_request
+from stats import compute_stats, render_stats
+from storage import CachedStore, KeyValueFSMStorage, MemoryStore, create_store
+from outbox import OutboundDispatcher, PRIORITY_BULK, PRIORITY_INTERACTIVE
+from menus import BOT_COMMANDS, CATEGORY_MENU, CURRENCY_MENU, CYCLE_MENU
+from render import ListRenderer, LIST_PAGE_PREFIX, LIST_PAGE_NOOP
+from reminders import ReminderScheduler
+from readiness import ReadinessProber
+from importer import ImportFormatError, SubscriptionImporter, parse_rows, render_progress, render_report
+from exporter import EXPORT_FORMATS, ExportCache, SpooledInputFile, build_export, export_filename, fingerprint
+from bot_logging import HandlerLoggingMiddleware, setup_logging_from_env
+from executor import ExecutorMiddleware, UpdateExecutor
+from lifecycle import InFlightMiddleware, Lifecycle, confirm_updates
+from supervisor import Supervisor, UpdateReceiver
+from metrics import BotMetrics, CONTENT_TYPE, HandlerMetricsMiddleware, TelegramMetricsMiddleware
 
-# Определение моделей данных
-@dataclass
-class User:
-    id: str
-    username: str
-    email: str
-    password_hash: str
 
-
-class BillingCycle(Enum):
-    MONTHLY = "monthly"
-    YEARLY = "yearly"
-    WEEKLY = "weekly"
-
-
-@dataclass
-class Subscription:
-    id: str
-    user_id: str
-    name: str
-    price: str
-    currency: str
-    billing_period: str
-    next_payment: str
-    category: str
-    is_active: bool
-    description: Optional[str] = None
-
-
-@dataclass
-class CreateSubscriptionRequest:
-    user_id: str
-    name: str
-    price: str
-    currency: str
-    billing_period: str
-    next_payment: str
-    category: str
-    description: Optional[str] = None
-
-
-@dataclass
-class LoginRequest:
-    username: str
-    password: str
-
-
-@dataclass
-class LoginResponse:
-    token: str
+logger = logging.getLogger(__name__)
 
 
 # Определение состояний пользователя
@@ -83,6 +64,7 @@ class BotState(StatesGroup):
     ADDING_SUBSCRIPTION_CATEGORY = State()
     LOGIN_USERNAME = State()
     LOGIN_PASSWORD = State()
+    IMPORTING = State()
 
 
 class SubTrackerBot:
@@ -92,67 +74,306 @@ class SubTrackerBot:
         if not self.bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
         
+        # Метрики для эндпоинта /metrics
+        self.metrics = BotMetrics(idle_states=(BotState.NONE,))
+        
+        # Хранилище состояний FSM и токенов: память процесса, SQLite или Redis
+        storage_url = os.getenv("BOT_STORAGE_URL", "")
+        self.token_ttl = float(os.getenv("TOKEN_TTL", "86400"))
+        if storage_url:
+            self.store = create_store(storage_url)
+            state_cache = CachedStore(self.store, ttl=float(os.getenv("BOT_STORAGE_CACHE_TTL", "1")))
+            fsm_storage = KeyValueFSMStorage(state_cache, state_ttl=float(os.getenv("FSM_STATE_TTL", "86400")))
+        else:
+            self.store = MemoryStore()
+            state_cache = None
+            fsm_storage = MemoryStorage()
+        
+        # Кодек JSON для backend API, Telegram Bot API и веб-сервера
+        self.codec = get_codec(os.getenv("JSON_CODEC", "auto"))
+        
         # Инициализация бота и диспетчера
-        self.bot = Bot(token=self.bot_token)
-        self.dp = Dispatcher(storage=MemoryStorage())
+        self.bot = Bot(
+            token=self.bot_token,
+            session=AiohttpSession(json_loads=self.codec.loads, json_dumps=self.codec.dumps_str),
+        )
+        self.bot.session.middleware(TelegramMetricsMiddleware(self.metrics))
+        self.dp = Dispatcher(storage=fsm_storage)
+        handler_metrics = HandlerMetricsMiddleware(self.metrics)
+        self.dp.message.middleware(handler_metrics)
+        self.dp.callback_query.middleware(handler_metrics)
+        handler_logging = HandlerLoggingMiddleware(slow_threshold=float(os.getenv("LOG_SLOW_HANDLER_MS", "1000")) / 1000)
+        self.dp.message.middleware(handler_logging)
+        self.dp.callback_query.middleware(handler_logging)
+        
+        # Остановка процесса: ожидание обработчиков и отправок не дольше SHUTDOWN_TIMEOUT
+        self.lifecycle = Lifecycle(drain_timeout=float(os.getenv("SHUTDOWN_TIMEOUT", "25")))
+        self.in_flight = InFlightMiddleware(self.lifecycle)
+        self.dp.update.outer_middleware(self.in_flight)
+        
+        # Обновления одного чата обрабатываются по порядку, разных чатов - параллельно,
+        # не больше UPDATE_MAX_CONCURRENCY одновременно; ожидающие обновления учитываются
+        # self.in_flight и дожидаются при остановке
+        self.executor = UpdateExecutor(
+            max_concurrency=int(os.getenv("UPDATE_MAX_CONCURRENCY", "100")),
+            on_wait=self.metrics.update_wait.observe,
+        )
+        self.dp.update.outer_middleware(ExecutorMiddleware(self.executor))
+        self.metrics.add_update_executor(self.executor.stats)
+        # Предел принятых polling, но не завершенных обновлений: при превышении getUpdates приостанавливается
+        self.update_max_pending = int(os.getenv("UPDATE_MAX_PENDING", "10000"))
         
         # Базовый URL API
         self.api_base_url = os.getenv("BACKEND_API_URL", "http://localhost:8080")
         
-        # Хранилище состояний пользователей
-        self.user_tokens: Dict[int, str] = {}  # chat_id -> JWT token
+        # Общий клиент backend API с пулом соединений
+        self.backend = BackendClient(
+            self.api_base_url,
+            pool_size=int(os.getenv("BACKEND_POOL_SIZE", "100")),
+            pool_size_per_host=int(os.getenv("BACKEND_POOL_SIZE_PER_HOST", "0")),
+            dns_cache_ttl=int(os.getenv("BACKEND_DNS_CACHE_TTL", "300")),
+            keepalive_timeout=float(os.getenv("BACKEND_KEEPALIVE_TIMEOUT", "30")),
+            coalesce_reads=os.getenv("BACKEND_COALESCE_READS", "true").lower() != "false",
+            on_request=self.metrics.observe_backend,
+            timeout=float(os.getenv("BACKEND_TIMEOUT", "10")),
+            max_retries=int(os.getenv("BACKEND_MAX_RETRIES", "2")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("BACKEND_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("BACKEND_BREAKER_RESET_TIMEOUT", "30")),
+            ),
+            codec=self.codec,
+        )
+        
+        # Локальный кэш токенов пользователей поверх self.store с учетом срока действия JWT
+        self._user_tokens = TokenManager(
+            default_ttl=self.token_ttl,
+            refresh_margin=float(os.getenv("TOKEN_REFRESH_MARGIN", "300")),
+        )
+        
+        # Кэш списков подписок по чатам
+        self.subscription_cache = SubscriptionCache(
+            ttl=float(os.getenv("SUBSCRIPTION_CACHE_TTL", "60")),
+            max_size=int(os.getenv("SUBSCRIPTION_CACHE_SIZE", "10000")),
+        )
+        
+        # file_id отправленных выгрузок /export по хешу содержимого
+        self.export_cache = ExportCache(max_size=int(os.getenv("EXPORT_CACHE_SIZE", "10000")))
+        # Размер выгрузки, после которого буфер переносится во временный файл
+        self.export_spool_size = int(os.getenv("EXPORT_SPOOL_SIZE", str(1024 * 1024)))
+        
+        # Доли попаданий кэшей для /metrics
+        caches = {"subscriptions": self.subscription_cache.stats, "exports": self.export_cache.stats}
+        if state_cache is not None:
+            caches["fsm_storage"] = state_cache.stats
+        self.metrics.add_cache_ratios(caches)
+        
+        # Постраничный вывод списка подписок
+        self.list_renderer = ListRenderer(page_size=int(os.getenv("LIST_PAGE_SIZE", "10")))
+        
+        # Импорт подписок из файлов CSV/JSON
+        self.import_max_concurrency = int(os.getenv("IMPORT_MAX_CONCURRENCY", "5"))
+        self.import_max_rows = int(os.getenv("IMPORT_MAX_ROWS", "1000"))
+        self.import_max_file_size = int(os.getenv("IMPORT_MAX_FILE_SIZE", str(5 * 1024 * 1024)))
+        self.import_progress_interval = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "2"))
+        
+        # Очередь исходящих сообщений с ограничением частоты отправки
+        self.outbox = OutboundDispatcher(
+            global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")),
+            chat_rate=float(os.getenv("TELEGRAM_CHAT_RATE", "1")),
+            chat_burst=float(os.getenv("TELEGRAM_CHAT_BURST", "3")),
+            max_in_flight=int(os.getenv("OUTBOX_MAX_IN_FLIGHT", "30")),
+        )
+        
+        # Напоминания о платежах за REMINDER_DAYS_BEFORE дней до next_payment
+        self.reminders = ReminderScheduler(
+            self.store,
+            send=self.send_reminder,
+            loader=self.load_reminder_subscriptions,
+            days_before=int(os.getenv("REMINDER_DAYS_BEFORE", "3")),
+            hour=int(os.getenv("REMINDER_HOUR_UTC", "9")),
+            max_concurrency=int(os.getenv("REMINDER_MAX_CONCURRENCY", "20")),
+            refresh_interval=float(os.getenv("REMINDER_REFRESH_INTERVAL", "60")),
+            refresh_batch=int(os.getenv("REMINDER_REFRESH_BATCH", "100")),
+        )
+        
+        # Режим получения обновлений: long polling или webhook
+        self.update_mode = os.getenv("BOT_MODE", "polling").lower()
+        if self.update_mode not in ("polling", "webhook"):
+            raise ValueError("BOT_MODE must be either 'polling' or 'webhook'")
+        self.webhook_url = os.getenv("WEBHOOK_URL", "").rstrip("/")
+        self.webhook_path = os.getenv("WEBHOOK_PATH", "/webhook")
+        self.webhook_secret = os.getenv("WEBHOOK_SECRET")
+        if self.update_mode == "webhook" and not (self.webhook_url and self.webhook_secret):
+            raise ValueError("WEBHOOK_URL and WEBHOOK_SECRET environment variables are required in webhook mode")
+        
+        # Фоновая проверка backend API и Telegram для /ready
+        self.readiness = ReadinessProber(
+            {"backend": self.probe_backend, "telegram": self.probe_telegram},
+            interval=float(os.getenv("READY_CHECK_INTERVAL", "10")),
+            timeout=float(os.getenv("READY_CHECK_TIMEOUT", "3")),
+            failure_threshold=int(os.getenv("READY_FAILURE_THRESHOLD", "2")),
+            dumps=self.codec.dumps_str,
+        )
+        self.lifecycle.on_stop.append(self.readiness.set_draining)
+        
+        # Прием обновлений от супервизора (только в рабочем процессе, BOT_WORKERS > 1)
+        self.update_receiver: Optional[UpdateReceiver] = None
         
         # Инициализация веб-сервера для health check
         self.app = web.Application()
         self.app.router.add_get('/health', self.health_check)
+        self.app.router.add_get('/ready', self.readiness.handle_ready)
+        self.app.router.add_get('/metrics', self.metrics_endpoint)
+        
+        # Прием обновлений от Telegram на том же веб-сервере
+        if self.update_mode == "webhook":
+            # Во время остановки Telegram получает 503 и повторит обновление позже
+            self.app.middlewares.append(self.lifecycle.reject_when_stopping({self.webhook_path}))
+            SimpleRequestHandler(
+                dispatcher=self.dp,
+                bot=self.bot,
+                secret_token=self.webhook_secret,
+            ).register(self.app, path=self.webhook_path)
         
         # Регистрация обработчиков
         self.register_handlers()
     
-    def camel_to_snake(self, name: str) -> str:
-        """Преобразование camelCase в snake_case"""
-        import re
-        # Вставка подчеркивания перед заглавными буквами, которые не в начале строки
-        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-        # Вставка подчеркивания перед заглавными буквами, за которыми следует строчная или цифра
-        return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
-
-    def snake_to_camel(self, name: str) -> str:
-        """Преобразование snake_case в camelCase"""
-        components = name.split('_')
-        result = components[0] + ''.join(x.capitalize() for x in components[1:])
-        print(f"snake_to_camel: {name} -> {result}")
-        return result
-
-    def convert_keys_to_camel(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Рекурсивное преобразование ключей словаря из snake_case в camelCase"""
-        print(f"convert_keys_to_camel called with: {data}")
-        if isinstance(data, dict):
-            result = {self.snake_to_camel(k): self.convert_keys_to_camel(v) for k, v in data.items()}
-            print(f"convert_keys_to_camel result: {result}")
-            return result
-        elif isinstance(data, list):
-            return [self.convert_keys_to_camel(item) for item in data]
-        else:
-            return data
-
-    def convert_keys(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Рекурсивное преобразование ключей словаря из camelCase в snake_case"""
-        if isinstance(data, dict):
-            return {self.camel_to_snake(k): self.convert_keys(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self.convert_keys(item) for item in data]
-        else:
-            return data
-    
     async def health_check(self, request):
         """Health check endpoint"""
-        return web.json_response({
+        health = {
             "status": "UP",
             "timestamp": int(datetime.now().timestamp() * 1000),
             "version": "1.0.0",
-            "component": "telegram-bot"
-        })
+            "component": "telegram-bot",
+            "mode": self.update_mode,
+            "backend_pool": self.backend.pool_stats(),
+            "backend_circuit": self.backend.breaker.stats(),
+            "subscription_cache": self.subscription_cache.stats(),
+            "tokens": self.user_tokens.stats(),
+            "export_cache": self.export_cache.stats(),
+            "outbox": self.outbox.stats(),
+            "reminders": self.reminders.stats(),
+            "readiness": self.readiness.stats(),
+            "lifecycle": self.lifecycle.stats(),
+            "executor": self.executor.stats()
+        }
+        if self.update_receiver is not None:
+            health["worker"] = self.update_receiver.stats()
+        return web.json_response(health, dumps=self.codec.dumps_str)
+    
+    async def probe_backend(self):
+        """Проверка backend API для /ready"""
+        response = await self.backend.probe("/api/health", timeout=self.readiness.timeout)
+        if response.status != 200:
+            raise RuntimeError(f"status {response.status}")
+    
+    async def probe_telegram(self):
+        """Проверка Telegram Bot API для /ready"""
+        await self.bot.get_me()
+    
+    async def metrics_endpoint(self, request):
+        """Метрики в текстовом формате Prometheus"""
+        return web.Response(body=self.metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+    
+    async def send(self, chat_id: int, func, *args, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """Отправка в Telegram через очередь исходящих сообщений без ожидания результата"""
+        if self.outbox.running:
+            self.outbox.submit(chat_id, func, *args, priority=priority, **kwargs)
+        else:
+            # Очередь не запущена (например, в тестах): отправка напрямую
+            await func(*args, **kwargs)
+    
+    async def send_and_wait(self, chat_id: int, func, *args, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """Отправка в Telegram через очередь исходящих сообщений с ожиданием результата"""
+        if self.outbox.running:
+            return await self.outbox.submit(chat_id, func, *args, priority=priority, wait_result=True, **kwargs)
+        return await func(*args, **kwargs)
+    
+    async def reply(self, message: Message, text: str, **kwargs):
+        """Ответ в чат сообщения"""
+        await self.send(message.chat.id, message.answer, text, **kwargs)
+    
+    async def edit(self, message: Message, text: str, **kwargs):
+        """Изменение текста сообщения"""
+        await self.send(message.chat.id, message.edit_text, text, **kwargs)
+    
+    @property
+    def user_tokens(self) -> TokenManager:
+        """Токены чатов: chat_id -> JWT"""
+        return self._user_tokens
+    
+    @user_tokens.setter
+    def user_tokens(self, tokens: Dict[int, str]):
+        # Присваивание словаря заменяет содержимое, сохраняя индекс сроков и настройки
+        self._user_tokens.clear()
+        self._user_tokens.update(tokens)
+    
+    async def get_token(self, chat_id: int, warn: bool = True) -> Optional[str]:
+        """Получение JWT токена чата из локального кэша или общего хранилища
+        
+        Истекший токен удаляется без запроса к backend API (None). При warn
+        чат один раз предупреждается о скором истечении сессии.
+        """
+        tokens = self.user_tokens
+        tokens.evict_expired()
+        token = tokens.get(chat_id)
+        if token is None:
+            token = await self.store.get(f"token:{chat_id}")
+            if token is None:
+                return None
+            tokens[chat_id] = token
+        if tokens.is_expired(chat_id):
+            tokens.expire(chat_id)
+            await self.store.delete(f"token:{chat_id}")
+            return None
+        if warn and tokens.needs_warning(chat_id):
+            minutes = max(1, int(tokens.remaining(chat_id) // 60))
+            await self.send(
+                chat_id, self.bot.send_message, chat_id,
+                f"⚠️ Сессия истечет примерно через {minutes} мин. Выполните /login, чтобы продолжить без перерыва.",
+            )
+        return token
+    
+    async def save_token(self, chat_id: int, token: str):
+        """Сохранение JWT токена чата (в хранилище не дольше срока действия токена)"""
+        self.user_tokens[chat_id] = token
+        ttl = min(self.token_ttl, self.user_tokens.remaining(chat_id))
+        await self.store.set(f"token:{chat_id}", token, max(1.0, ttl))
+    
+    def login_prompt(self, chat_id: int) -> str:
+        """Сообщение для чата без действующего токена"""
+        if self.user_tokens.was_expired(chat_id):
+            return "⌛ Сессия истекла, войдите снова: /login"
+        return "❌ Сначала выполните вход: /login"
+    
+    async def load_subscriptions(self, chat_id: int, token: str) -> Optional[List[Subscription]]:
+        """Получение списка подписок чата из кэша или backend API (None при ошибке API)"""
+        subscriptions = self.subscription_cache.get(chat_id, token)
+        if subscriptions is not None:
+            return subscriptions
+        
+        generation = self.subscription_cache.generation(chat_id)
+        response = await self.backend.request("GET", "/api/subscriptions", token=token)
+        if response.status != 200:
+            return None
+        subscriptions = decode_subscriptions(response.json())
+        if self.subscription_cache.generation(chat_id) != generation:
+            # Подписки изменились во время запроса: список мог быть получен до изменения
+            return subscriptions
+        self.subscription_cache.set(chat_id, token, subscriptions)
+        self.reminders.sync_chat(chat_id, subscriptions)
+        return subscriptions
+    
+    async def load_reminder_subscriptions(self, chat_id: int) -> Optional[List[Subscription]]:
+        """Список подписок чата для сверки напоминаний (None, если чат не вошел в систему)"""
+        token = await self.get_token(chat_id, warn=False)
+        if not token:
+            return None
+        return await self.load_subscriptions(chat_id, token)
+    
+    async def send_reminder(self, chat_id: int, text: str):
+        """Отправка напоминания о платеже в полосе массовых сообщений"""
+        await self.send_and_wait(chat_id, self.bot.send_message, chat_id, text, priority=PRIORITY_BULK)
     
     def register_handlers(self):
         """Регистрация обработчиков команд и сообщений"""
@@ -164,6 +385,8 @@ class SubTrackerBot:
         self.dp.message(Command("delete"))(self.handle_delete_command)
         self.dp.message(Command("stats"))(self.handle_stats_command)
         self.dp.message(Command("login"))(self.handle_login_command)
+        self.dp.message(Command("import"))(self.handle_import_command)
+        self.dp.message(Command("export"))(self.handle_export_command)
         
         # Обработка текстовых сообщений в зависимости от состояния
         self.dp.message(BotState.LOGIN_USERNAME)(self.handle_login_username)
@@ -175,41 +398,123 @@ class SubTrackerBot:
         # Обработка callback-запросов
         self.dp.callback_query()(self.handle_callback_query)
         self.dp.message(BotState.ADDING_SUBSCRIPTION_DATE)(self.handle_subscription_date)
+        self.dp.message(BotState.IMPORTING, F.document)(self.handle_import_document)
         
         # Обработка всех остальных текстовых сообщений
         self.dp.message(F.text)(self.handle_text)
     
     async def set_bot_commands(self):
         """Установка списка команд бота"""
-        from aiogram.types import BotCommand
-        
-        commands = [
-            BotCommand(command="start", description="Запустить бота"),
-            BotCommand(command="help", description="Показать справку"),
-            BotCommand(command="login", description="Войти в систему"),
-            BotCommand(command="list", description="Показать все подписки"),
-            BotCommand(command="add", description="Добавить новую подписку"),
-            BotCommand(command="delete", description="Удалить подписку"),
-            BotCommand(command="stats", description="Показать статистику расходов")
-        ]
-        
-        await self.bot.set_my_commands(commands)
+        await self.bot.set_my_commands(BOT_COMMANDS)
+    
+    async def start_services(self):
+        """Открытие пула соединений к backend API и запуск фоновых задач"""
+        await self.backend.start()
+        await self.outbox.start()
+        await self.reminders.start()
+        await self.readiness.start()
+        self.metrics.loop_monitor.start()
+    
+    async def stop_services(self):
+        """Остановка фоновых задач и закрытие соединений и хранилищ"""
+        await self.readiness.stop()
+        await self.reminders.stop()
+        await self.metrics.loop_monitor.stop()
+        # Очередь исходящих сообщений отправляется в пределах оставшегося срока остановки
+        outbox_timeout = float(os.getenv("OUTBOX_DRAIN_TIMEOUT", "10"))
+        remaining = self.lifecycle.remaining()
+        await self.outbox.stop(timeout=outbox_timeout if remaining is None else min(outbox_timeout, remaining))
+        await self.backend.close()
+        await self.dp.storage.close()
+        await self.store.close()
     
     async def start(self):
         """Запуск бота"""
-        print("Starting Telegram Bot...")
-        
-        # Запуск веб-сервера в отдельной задаче
+        logger.info("Starting Telegram Bot")
         runner = web.AppRunner(self.app)
-        await runner.setup()
-        # Установка команд бота
-        await self.set_bot_commands()
-        site = web.TCPSite(runner, '0.0.0.0', 8081)
-        await site.start()
-        
-        print("Health check server is running on port 8081")
-        print("Bot is running... Press Ctrl+C to stop")
-        await self.dp.start_polling(self.bot)
+        # SIGTERM и Ctrl+C запускают штатную остановку вместо прерывания обработчиков
+        self.lifecycle.install_signal_handlers()
+        try:
+            # Открытие пула соединений к backend API и запуск очереди исходящих сообщений
+            await self.start_services()
+            
+            # Запуск веб-сервера в отдельной задаче
+            await runner.setup()
+            # Установка команд бота
+            await self.set_bot_commands()
+            site = web.TCPSite(runner, '0.0.0.0', 8081)
+            await site.start()
+            
+            logger.info("Health check server is running on port 8081")
+            logger.info("Bot is running", extra={"mode": self.update_mode})
+            if self.update_mode == "webhook":
+                await self.lifecycle.run(self.run_webhook())
+            else:
+                # Webhook, оставшийся от предыдущего запуска, мешает getUpdates
+                await self.bot.delete_webhook()
+                # Сигналы и закрытие сессии берет на себя self.lifecycle
+                await self.lifecycle.run(
+                    self.dp.start_polling(
+                        self.bot,
+                        handle_signals=False,
+                        close_bot_session=False,
+                        tasks_concurrency_limit=self.update_max_pending,
+                    ),
+                    stop=self.dp.stop_polling,
+                )
+        finally:
+            await self.shutdown(runner)
+    
+    async def shutdown(self, runner: web.AppRunner):
+        """Штатная остановка: прием обновлений уже прекращен, обработчики и
+        исходящие сообщения завершаются в пределах SHUTDOWN_TIMEOUT, затем
+        закрываются соединения, хранилища и веб-сервер"""
+        self.lifecycle.request_stop()
+        if self.update_receiver is not None:
+            await self.update_receiver.stop(timeout=self.lifecycle.remaining())
+        await self.lifecycle.drain()
+        if self.update_mode == "polling" and self.update_receiver is None:
+            await confirm_updates(self.bot, self.in_flight.last_update_id)
+        await self.stop_services()
+        # /health отвечает до конца остановки
+        await runner.cleanup()
+        await self.bot.session.close()
+        self.lifecycle.remove_signal_handlers()
+        logger.info("Bot stopped", extra=self.lifecycle.stats())
+    
+    async def run_worker(self, socket_path: str, port: int):
+        """Работа в роли процесса супервизора: обновления приходят по локальному сокету"""
+        runner = web.AppRunner(self.app)
+        # Остановкой управляет супервизор через SIGTERM (SIGINT рабочий процесс игнорирует)
+        self.lifecycle.install_signal_handlers((signal.SIGTERM,))
+        try:
+            await self.start_services()
+            await runner.setup()
+            site = web.TCPSite(runner, '0.0.0.0', port)
+            await site.start()
+            
+            self.update_receiver = UpdateReceiver(self.feed_update_json, self.executor)
+            await self.update_receiver.start(socket_path)
+            logger.info("Worker is running", extra={"socket": socket_path, "port": port})
+            await self.lifecycle.run(asyncio.Event().wait())
+        finally:
+            await self.shutdown(runner)
+    
+    async def feed_update_json(self, body: bytes):
+        """Обработка обновления, полученного от супервизора в виде JSON"""
+        update = Update.model_validate_json(body, context={"bot": self.bot})
+        await self.dp.feed_update(self.bot, update)
+    
+    async def run_webhook(self):
+        """Регистрация webhook в Telegram и ожидание обновлений"""
+        await self.bot.set_webhook(
+            f"{self.webhook_url}{self.webhook_path}",
+            secret_token=self.webhook_secret,
+            allowed_updates=self.dp.resolve_used_update_types(),
+        )
+        logger.info("Webhook mode: receiving updates", extra={"path": self.webhook_path})
+        # Обновления обрабатываются веб-сервером, здесь только ожидание остановки
+        await asyncio.Event().wait()
     
     async def handle_start_command(self, message: Message, state: FSMContext):
         """Обработка команды /start"""
@@ -224,7 +529,7 @@ class SubTrackerBot:
 Или создайте аккаунт через веб-интерфейс.
         """.strip()
         
-        await message.answer(welcome_message)
+        await self.reply(message, welcome_message)
         await state.set_state(BotState.NONE)
     
     async def handle_help_command(self, message: Message):
@@ -237,23 +542,25 @@ class SubTrackerBot:
 ➕ /add - Добавить новую подписку
 🗑 /delete [id] - Удалить подписку по ID
 📊 /stats - Показать статистику расходов
+📥 /import - Импортировать подписки из файла CSV или JSON
+📤 /export [csv|ics] - Выгрузить подписки в CSV или календарь платежей
 ❓ /help - Показать эту справку
 
 💡 Вы также можете использовать меню команд внизу экрана для быстрого доступа к функциям бота.
         """.strip()
         
-        await message.answer(help_message)
+        await self.reply(message, help_message)
     
     async def handle_login_command(self, message: Message, state: FSMContext):
         """Обработка команды /login"""
         await state.set_state(BotState.LOGIN_USERNAME)
-        await message.answer("👤 Введите имя пользователя:")
+        await self.reply(message, "👤 Введите имя пользователя:")
     
     async def handle_login_username(self, message: Message, state: FSMContext):
         """Обработка ввода имени пользователя при логине"""
         await state.update_data(username=message.text)
         await state.set_state(BotState.LOGIN_PASSWORD)
-        await message.answer("🔑 Введите пароль:")
+        await self.reply(message, "🔑 Введите пароль:")
     
     async def handle_login_password(self, message: Message, state: FSMContext):
         """Обработка ввода пароля при логине"""
@@ -272,80 +579,68 @@ class SubTrackerBot:
         try:
             login_request = LoginRequest(username=username, password=password)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_base_url}/api/login",
-                    json=asdict(login_request),
-                    headers={"Content-Type": "application/json"}
-                ) as response:
-                    if response.status == 200:
-                        response_data = await response.json()
-                        login_response = LoginResponse(token=response_data["token"])
-                        self.user_tokens[message.chat.id] = login_response.token
-                        
-                        await message.answer("✅ Вход выполнен успешно!\nТеперь вы можете использовать все команды бота.")
-                    else:
-                        await message.answer("❌ Неверное имя пользователя или пароль")
-        except Exception as e:
-            print(f"Login error: {e}")
-            await message.answer("❌ Ошибка соединения с сервером")
+            response = await self.backend.request("POST", "/api/login", payload=asdict(login_request))
+            if response.status == 200:
+                response_data = response.json()
+                login_response = LoginResponse(token=response_data["token"])
+                await self.save_token(message.chat.id, login_response.token)
+                self.subscription_cache.invalidate(message.chat.id)
+                
+                await self.reply(message, "✅ Вход выполнен успешно!\nТеперь вы можете использовать все команды бота.")
+            else:
+                await self.reply(message, "❌ Неверное имя пользователя или пароль")
+        except Exception:
+            logger.exception("Login failed", extra={"chat_id": message.chat.id})
+            await self.reply(message, "❌ Ошибка соединения с сервером")
     
     async def handle_list_command(self, message: Message):
         """Обработка команды /list"""
         # Проверка аутентификации
-        token = self.user_tokens.get(message.chat.id)
+        token = await self.get_token(message.chat.id)
         if not token:
-            await message.answer("❌ Сначала выполните вход: /login")
+            await self.reply(message, self.login_prompt(message.chat.id))
             return
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.api_base_url}/api/subscriptions",
-                    headers={"Authorization": f"Bearer {token}"}
-                ) as response:
-                    if response.status == 200:
-                        subscriptions_data = await response.json()
-                        subscriptions = [Subscription(**self.convert_keys(sub)) for sub in subscriptions_data]
-                        
-                        if not subscriptions:
-                            await message.answer("📋 У вас пока нет подписок.\nДобавьте первую: /add")
-                        else:
-                            message_text = "📋 Ваши подписки:\n"
-                            for sub in subscriptions:
-                                message_text += f"• {sub.name} - {sub.price} {sub.currency} ({sub.billing_period})\n"
-                                message_text += f"  ID: {sub.id} | Следующий платеж: {sub.next_payment}\n"
-                                message_text += f"  Категория: {sub.category}\n"
-                            
-                            await message.answer(message_text)
+            subscriptions = await self.load_subscriptions(message.chat.id, token)
+            if subscriptions is not None:
+                if not subscriptions:
+                    await self.reply(message, "📋 У вас пока нет подписок.\nДобавьте первую: /add")
+                else:
+                    # Первая страница списка, остальные открываются кнопками навигации
+                    message_text, keyboard = self.list_renderer.render_page(subscriptions, 0)
+                    if keyboard is None:
+                        await self.reply(message, message_text)
                     else:
-                        await message.answer("❌ Ошибка при получении списка подписок")
-        except Exception as e:
-            print(f"List subscriptions error: {e}")
-            await message.answer("❌ Ошибка соединения с сервером")
+                        await self.reply(message, message_text, reply_markup=keyboard)
+            else:
+                await self.reply(message, "❌ Ошибка при получении списка подписок")
+        except Exception:
+            logger.exception("List subscriptions failed", extra={"chat_id": message.chat.id})
+            await self.reply(message, "❌ Ошибка соединения с сервером")
     
     async def handle_subscription_category(self, message: Message, state: FSMContext):
         """Обработка ввода категории подписки"""
         await state.update_data(category=message.text)
         await state.set_state(BotState.ADDING_SUBSCRIPTION_DATE)
-        await message.answer("📅 Введите дату следующего платежа (YYYY-MM-DD):")
+        await self.reply(message, "📅 Введите дату следующего платежа (YYYY-MM-DD):")
     
     async def handle_add_command(self, message: Message, state: FSMContext):
         """Обработка команды /add"""
         # Проверка аутентификации
-        token = self.user_tokens.get(message.chat.id)
+        token = await self.get_token(message.chat.id)
         if not token:
-            await message.answer("❌ Сначала выполните вход: /login")
+            await self.reply(message, self.login_prompt(message.chat.id))
             return
         
         await state.set_state(BotState.ADDING_SUBSCRIPTION_NAME)
-        await message.answer("📝 Введите название подписки:")
+        await self.reply(message, "📝 Введите название подписки:")
     
     async def handle_subscription_name(self, message: Message, state: FSMContext):
         """Обработка ввода названия подписки"""
         await state.update_data(name=message.text)
         await state.set_state(BotState.ADDING_SUBSCRIPTION_PRICE)
-        await message.answer("💰 Введите стоимость подписки:")
+        await self.reply(message, "💰 Введите стоимость подписки:")
     
     async def handle_subscription_price(self, message: Message, state: FSMContext):
         """Обработка ввода стоимости подписки"""
@@ -353,19 +648,13 @@ class SubTrackerBot:
         await state.set_state(BotState.ADDING_SUBSCRIPTION_CURRENCY)
         
         # Отправляем кнопки для выбора валюты
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="USD", callback_data="currency_USD")],
-            [InlineKeyboardButton(text="EUR", callback_data="currency_EUR")],
-            [InlineKeyboardButton(text="RUB", callback_data="currency_RUB")]
-        ])
-        await message.answer("💱 Выберите валюту:", reply_markup=keyboard)
+        await self.reply(message, CURRENCY_MENU.prompt, reply_markup=CURRENCY_MENU.markup)
     
     async def handle_subscription_currency(self, message: Message, state: FSMContext):
         """Обработка ввода валюты подписки"""
         await state.update_data(name=message.text)
         await state.set_state(BotState.ADDING_SUBSCRIPTION_PRICE)
-        await message.answer("💰 Введите стоимость подписки:")
+        await self.reply(message, "💰 Введите стоимость подписки:")
     
     async def handle_callback_query(self, callback_query: CallbackQuery, state: FSMContext):
         """Обработка callback-запросов от кнопок"""
@@ -373,71 +662,78 @@ class SubTrackerBot:
         message = callback_query.message
         
         # Обработка выбора валюты
-        if data.startswith("currency_"):
-            currency = data.split("_")[1]
-            supported_currencies = ["USD", "EUR", "RUB"]
-            if currency in supported_currencies:
-                await state.update_data(currency=currency)
+        if data.startswith(CURRENCY_MENU.prefix):
+            choice = CURRENCY_MENU.resolve(data)
+            if choice is not None:
+                await state.update_data(currency=choice.value)
                 await state.set_state(BotState.ADDING_SUBSCRIPTION_CYCLE)
                 await callback_query.answer()
-                await message.edit_text(f"💱 Валюта выбрана: {currency}")
+                await self.edit(message, choice.selected_text)
                 
                 # Отправляем кнопки для выбора цикла оплаты
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="Ежемесячно", callback_data="cycle_monthly")],
-                    [InlineKeyboardButton(text="Ежегодно", callback_data="cycle_yearly")]
-                ])
-                await message.answer("🔄 Выберите цикл оплаты:", reply_markup=keyboard)
+                await self.reply(message, CYCLE_MENU.prompt, reply_markup=CYCLE_MENU.markup)
             else:
-                await callback_query.answer("❌ Неподдерживаемая валюта")
+                await callback_query.answer(CURRENCY_MENU.error)
         
         # Обработка выбора цикла оплаты
-        elif data.startswith("cycle_"):
-            cycle_map = {
-                "cycle_monthly": "monthly",
-                "cycle_yearly": "yearly"
-            }
-            if data in cycle_map:
-                await state.update_data(billing_cycle=cycle_map[data])
+        elif data.startswith(CYCLE_MENU.prefix):
+            choice = CYCLE_MENU.resolve(data)
+            if choice is not None:
+                await state.update_data(billing_cycle=choice.value)
                 await state.set_state(BotState.ADDING_SUBSCRIPTION_CATEGORY)
                 await callback_query.answer()
-                await message.edit_text("🔄 Цикл оплаты выбран: " + ("ежемесячно" if data == "cycle_monthly" else "ежегодно"))
+                await self.edit(message, choice.selected_text)
                 
                 # Отправляем кнопки для выбора категории
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="Развлечения", callback_data="category_entertainment")],
-                    [InlineKeyboardButton(text="Продуктивность", callback_data="category_productivity")],
-                    [InlineKeyboardButton(text="Дизайн", callback_data="category_design")],
-                    [InlineKeyboardButton(text="Облачные сервисы", callback_data="category_cloud")],
-                    [InlineKeyboardButton(text="Музыка", callback_data="category_music")],
-                    [InlineKeyboardButton(text="Видео", callback_data="category_video")],
-                    [InlineKeyboardButton(text="Другое", callback_data="category_other")]
-                ])
-                await message.answer("📂 Выберите категорию подписки:", reply_markup=keyboard)
+                await self.reply(message, CATEGORY_MENU.prompt, reply_markup=CATEGORY_MENU.markup)
             else:
-                await callback_query.answer("❌ Неподдерживаемый цикл оплаты")
+                await callback_query.answer(CYCLE_MENU.error)
         
         # Обработка выбора категории
-        elif data.startswith("category_"):
-            category_map = {
-                "category_entertainment": "Entertainment",
-                "category_productivity": "Productivity",
-                "category_design": "Design",
-                "category_cloud": "Cloud Services",
-                "category_music": "Music",
-                "category_video": "Video",
-                "category_other": "Other"
-            }
-            if data in category_map:
-                await state.update_data(category=category_map[data])
+        elif data.startswith(CATEGORY_MENU.prefix):
+            choice = CATEGORY_MENU.resolve(data)
+            if choice is not None:
+                await state.update_data(category=choice.value)
                 await state.set_state(BotState.ADDING_SUBSCRIPTION_DATE)
                 await callback_query.answer()
-                await message.edit_text("📂 Категория выбрана: " + category_map[data])
-                await message.answer("📅 Введите дату следующего платежа (YYYY-MM-DD):")
+                await self.edit(message, choice.selected_text)
+                await self.reply(message, "📅 Введите дату следующего платежа (YYYY-MM-DD):")
             else:
-                await callback_query.answer("❌ Неподдерживаемая категория")
+                await callback_query.answer(CATEGORY_MENU.error)
+        
+        # Обработка перехода по страницам списка подписок
+        elif data.startswith(LIST_PAGE_PREFIX):
+            await self.handle_list_page(callback_query)
+    
+    async def handle_list_page(self, callback_query: CallbackQuery):
+        """Показ другой страницы списка подписок в том же сообщении"""
+        data = callback_query.data
+        if data == LIST_PAGE_NOOP:
+            await callback_query.answer()
+            return
+        
+        token = await self.get_token(callback_query.message.chat.id)
+        if not token:
+            await callback_query.answer(self.login_prompt(callback_query.message.chat.id))
+            return
+        
+        try:
+            page = int(data[len(LIST_PAGE_PREFIX):])
+            subscriptions = await self.load_subscriptions(callback_query.message.chat.id, token)
+        except Exception:
+            logger.exception("List page failed", extra={"chat_id": callback_query.message.chat.id})
+            subscriptions = None
+        if subscriptions is None:
+            await callback_query.answer("❌ Ошибка при получении списка подписок")
+            return
+        
+        await callback_query.answer()
+        if not subscriptions:
+            # Все подписки удалены после показа списка
+            await self.edit(callback_query.message, "📋 У вас пока нет подписок.\nДобавьте первую: /add")
+            return
+        message_text, keyboard = self.list_renderer.render_page(subscriptions, page)
+        await self.edit(callback_query.message, message_text, reply_markup=keyboard)
     
     async def handle_subscription_date(self, message: Message, state: FSMContext):
         """Обработка ввода даты следующего платежа и создание подписки"""
@@ -456,9 +752,9 @@ class SubTrackerBot:
     async def create_subscription(self, message: Message, subscription_data: dict):
         """Создание новой подписки"""
         # Проверка аутентификации
-        token = self.user_tokens.get(message.chat.id)
+        token = await self.get_token(message.chat.id)
         if not token:
-            await message.answer("❌ Ошибка авторизации")
+            await self.reply(message, "❌ Ошибка авторизации")
             return
         
         try:
@@ -473,134 +769,235 @@ class SubTrackerBot:
                 category=subscription_data.get("category", "Other")
             )
             
-            async with aiohttp.ClientSession() as session:
-                # Отладочный вывод
-                request_dict = asdict(create_request)
-                print(f"Request dict before conversion: {request_dict}")
-                print(f"Testing snake_to_camel: billing_period -> {self.snake_to_camel('billing_period')}")
-                # Тестовое преобразование
-                test_dict = {"billing_period": "monthly", "name": "Test", "price": "10"}
-                print(f"Test dict before conversion: {test_dict}")
-                test_converted = self.convert_keys_to_camel(test_dict)
-                print(f"Test dict after conversion: {test_converted}")
-                converted_dict = self.convert_keys_to_camel(request_dict)
-                print(f"Request dict after conversion: {converted_dict}")
-                
-                # Явная сериализация в JSON для проверки
-                import json as json_module
-                json_data = json_module.dumps(converted_dict)
-                print(f"JSON data being sent: {json_data}")
-                
-                async with session.post(
-                    f"{self.api_base_url}/api/subscriptions",
-                    data=json_data,
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "application/json"
-                    }
-                ) as response:
-                    if response.status == 201:
-                        await message.answer("✅ Подписка успешно создана!")
-                    else:
-                        await message.answer("❌ Ошибка при создании подписки")
+            response = await self.backend.request(
+                "POST", "/api/subscriptions", token=token, payload=encode_create_request(create_request)
+            )
+            if response.status == 201:
+                self.cache_created_subscription(message.chat.id, response)
+                await self.reply(message, "✅ Подписка успешно создана!")
+            else:
+                await self.reply(message, "❌ Ошибка при создании подписки")
+        except Exception:
+            logger.exception("Create subscription failed", extra={"chat_id": message.chat.id})
+            await self.reply(message, "❌ Ошибка соединения с сервером")
+    
+    def cache_created_subscription(self, chat_id: int, response):
+        """Добавление созданной подписки в кэш или сброс записи кэша"""
+        try:
+            created = decode_subscription(response.json())
+        except Exception:
+            # Ответ без тела подписки: список будет перечитан при следующем запросе
+            self.subscription_cache.invalidate(chat_id)
+            return
+        self.subscription_cache.add(chat_id, created)
+        self.reminders.add(chat_id, created)
+    
+    async def handle_import_command(self, message: Message, state: FSMContext):
+        """Обработка команды /import (файл можно приложить к сообщению с командой)"""
+        token = await self.get_token(message.chat.id)
+        if not token:
+            await self.reply(message, self.login_prompt(message.chat.id))
+            return
+        
+        if message.document is not None:
+            await self.import_document(message, token, state)
+            return
+        
+        await state.set_state(BotState.IMPORTING)
+        await self.reply(message, """
+📥 Отправьте файл CSV (с заголовком) или JSON (массив объектов или по объекту в строке).
+
+Поля: name, price, currency, billing_period, next_payment (YYYY-MM-DD), category, description.
+Допустимы и ключи camelCase: billingPeriod, nextPayment.
+        """.strip())
+    
+    async def handle_import_document(self, message: Message, state: FSMContext):
+        """Обработка файла, отправленного после команды /import"""
+        await state.clear()
+        token = await self.get_token(message.chat.id)
+        if not token:
+            await self.reply(message, self.login_prompt(message.chat.id))
+            return
+        await self.import_document(message, token, state)
+    
+    async def download_chunks(self, file_id: str) -> AsyncIterator[bytes]:
+        """Потоковая загрузка файла из Telegram по частям"""
+        try:
+            file = await self.bot.get_file(file_id)
+            url = self.bot.session.api.file_url(self.bot.token, file.file_path)
+            async for chunk in self.bot.session.stream_content(url, chunk_size=65536):
+                yield chunk
         except Exception as e:
-            print(f"Create subscription error: {e}")
-            await message.answer("❌ Ошибка соединения с сервером")
+            raise ImportFormatError(f"не удалось загрузить файл ({type(e).__name__})") from e
+    
+    async def import_document(self, message: Message, token: str, state: FSMContext):
+        """Создание подписок из строк загруженного файла"""
+        chat_id = message.chat.id
+        document = message.document
+        if document.file_size and document.file_size > self.import_max_file_size:
+            await self.reply(message, f"❌ Файл больше {self.import_max_file_size // 1024} КБ")
+            return
+        try:
+            rows = parse_rows(self.download_chunks(document.file_id), document.file_name or "")
+        except ImportFormatError as e:
+            await self.reply(message, f"❌ {e}")
+            return
+        
+        async def create(request: CreateSubscriptionRequest) -> Optional[str]:
+            response = await self.backend.request(
+                "POST", "/api/subscriptions", token=token, payload=encode_create_request(request)
+            )
+            if response.status != 201:
+                return f"ошибка backend API ({response.status})"
+            try:
+                self.reminders.add(chat_id, decode_subscription(response.json()))
+            except Exception:
+                # Напоминание будет добавлено при следующем чтении списка
+                pass
+            return None
+        
+        progress_message = await self.send_and_wait(chat_id, message.answer, "⏳ Импорт начат...")
+        
+        async def progress(report):
+            await self.edit(progress_message, render_progress(report))
+        
+        importer = SubscriptionImporter(
+            create,
+            max_concurrency=self.import_max_concurrency,
+            max_rows=self.import_max_rows,
+            progress=progress,
+            progress_interval=self.import_progress_interval,
+        )
+        try:
+            report = await importer.run(rows, str(chat_id))
+        except Exception:
+            logger.exception("Import failed", extra={"chat_id": chat_id})
+            await state.clear()
+            await self.edit(progress_message, "❌ Ошибка при импорте подписок")
+            return
+        finally:
+            # Один сброс кэша на весь импорт вместо копирования списка на каждую строку
+            self.subscription_cache.invalidate(chat_id)
+        logger.info("Import finished", extra={"chat_id": chat_id, "rows": report.total, "created_count": report.created})
+        await self.edit(progress_message, render_report(report))
+    
+    async def handle_export_command(self, message: Message, command: CommandObject):
+        """Обработка команды /export: выгрузка подписок в CSV или календарь iCalendar"""
+        chat_id = message.chat.id
+        export_format = (command.args or "csv").strip().lower()
+        if export_format not in EXPORT_FORMATS:
+            await self.reply(message, "❌ Использование: /export [csv|ics]")
+            return
+        
+        token = await self.get_token(chat_id)
+        if not token:
+            await self.reply(message, self.login_prompt(message.chat.id))
+            return
+        
+        try:
+            subscriptions = await self.load_subscriptions(chat_id, token)
+            if subscriptions is None:
+                await self.reply(message, "❌ Ошибка при получении списка подписок")
+                return
+            if not subscriptions:
+                await self.reply(message, "📋 У вас пока нет подписок для выгрузки")
+                return
+            
+            digest = await asyncio.to_thread(fingerprint, subscriptions, export_format)
+            file_id = self.export_cache.get(chat_id, export_format, digest)
+            if file_id is not None:
+                try:
+                    await self.send_and_wait(chat_id, self.bot.send_document, chat_id, file_id)
+                    return
+                except TelegramBadRequest:
+                    # Файл больше недоступен в Telegram: выгрузка формируется заново
+                    self.export_cache.invalidate(chat_id, export_format)
+            
+            # Формирование в отдельном потоке: большой список не блокирует цикл событий
+            spool = await asyncio.to_thread(build_export, subscriptions, export_format, self.export_spool_size)
+            try:
+                document = SpooledInputFile(spool, export_filename(export_format, date.today()))
+                sent = await self.send_and_wait(chat_id, self.bot.send_document, chat_id, document)
+            finally:
+                spool.close()
+            file_id = getattr(getattr(sent, "document", None), "file_id", None)
+            if file_id:
+                self.export_cache.set(chat_id, export_format, digest, file_id)
+        except Exception:
+            logger.exception("Export failed", extra={"chat_id": chat_id})
+            await self.reply(message, "❌ Ошибка при выгрузке подписок")
     
     async def handle_delete_command(self, message: Message, command: CommandObject):
         """Обработка команды /delete"""
         # Проверка аутентификации
-        token = self.user_tokens.get(message.chat.id)
+        token = await self.get_token(message.chat.id)
         if not token:
-            await message.answer("❌ Сначала выполните вход: /login")
+            await self.reply(message, self.login_prompt(message.chat.id))
             return
         
         # Проверка наличия аргумента
         if not command.args:
-            await message.answer("❌ Укажите ID подписки.\nПример: /delete abc123")
+            await self.reply(message, "❌ Укажите ID подписки.\nПример: /delete abc123")
             return
         
         subscription_id = command.args.strip()
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.delete(
-                    f"{self.api_base_url}/api/subscriptions/{subscription_id}",
-                    headers={"Authorization": f"Bearer {token}"}
-                ) as response:
-                    if response.status == 200:
-                        await message.answer("✅ Подписка успешно удалена!")
-                    else:
-                        await message.answer("❌ Ошибка при удалении подписки")
-        except Exception as e:
-            print(f"Delete subscription error: {e}")
-            await message.answer("❌ Ошибка соединения с сервером")
+            response = await self.backend.request("DELETE", f"/api/subscriptions/{subscription_id}", token=token)
+            # SubscriptionController.deleteSubscription отвечает 204 No Content (200 - для совместимости)
+            if response.status in (200, 204):
+                self.subscription_cache.remove(message.chat.id, subscription_id)
+                self.reminders.remove(message.chat.id, subscription_id)
+                await self.reply(message, "✅ Подписка успешно удалена!")
+            else:
+                await self.reply(message, "❌ Ошибка при удалении подписки")
+        except Exception:
+            logger.exception("Delete subscription failed", extra={"chat_id": message.chat.id})
+            await self.reply(message, "❌ Ошибка соединения с сервером")
     
     async def handle_stats_command(self, message: Message):
         """Обработка команды /stats"""
         # Проверка аутентификации
-        token = self.user_tokens.get(message.chat.id)
+        token = await self.get_token(message.chat.id)
         if not token:
-            await message.answer("❌ Сначала выполните вход: /login")
+            await self.reply(message, self.login_prompt(message.chat.id))
             return
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.api_base_url}/api/subscriptions",
-                    headers={"Authorization": f"Bearer {token}"}
-                ) as response:
-                    if response.status == 200:
-                        subscriptions_data = await response.json()
-                        subscriptions = [Subscription(**self.convert_keys(sub)) for sub in subscriptions_data]
-                        
-                        if not subscriptions:
-                            await message.answer("📊 У вас пока нет подписок для анализа")
-                        else:
-                            # Рассчитываем статистику
-                            total_monthly = sum(float(sub.price) for sub in subscriptions)
-                            
-                            total_yearly = 0
-                            for sub in subscriptions:
-                                price = float(sub.price)
-                                if sub.billing_period.lower() == "monthly":
-                                    total_yearly += price * 12
-                                elif sub.billing_period.lower() == "yearly":
-                                    total_yearly += price
-                                else:
-                                    total_yearly += price  # Для других циклов оставляем как есть
-                            
-                            # Находим самую дешевую и самую дорогую подписку
-                            cheapest = min(subscriptions, key=lambda x: float(x.price))
-                            most_expensive = max(subscriptions, key=lambda x: float(x.price))
-                            
-                            # Формируем сообщение со статистикой
-                            stats_message = "📊 Статистика ваших подписок:\n"
-                            stats_message += f"💰 Всего подписок: {len(subscriptions)}\n"
-                            stats_message += f"💵 Общие расходы в месяц: ${total_monthly:.2f}\n"
-                            stats_message += f"💵 Общие расходы в год: ${total_yearly:.2f}\n"
-                            stats_message += f"💚 Самая дешевая: {cheapest.name} - {cheapest.price} {cheapest.currency}\n"
-                            stats_message += f"💔 Самая дорогая: {most_expensive.name} - {most_expensive.price} {most_expensive.currency}\n"
-                            
-                            await message.answer(stats_message)
-                    else:
-                        await message.answer("❌ Ошибка при получении статистики")
-        except Exception as e:
-            print(f"Stats error: {e}")
-            await message.answer("❌ Ошибка соединения с сервером")
+            subscriptions = await self.load_subscriptions(message.chat.id, token)
+            if subscriptions is not None:
+                if not subscriptions:
+                    await self.reply(message, "📊 У вас пока нет подписок для анализа")
+                else:
+                    # Рассчитываем статистику за один проход
+                    stats_message = render_stats(compute_stats(subscriptions))
+                    
+                    await self.reply(message, stats_message)
+            else:
+                await self.reply(message, "❌ Ошибка при получении статистики")
+        except Exception:
+            logger.exception("Stats failed", extra={"chat_id": message.chat.id})
+            await self.reply(message, "❌ Ошибка соединения с сервером")
     
     async def handle_text(self, message: Message, state: FSMContext):
         """Обработка всех остальных текстовых сообщений"""
-        await message.answer("❓ Используйте команды для взаимодействия. /help - для справки")
+        await self.reply(message, "❓ Используйте команды для взаимодействия. /help - для справки")
 
 
 async def main():
     """Главная функция для запуска бота"""
+    log_listener = setup_logging_from_env()
     try:
-        bot = SubTrackerBot()
-        await bot.start()
-    except Exception as e:
-        print(f"Error starting bot: {e}")
+        # BOT_WORKERS > 1: входной процесс распределяет обновления по рабочим процессам
+        if int(os.getenv("BOT_WORKERS", "1")) > 1:
+            await Supervisor().start()
+        else:
+            bot = SubTrackerBot()
+            await bot.start()
+    except Exception:
+        logger.exception("Error starting bot")
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
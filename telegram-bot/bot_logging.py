@@ -0,0 +1,148 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from typing import IO, Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+
+
+logger = logging.getLogger("bot.handlers")
+
+# Атрибуты LogRecord, которые не являются полями события
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирование записи журнала как одной строки JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        # Поля, переданные через extra={...}
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                event[key] = value
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            event["exc"] = record.exc_text
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Пропуск только каждого N-го отладочного события с одинаковым шаблоном текста"""
+
+    # Ограничение числа отслеживаемых шаблонов; остальные делят общий счетчик
+    MAX_KEYS = 10000
+
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[Any, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        key: Any = (record.name, record.msg)
+        count = self._counts.get(key)
+        if count is None:
+            if len(self._counts) >= self.MAX_KEYS:
+                key = None
+            count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Разбор уровней по модулям: "backend_client=DEBUG,aiogram=WARNING" """
+    levels: Dict[str, int] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        if not level or not isinstance(logging.getLevelName(level.strip().upper()), int):
+            raise ValueError(f"Invalid log level specification: {item!r}")
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def setup_logging(
+    level: str = "INFO",
+    module_levels: str = "",
+    json_format: bool = True,
+    debug_sample_every: int = 1,
+    stream: Optional[IO[str]] = None,
+) -> logging.handlers.QueueListener:
+    """Настройка журнала: записи кладутся в очередь, вывод выполняет фоновый поток
+
+    Возвращает запущенный QueueListener; его stop() дописывает оставшиеся записи.
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    # Выборка выполняется до постановки в очередь: отброшенные события почти ничего не стоят
+    handler.addFilter(DebugSampler(debug_sample_every))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def setup_logging_from_env() -> logging.handlers.QueueListener:
+    """Настройка журнала по переменным окружения LOG_*"""
+    return setup_logging(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        module_levels=os.getenv("LOG_LEVELS", ""),
+        json_format=os.getenv("LOG_FORMAT", "json").lower() == "json",
+        debug_sample_every=int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "1")),
+    )
+
+
+class HandlerLoggingMiddleware(BaseMiddleware):
+    """События журнала по обработке обновлений: чат, обработчик и длительность"""
+
+    def __init__(self, slow_threshold: float = 1.0):
+        self.slow_threshold = slow_threshold
+
+    async def __call__(self, handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+        except Exception:
+            logger.exception("Handler failed", extra=self._fields(data, started))
+            raise
+        latency = time.perf_counter() - started
+        if latency >= self.slow_threshold:
+            logger.warning("Slow handler", extra=self._fields(data, started))
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Handled update", extra=self._fields(data, started))
+        return result
+
+    @staticmethod
+    def _fields(data: Dict[str, Any], started: float) -> Dict[str, Any]:
+        chat = data.get("event_chat")
+        handler_object = data.get("handler")
+        return {
+            "chat_id": getattr(chat, "id", None),
+            "handler": getattr(getattr(handler_object, "callback", None), "__name__", "unknown"),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
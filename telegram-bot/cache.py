@@ -0,0 +1,108 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _CacheEntry:
+    __slots__ = ("token", "expires_at", "subscriptions")
+
+    def __init__(self, token: str, expires_at: float, subscriptions: List[Any]):
+        self.token = token
+        self.expires_at = expires_at
+        self.subscriptions = subscriptions
+
+
+class SubscriptionCache:
+    """Кэш декодированных списков подписок по chat_id с TTL и вытеснением LRU"""
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        # Поколение списка чата: номер последнего изменения (создание, удаление, сброс).
+        # Хранятся max_size последних измененных чатов; у вытесненных поколение
+        # считается равным номеру последнего вытесненного изменения
+        self._generations: "OrderedDict[int, int]" = OrderedDict()
+        self._version = 0
+        self._forgotten = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, chat_id: int, token: str) -> Optional[List[Any]]:
+        """Получение списка подписок из кэша (None при промахе)"""
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        # Запись другого токена или устаревшая запись считается промахом
+        if entry.token != token or entry.expires_at <= self._clock():
+            del self._entries[chat_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(chat_id)
+        self.hits += 1
+        return entry.subscriptions
+
+    def set(self, chat_id: int, token: str, subscriptions: List[Any]):
+        """Сохранение списка подписок в кэш"""
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        self._entries[chat_id] = _CacheEntry(token, self._clock() + self.ttl, subscriptions)
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def generation(self, chat_id: int) -> int:
+        """Поколение списка чата: запоминается до запроса к backend API и сравнивается после
+
+        Если поколение изменилось, за время запроса подписки создавались или
+        удалялись, и полученный список мог устареть.
+        """
+        return self._generations.get(chat_id, self._forgotten)
+
+    def _bump(self, chat_id: int):
+        self._version += 1
+        self._generations[chat_id] = self._version
+        self._generations.move_to_end(chat_id)
+        while len(self._generations) > max(self.max_size, 0):
+            _, self._forgotten = self._generations.popitem(last=False)
+
+    def invalidate(self, chat_id: int):
+        """Удаление записи чата из кэша"""
+        self._bump(chat_id)
+        self._entries.pop(chat_id, None)
+
+    def add(self, chat_id: int, subscription: Any):
+        """Добавление созданной подписки в закэшированный список"""
+        self._bump(chat_id)
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            # Новый список, чтобы не менять уже выданные обработчикам объекты
+            entry.subscriptions = [*entry.subscriptions, subscription]
+
+    def remove(self, chat_id: int, subscription_id: str):
+        """Удаление подписки из закэшированного списка"""
+        self._bump(chat_id)
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            entry.subscriptions = [sub for sub in entry.subscriptions if sub.id != subscription_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов кэша"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
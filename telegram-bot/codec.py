@@ -0,0 +1,85 @@
+import json
+from datetime import date
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, Union
+
+# Быстрые библиотеки JSON необязательны: без них используется стандартный json
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - зависит от окружения
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Значения моделей, которые стандартный json не умеет кодировать"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JsonCodec:
+    """Разбор и кодирование JSON одной из доступных библиотек"""
+
+    __slots__ = ("name", "loads", "dumps")
+
+    def __init__(self, name: str, loads: Callable[[Union[bytes, str]], Any], dumps: Callable[[Any], bytes]):
+        self.name = name
+        self.loads = loads
+        # dumps возвращает bytes в UTF-8
+        self.dumps = dumps
+
+    def dumps_str(self, value: Any) -> str:
+        """Кодирование в строку (для aiohttp web.json_response и сессии aiogram)"""
+        return self.dumps(value).decode()
+
+    def __repr__(self) -> str:
+        return f"JsonCodec({self.name!r})"
+
+
+def _stdlib_codec() -> JsonCodec:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+    return JsonCodec("json", json.loads, lambda value: encoder.encode(value).encode())
+
+
+def _orjson_codec() -> JsonCodec:
+    return JsonCodec("orjson", orjson.loads, lambda value: orjson.dumps(value, default=_default))
+
+
+def _msgspec_codec() -> JsonCodec:
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    decoder = msgspec.json.Decoder()
+    return JsonCodec("msgspec", decoder.decode, encoder.encode)
+
+
+# Порядок предпочтения при автоматическом выборе
+CODECS: Dict[str, Callable[[], JsonCodec]] = {}
+if msgspec is not None:
+    CODECS["msgspec"] = _msgspec_codec
+if orjson is not None:
+    CODECS["orjson"] = _orjson_codec
+CODECS["json"] = _stdlib_codec
+
+
+def get_codec(name: str = "auto") -> JsonCodec:
+    """Кодек по имени (msgspec, orjson, json) или самый быстрый из установленных"""
+    name = (name or "auto").lower()
+    if name == "auto":
+        return next(iter(CODECS.values()))()
+    factory = CODECS.get(name)
+    if factory is None:
+        raise ValueError(f"JSON codec {name!r} is not available, installed: {', '.join(CODECS)}")
+    return factory()
+
+
+# Кодек по умолчанию для модулей, которым его не передали явно
+default_codec = get_codec()
@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+from aiogram import BaseMiddleware
+
+
+# Обработка уже выполняется исполнителем: вложенный вызов (например, рабочий
+# процесс передает в диспетчер обновление, полученное через исполнитель) не
+# ставится в очередь повторно
+_inside = contextvars.ContextVar("update_executor_inside", default=False)
+
+
+class UpdateExecutor:
+    """Порядок обработки обновлений: по одному на чат и не больше max_concurrency всего
+
+    Обновления одного чата выполняются по очереди в порядке поступления,
+    разных чатов - параллельно. Обновление сначала ждет своей очереди в чате,
+    затем свободного места в общем лимите, поэтому ожидающие обновления одного
+    чата не занимают места, нужные другим чатам. Обработка идет в задаче
+    вызывающего (задаче polling, webhook или рабочего процесса), исполнитель
+    только задерживает ее начало.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 100,
+        on_wait: Optional[Callable[[float], Any]] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        # Вызывается со временем ожидания каждого обновления в секундах (гистограмма метрик)
+        self.on_wait = on_wait
+        self._clock = clock
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        # Чат -> ожидающие обновления; чат в словаре, пока выполняется его обновление
+        self._chats: Dict[Hashable, Deque[asyncio.Future]] = {}
+
+        self.queued = 0
+        self.running = 0
+        self.submitted_total = 0
+        self.started_total = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def run(self, key: Hashable, job: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнение job в очереди чата key; возвращает результат job"""
+        if _inside.get():
+            return await job()
+        self.submitted_total += 1
+        started = self._clock()
+        self.queued += 1
+        try:
+            await self._acquire_chat(key)
+            try:
+                await self._slots.acquire()
+            except BaseException:
+                self._release_chat(key)
+                raise
+        finally:
+            self.queued -= 1
+
+        waited = self._clock() - started
+        self.started_total += 1
+        self.wait_seconds_total += waited
+        if waited > self.max_wait_seconds:
+            self.max_wait_seconds = waited
+        if self.on_wait is not None:
+            self.on_wait(waited)
+
+        self.running += 1
+        token = _inside.set(True)
+        try:
+            return await job()
+        finally:
+            _inside.reset(token)
+            self.running -= 1
+            self._slots.release()
+            self._release_chat(key)
+
+    async def _acquire_chat(self, key: Hashable):
+        waiters = self._chats.get(key)
+        if waiters is None:
+            self._chats[key] = deque()
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Очередь чата уже передана этому обновлению: передается следующему
+                self._release_chat(key)
+            elif waiter in waiters:
+                waiters.remove(waiter)
+            raise
+
+    def _release_chat(self, key: Hashable):
+        waiters = self._chats[key]
+        while waiters:
+            waiter = waiters.popleft()
+            # Отмененные ожидания удаляются из очереди при возобновлении своих задач
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        del self._chats[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Загрузка: выполняемые и ожидающие обновления, длина самой длинной очереди чата"""
+        started = self.started_total
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "queued": self.queued,
+            "active_chats": len(self._chats),
+            "max_chat_queue": max((len(waiters) for waiters in self._chats.values()), default=0),
+            "submitted_total": self.submitted_total,
+            "avg_wait_ms": round(self.wait_seconds_total / started * 1000, 3) if started else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+def update_key(event: Any, data: Dict[str, Any]) -> Hashable:
+    """Ключ очереди обновления: чат, иначе пользователь, иначе само обновление"""
+    chat = data.get("event_chat")
+    if chat is not None:
+        return chat.id
+    user = data.get("event_from_user")
+    if user is not None:
+        return user.id
+    return getattr(event, "update_id", None)
+
+
+class ExecutorMiddleware(BaseMiddleware):
+    """Обработка обновлений диспетчера через UpdateExecutor
+
+    Регистрируется внешним middleware после встроенных middleware aiogram,
+    которые определяют чат и пользователя обновления.
+    """
+
+    def __init__(self, executor: UpdateExecutor):
+        self.executor = executor
+
+    async def __call__(self, handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        return await self.executor.run(update_key(event, data), lambda: handler(event, data))
@@ -0,0 +1,222 @@
+import csv
+import hashlib
+import tempfile
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import IO, TYPE_CHECKING, Any, AsyncGenerator, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from aiogram.types import InputFile
+
+from models import BillingCycle, Subscription
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+# Поля CSV совпадают с полями /import, поэтому выгрузку можно загрузить обратно
+# (id и is_active при загрузке не используются: подписки создаются заново)
+CSV_FIELDS = ("id", "name", "price", "currency", "billing_period", "next_payment", "category", "description", "is_active")
+# Число строк, которые форматируются перед одной записью в буфер
+WRITE_BATCH = 500
+# Максимальная длина строки iCalendar в байтах (RFC 5545, 3.1)
+ICS_LINE_LIMIT = 75
+
+_RRULES = {
+    BillingCycle.WEEKLY: "FREQ=WEEKLY",
+    BillingCycle.MONTHLY: "FREQ=MONTHLY",
+    BillingCycle.YEARLY: "FREQ=YEARLY",
+}
+
+
+class _Utf8Writer:
+    """Запись текста csv.writer в двоичный буфер"""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: IO[bytes]):
+        self.raw = raw
+
+    def write(self, text: str) -> int:
+        return self.raw.write(text.encode())
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def write_csv(subscriptions: Iterable[Subscription], out: IO[bytes]):
+    """Запись подписок в CSV с заголовком"""
+    writer = csv.writer(_Utf8Writer(out), lineterminator="\r\n")
+    writer.writerow(CSV_FIELDS)
+    batch = []
+    for sub in subscriptions:
+        batch.append((
+            sub.id, sub.name, _text(sub.price), sub.currency, sub.billing_period.value,
+            _text(sub.next_payment), sub.category, _text(sub.description), "true" if sub.is_active else "false",
+        ))
+        if len(batch) >= WRITE_BATCH:
+            writer.writerows(batch)
+            batch.clear()
+    writer.writerows(batch)
+
+
+def _ics_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _ics_fold(line: str) -> str:
+    """Перенос строки длиннее 75 байт с продолжением через пробел"""
+    if len(line) <= ICS_LINE_LIMIT and line.isascii():
+        return line + "\r\n"
+    data = line.encode()
+    if len(data) <= ICS_LINE_LIMIT:
+        return line + "\r\n"
+    parts = []
+    start = 0
+    limit = ICS_LINE_LIMIT
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Перенос не должен разрывать многобайтовый символ UTF-8
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode())
+        start = end
+        limit = ICS_LINE_LIMIT - 1
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_event(sub: Subscription, stamp: str) -> Iterator[str]:
+    price = f"{sub.price} {sub.currency}" if sub.price is not None else sub.currency
+    yield "BEGIN:VEVENT"
+    yield f"UID:{_ics_escape(sub.id)}@subtracker"
+    yield f"DTSTAMP:{stamp}"
+    yield f"DTSTART;VALUE=DATE:{sub.next_payment:%Y%m%d}"
+    yield f"RRULE:{_RRULES[sub.billing_period]}"
+    yield f"SUMMARY:{_ics_escape(f'💳 {sub.name}: {price}')}"
+    yield f"CATEGORIES:{_ics_escape(sub.category)}"
+    if sub.description:
+        yield f"DESCRIPTION:{_ics_escape(sub.description)}"
+    yield "TRANSP:TRANSPARENT"
+    yield "END:VEVENT"
+
+
+def write_ics(subscriptions: Iterable[Subscription], out: IO[bytes], now: Optional[datetime] = None):
+    """Запись календаря iCalendar с повторяющимися событиями платежей
+
+    В календарь попадают активные подписки с датой следующего платежа;
+    повторение задается циклом оплаты.
+    """
+    stamp = (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+    out.write(b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//SubTracker//Telegram Bot//RU\r\nCALSCALE:GREGORIAN\r\n")
+    batch = []
+    for sub in subscriptions:
+        if not sub.is_active or sub.next_payment is None:
+            continue
+        batch.extend(_ics_fold(line) for line in _ics_event(sub, stamp))
+        if len(batch) >= WRITE_BATCH:
+            out.write("".join(batch).encode())
+            batch.clear()
+    out.write("".join(batch).encode())
+    out.write(b"END:VCALENDAR\r\n")
+
+
+# Формат выгрузки -> (функция записи, расширение файла)
+EXPORT_FORMATS = {
+    "csv": (write_csv, "csv"),
+    "ics": (write_ics, "ics"),
+}
+
+
+def fingerprint(subscriptions: Iterable[Subscription], export_format: str) -> str:
+    """Хеш содержимого выгрузки: одинаков, пока не изменились данные подписок"""
+    digest = hashlib.blake2b(export_format.encode(), digest_size=16)
+    for sub in subscriptions:
+        digest.update("\x1f".join((
+            sub.id, sub.name, _text(sub.price), sub.currency, sub.billing_period.value,
+            _text(sub.next_payment), sub.category, _text(sub.description), "1" if sub.is_active else "0",
+        )).encode())
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def build_export(subscriptions: Sequence[Subscription], export_format: str, spool_size: int) -> "tempfile.SpooledTemporaryFile":
+    """Запись выгрузки в буфер, который после spool_size байт переносится во временный файл"""
+    write, _ = EXPORT_FORMATS[export_format]
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    try:
+        write(subscriptions, spool)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+def export_filename(export_format: str, today: date) -> str:
+    _, extension = EXPORT_FORMATS[export_format]
+    return f"subscriptions-{today.isoformat()}.{extension}"
+
+
+class SpooledInputFile(InputFile):
+    """Отправка буфера выгрузки в Telegram по частям, без копии в памяти"""
+
+    def __init__(self, spool: IO[bytes], filename: str, chunk_size: int = 65536):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.spool = spool
+
+    async def read(self, bot: "Bot") -> AsyncGenerator[bytes, None]:
+        # Повторная отправка (например, после 429) читает буфер с начала
+        self.spool.seek(0)
+        while chunk := self.spool.read(self.chunk_size):
+            yield chunk
+
+
+class ExportCache:
+    """Идентификаторы уже отправленных файлов выгрузки по чату и формату
+
+    Telegram позволяет отправить загруженный файл повторно по file_id, поэтому
+    при неизменных данных выгрузка не формируется и не загружается заново.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[str, str]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, chat_id: int, export_format: str, digest: str) -> Optional[str]:
+        """file_id выгрузки с тем же хешем содержимого (None при промахе)"""
+        key = (chat_id, export_format)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != digest:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, chat_id: int, export_format: str, digest: str, file_id: str):
+        if self.max_size <= 0:
+            return
+        key = (chat_id, export_format)
+        self._entries[key] = (digest, file_id)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, chat_id: int, export_format: str):
+        self._entries.pop((chat_id, export_format), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов кэша"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
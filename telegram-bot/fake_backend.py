@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Локальная замена backend API SubTracker для тестов и нагрузочных прогонов
+
+Приложение aiohttp хранит пользователей и подписки в памяти и отвечает на те
+же запросы, что и backend на Kotlin: /api/login, /api/subscriptions
+(GET/POST/DELETE) и /api/health. Задержка ответа, доля ошибок и число
+подписок у пользователя настраиваются; случайные значения берутся из
+генератора с фиксированным seed, поэтому прогоны повторяемы.
+
+Запуск: python fake_backend.py --port 8080 --latency 5 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import socket
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+
+
+CYCLES = ("monthly", "yearly", "weekly")
+CATEGORIES = ("Entertainment", "Productivity", "Music", "Video", "Other")
+CURRENCIES = ("USD", "EUR", "RUB")
+# Поля, без которых backend отклоняет создание подписки
+REQUIRED_FIELDS = ("name", "price", "currency", "billingPeriod", "nextPayment")
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class FakeBackend:
+    """Backend API SubTracker в памяти с настраиваемой задержкой и ошибками
+
+    Задержка latency (плюс равномерный разброс до jitter) добавляется к каждому
+    ответу, а доля error_rate запросов (кроме /api/health) получает 500 до
+    обработки, как при сбое backend. Подписки пользователя создаются при первом
+    обращении: subscriptions штук, одинаковые для одного и того же userId.
+    Если users не задан, вход выполняется с любым непустым паролем.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        subscriptions: int = 20,
+        users: Optional[Dict[str, str]] = None,
+        token_ttl: float = 86400.0,
+        secret: str = "fake-backend-secret",
+        seed: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.subscriptions = subscriptions
+        self.users = users
+        self.token_ttl = token_ttl
+        self._secret = secret.encode()
+        self._random = random.Random(seed)
+        self._clock = clock
+        # username -> userId (выдаются по порядку первого входа)
+        self._user_ids: Dict[str, str] = {}
+        # userId -> id подписки -> JSON объект подписки
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # userId -> тело ответа GET /api/subscriptions (сбрасывается при изменении)
+        self._bodies: Dict[str, bytes] = {}
+        self._next_id = 0
+
+        self.requests: Dict[Tuple[str, str], int] = {}
+        self.errors_injected = 0
+
+        self.app = web.Application(middlewares=[self._simulate])
+        self.app.router.add_post("/api/login", self.handle_login)
+        self.app.router.add_get("/api/subscriptions", self.handle_list)
+        self.app.router.add_post("/api/subscriptions", self.handle_create)
+        self.app.router.add_delete("/api/subscriptions/{id}", self.handle_delete)
+        self.app.router.add_get("/api/health", self.handle_health)
+        self._runner: Optional[web.AppRunner] = None
+        self._socket: Optional[socket.socket] = None
+        self.url = ""
+
+    def bind(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Открытие слушающего сокета до запуска цикла событий; возвращает базовый URL
+
+        Адрес известен заранее, поэтому его можно передать боту при создании
+        (например, в синхронной фикстуре pytest), а сервер запустить позже.
+        """
+        self._socket = socket.create_server((host, port))
+        self.url = f"http://{host}:{self._socket.getsockname()[1]}"
+        return self.url
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запуск сервера на сокете bind() или на host:port (port=0 - свободный порт)"""
+        if self._socket is None:
+            self.bind(host, port)
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, self._socket).start()
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        self.close()
+
+    def close(self):
+        """Закрытие сокета (сервер не запускался или уже остановлен)"""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    async def __aenter__(self) -> "FakeBackend":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    # --- Токены ---
+
+    def user_id(self, username: str) -> str:
+        user_id = self._user_ids.get(username)
+        if user_id is None:
+            user_id = self._user_ids[username] = str(len(self._user_ids) + 1)
+        return user_id
+
+    def token_for(self, user_id: Any, ttl: Optional[float] = None) -> str:
+        """JWT пользователя с claim userId (для тестов, где вход не нужен)"""
+        now = int(self._clock())
+        header = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+        claims = {"sub": str(user_id), "userId": str(user_id), "iat": now, "exp": now + int(self.token_ttl if ttl is None else ttl)}
+        payload = _b64(json.dumps(claims).encode())
+        signature = _b64(hmac.new(self._secret, f"{header}.{payload}".encode(), hashlib.sha256).digest())
+        return f"{header}.{payload}.{signature}"
+
+    def _authenticate(self, request: web.Request) -> Optional[str]:
+        """userId из заголовка Authorization (None, если токен неверен или истек)"""
+        authorization = request.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer "):
+            return None
+        token = authorization[len("Bearer "):]
+        parts = token.split(".")
+        if len(parts) != 3:
+            return None
+        expected = _b64(hmac.new(self._secret, f"{parts[0]}.{parts[1]}".encode(), hashlib.sha256).digest())
+        if not hmac.compare_digest(parts[2], expected):
+            return None
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+        if claims.get("exp", 0) <= self._clock():
+            return None
+        return claims.get("userId")
+
+    # --- Данные ---
+
+    def _generate(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Подписки пользователя по умолчанию (зависят только от userId)"""
+        today = date.fromtimestamp(self._clock())
+        items = {}
+        for i in range(self.subscriptions):
+            subscription_id = f"{user_id}-{i}"
+            items[subscription_id] = {
+                "id": subscription_id,
+                "userId": user_id,
+                "name": f"Subscription {i}",
+                "price": f"{i % 100}.99",
+                "currency": CURRENCIES[i % len(CURRENCIES)],
+                "billingPeriod": CYCLES[i % len(CYCLES)],
+                "nextPayment": (today + timedelta(days=i % 30)).isoformat(),
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "description": None,
+                "isActive": True,
+            }
+        return items
+
+    def subscriptions_of(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        items = self._data.get(user_id)
+        if items is None:
+            items = self._data[user_id] = self._generate(user_id)
+        return items
+
+    # --- Обработчики ---
+
+    @web.middleware
+    async def _simulate(self, request: web.Request, handler):
+        route = request.match_info.route.resource
+        key = (request.method, route.canonical if route is not None else request.path)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and request.path != "/api/health" and self._random.random() < self.error_rate:
+            self.errors_injected += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+        return await handler(request)
+
+    async def handle_login(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+            username = str(body["username"])
+            password = str(body["password"])
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"success": False, "message": "Некорректный запрос"}, status=400)
+        valid = password != "" if self.users is None else self.users.get(username) == password
+        if not username or not valid:
+            return web.json_response({"success": False, "message": "Неверное имя пользователя или пароль"}, status=401)
+        return web.json_response({
+            "success": True,
+            "message": "Вход выполнен успешно",
+            "token": self.token_for(self.user_id(username)),
+        })
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        user_id = self._authenticate(request)
+        if user_id is None:
+            return web.Response(status=401)
+        body = self._bodies.get(user_id)
+        if body is None:
+            body = self._bodies[user_id] = json.dumps(list(self.subscriptions_of(user_id).values())).encode()
+        return web.Response(body=body, content_type="application/json")
+
+    async def handle_create(self, request: web.Request) -> web.Response:
+        user_id = self._authenticate(request)
+        if user_id is None:
+            return web.Response(status=401)
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(body, dict) or any(body.get(name) in (None, "") for name in REQUIRED_FIELDS):
+            return web.Response(status=400)
+        self._next_id += 1
+        subscription_id = f"created-{self._next_id}"
+        subscription = {
+            "id": subscription_id,
+            "userId": str(body.get("userId") or user_id),
+            "name": body["name"],
+            "price": str(body["price"]),
+            "currency": body["currency"],
+            "billingPeriod": body["billingPeriod"],
+            "nextPayment": body["nextPayment"],
+            "category": body.get("category") or "Other",
+            "description": body.get("description"),
+            "isActive": True,
+        }
+        self.subscriptions_of(user_id)[subscription_id] = subscription
+        self._bodies.pop(user_id, None)
+        return web.json_response(subscription, status=201)
+
+    async def handle_delete(self, request: web.Request) -> web.Response:
+        user_id = self._authenticate(request)
+        if user_id is None:
+            return web.Response(status=401)
+        if self.subscriptions_of(user_id).pop(request.match_info["id"], None) is None:
+            return web.Response(status=404)
+        self._bodies.pop(user_id, None)
+        return web.Response(status=204)
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "UP", "component": "fake-backend"})
+
+    def stats(self) -> Dict[str, Any]:
+        """Число запросов по маршрутам и внесенных ошибок"""
+        return {
+            "requests": {f"{method} {path}": count for (method, path), count in sorted(self.requests.items())},
+            "errors_injected": self.errors_injected,
+            "users": len(self._data),
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайный разброс задержки, мс")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500 (0-1)")
+    parser.add_argument("--subscriptions", type=int, default=20, help="подписок у каждого пользователя")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backend = FakeBackend(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        subscriptions=args.subscriptions,
+        seed=args.seed,
+    )
+    url = await backend.start(args.host, args.port)
+    print(f"Fake backend API: {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await backend.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,276 @@
+import asyncio
+import codecs
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models import BillingCycle, CreateSubscriptionRequest, parse_date, parse_price
+from schema import CREATE_REQUEST_FIELDS
+
+
+REQUIRED_FIELDS = ("name", "price", "currency", "billing_period", "next_payment")
+NAME_LIMIT = 255
+# Циклы оплаты, которые хранит backend (в меню /add предлагается только часть)
+BILLING_PERIODS = frozenset(cycle.value for cycle in BillingCycle)
+# Длина значения из файла в тексте ошибки
+SHOWN_LIMIT = 40
+# Число строк с ошибками, которые показываются в отчете
+REPORT_ERRORS_LIMIT = 20
+
+
+class ImportFormatError(Exception):
+    """Файл не удалось загрузить или разобрать как CSV или JSON"""
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Строки текста из потока байтов UTF-8 (BOM пропускается)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def parse_csv(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """Потоковый разбор CSV с заголовком: (номер строки файла, значения по столбцам)"""
+    header: Optional[List[str]] = None
+    record = ""
+    line_number = 0
+    record_line = 1
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not record:
+            record_line = line_number
+        record += line
+        # Запись не закончена, пока внутри кавычек (перевод строки в значении)
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not values or not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        yield record_line, dict(zip(header, values))
+    if record:
+        raise ImportFormatError(f"незакрытые кавычки в строке {record_line}")
+    if header is None:
+        raise ImportFormatError("пустой файл")
+
+
+async def parse_json(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """Потоковый разбор массива JSON объектов или JSON Lines: (номер объекта, объект)"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    index = 0
+    async for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        position = 0
+        while True:
+            # Разделители между объектами: пробелы, запятые и скобки массива
+            while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+                position += 1
+            if position >= len(buffer):
+                break
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Объект еще не получен целиком
+                break
+            if end == len(buffer) and not isinstance(value, (dict, list)):
+                # Число или литерал на границе блока мог быть обрезан
+                break
+            index += 1
+            position = end
+            yield index, value
+        buffer = buffer[position:]
+    buffer = buffer.strip(" \t\r\n,[]")
+    if buffer:
+        try:
+            value, _ = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f"некорректный JSON после объекта {index}: {e.msg}")
+        yield index + 1, value
+
+
+def parse_rows(chunks: AsyncIterable[bytes], filename: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Выбор разбора по расширению файла"""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return parse_csv(chunks)
+    if name.endswith((".json", ".jsonl", ".ndjson")):
+        return parse_json(chunks)
+    raise ImportFormatError("поддерживаются файлы .csv и .json")
+
+
+def _shown(value: Any) -> str:
+    text = str(value)
+    return repr(text if len(text) <= SHOWN_LIMIT else text[:SHOWN_LIMIT - 1] + "…")
+
+
+def validate_row(raw: Any, user_id: str) -> CreateSubscriptionRequest:
+    """Проверка строки файла и создание запроса (ValueError с описанием ошибки)"""
+    if not isinstance(raw, dict):
+        raise ValueError("строка должна быть объектом")
+    values: Dict[str, Any] = {}
+    for key, value in raw.items():
+        name = CREATE_REQUEST_FIELDS.get(str(key).strip())
+        if name is not None and name != "user_id":
+            # Списки и объекты JSON не разбираются (и не хешируются кэшами разбора)
+            if value is not None and not isinstance(value, (str, int, float)):
+                raise ValueError(f"некорректное значение поля {name}")
+            values[name] = value.strip() if isinstance(value, str) else value
+    missing = [name for name in REQUIRED_FIELDS if values.get(name) in (None, "")]
+    if missing:
+        raise ValueError(f"нет полей: {', '.join(missing)}")
+
+    name = str(values["name"])
+    if len(name) > NAME_LIMIT:
+        raise ValueError(f"название длиннее {NAME_LIMIT} символов")
+    price = parse_price(values["price"]) if not isinstance(values["price"], bool) else None
+    if price is None or price <= 0:
+        raise ValueError(f"некорректная цена {_shown(values['price'])}")
+    currency = str(values["currency"]).upper()
+    # Код валюты ISO 4217: валюты вне меню /add (например, из веб-интерфейса) тоже принимаются
+    if len(currency) != 3 or not currency.isascii() or not currency.isalpha():
+        raise ValueError(f"некорректная валюта {_shown(values['currency'])}")
+    billing_period = str(values["billing_period"]).lower()
+    if billing_period not in BILLING_PERIODS:
+        raise ValueError(f"неподдерживаемый цикл оплаты {_shown(values['billing_period'])}")
+    next_payment = parse_date(str(values["next_payment"]))
+    if next_payment is None:
+        raise ValueError(f"некорректная дата {_shown(values['next_payment'])}")
+    # Категория в /add вводится и текстом, поэтому принимается любая
+    category = str(values.get("category") or "Other")
+    if len(category) > NAME_LIMIT:
+        raise ValueError(f"категория длиннее {NAME_LIMIT} символов")
+    description = values.get("description")
+
+    return CreateSubscriptionRequest(
+        user_id=user_id,
+        name=name,
+        price=str(price),
+        currency=currency,
+        billing_period=billing_period,
+        next_payment=next_payment.isoformat(),
+        category=category,
+        description=str(description) if description not in (None, "") else None,
+    )
+
+
+@dataclass
+class ImportReport:
+    """Итоги импорта: число строк, созданные подписки и ошибки по строкам"""
+    total: int = 0
+    created: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    # Ошибка разбора файла, после которой импорт остановлен
+    aborted: Optional[str] = None
+
+
+class SubscriptionImporter:
+    """Создание подписок из строк файла с ограниченным числом одновременных запросов
+
+    Строки читаются из потока по мере освобождения мест, поэтому в памяти
+    находится не больше max_concurrency строк независимо от размера файла.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[CreateSubscriptionRequest], Awaitable[Optional[str]]],
+        max_concurrency: int = 5,
+        max_rows: int = 1000,
+        progress: Optional[Callable[[ImportReport], Awaitable[Any]]] = None,
+        progress_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        # create возвращает None при успехе или текст ошибки
+        self.create = create
+        self.max_concurrency = max_concurrency
+        self.max_rows = max_rows
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self._clock = clock
+
+    async def run(self, rows: AsyncIterator[Tuple[int, Any]], user_id: str) -> ImportReport:
+        report = ImportReport()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = set()
+        last_progress = self._clock()
+
+        async def create_row(row: int, request: CreateSubscriptionRequest):
+            nonlocal last_progress
+            try:
+                error = await self.create(request)
+            except Exception as e:
+                error = f"ошибка запроса: {type(e).__name__}"
+            finally:
+                semaphore.release()
+            if error is None:
+                report.created += 1
+            else:
+                report.errors.append((row, error))
+            # Сообщение о ходе импорта не чаще раза в progress_interval секунд
+            now = self._clock()
+            if self.progress is not None and now - last_progress >= self.progress_interval:
+                last_progress = now
+                await self.progress(report)
+
+        try:
+            async for row, raw in rows:
+                if report.total >= self.max_rows:
+                    report.aborted = f"в файле больше {self.max_rows} строк, остальные пропущены"
+                    break
+                report.total += 1
+                try:
+                    request = validate_row(raw, user_id)
+                except ValueError as e:
+                    report.errors.append((row, str(e)))
+                    continue
+                await semaphore.acquire()
+                task = asyncio.create_task(create_row(row, request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ImportFormatError as e:
+            report.aborted = str(e)
+        except UnicodeDecodeError:
+            report.aborted = "файл должен быть в кодировке UTF-8"
+        except csv.Error as e:
+            report.aborted = f"некорректный CSV: {e}"
+        finally:
+            # Закрытие разбора закрывает и загрузку файла
+            aclose = getattr(rows, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            if tasks:
+                await asyncio.gather(*tasks)
+        report.errors.sort()
+        return report
+
+
+def render_progress(report: ImportReport) -> str:
+    return f"⏳ Импорт: обработано строк {report.created + len(report.errors)} из {report.total}, создано {report.created}"
+
+
+def render_report(report: ImportReport) -> str:
+    """Итоговое сообщение с ошибками по строкам"""
+    lines = [f"📥 Импорт завершен: создано {report.created} из {report.total}"]
+    if report.aborted:
+        lines.append(f"⚠️ Импорт остановлен: {report.aborted}")
+    if report.errors:
+        lines.append("")
+        lines.append(f"❌ Ошибки ({len(report.errors)}):")
+        for row, error in report.errors[:REPORT_ERRORS_LIMIT]:
+            lines.append(f"• Строка {row}: {error}")
+        if len(report.errors) > REPORT_ERRORS_LIMIT:
+            lines.append(f"… и еще {len(report.errors) - REPORT_ERRORS_LIMIT}")
+    return "\n".join(lines)
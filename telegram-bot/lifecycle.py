@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import signal
+import time
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional, Set
+
+from aiogram import BaseMiddleware
+from aiohttp import web
+
+
+logger = logging.getLogger(__name__)
+
+# Сигналы остановки процесса: SIGTERM от оркестратора и Ctrl+C в терминале
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Lifecycle:
+    """Порядок остановки процесса: прекращение приема обновлений, ожидание
+    обработчиков в пределах общего срока, затем закрытие ресурсов
+
+    Срок drain_timeout отсчитывается от запроса остановки и общий для всех
+    этапов: оставшееся время этапа возвращает remaining().
+    """
+
+    def __init__(self, drain_timeout: float = 25.0, clock: Callable[[], float] = time.monotonic):
+        self.drain_timeout = drain_timeout
+        self._clock = clock
+        self.stopping = False
+        self._stop_requested: Optional[asyncio.Event] = None
+        self._deadline: Optional[float] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._signals: List[int] = []
+        # Вызываются один раз в начале остановки (например, /ready начинает отвечать 503)
+        self.on_stop: List[Callable[[], Any]] = []
+
+        self.handled_total = 0
+        self.cancelled_total = 0
+
+    def _event(self) -> asyncio.Event:
+        if self._stop_requested is None:
+            self._stop_requested = asyncio.Event()
+        return self._stop_requested
+
+    def install_signal_handlers(self, signals: Collection[int] = STOP_SIGNALS):
+        loop = asyncio.get_running_loop()
+        for signum in signals:
+            loop.add_signal_handler(signum, self.request_stop, signum)
+            self._signals.append(signum)
+
+    def remove_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for signum in self._signals:
+            loop.remove_signal_handler(signum)
+        self._signals.clear()
+
+    def request_stop(self, signum: Optional[int] = None):
+        """Запрос остановки (обработчик сигнала)"""
+        if self.stopping:
+            return
+        self.stopping = True
+        self._deadline = self._clock() + self.drain_timeout
+        logger.info("Shutdown requested", extra={
+            "signal": signal.Signals(signum).name if signum is not None else None,
+            "inflight": len(self._inflight),
+            "drain_timeout": self.drain_timeout,
+        })
+        for callback in self.on_stop:
+            callback()
+        self._event().set()
+
+    def remaining(self) -> Optional[float]:
+        """Секунды до конца срока остановки (None, пока остановка не запрошена)"""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - self._clock())
+
+    async def run(self, receive: Awaitable[Any], stop: Optional[Callable[[], Awaitable[Any]]] = None):
+        """Прием обновлений до запроса остановки
+
+        При остановке вызывается stop (штатное завершение приема), без него
+        задача приема отменяется. Завершение приема с ошибкой тоже запускает
+        остановку, ошибка передается дальше.
+        """
+        receiver = asyncio.ensure_future(receive)
+        waiter = asyncio.create_task(self._event().wait())
+        try:
+            await asyncio.wait((receiver, waiter), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            self.request_stop()
+            if not receiver.done():
+                if stop is not None:
+                    await stop()
+                receiver.cancel()
+            try:
+                await receiver
+            except asyncio.CancelledError:
+                pass
+
+    def handler_started(self, task: asyncio.Task):
+        self._inflight.add(task)
+
+    def handler_finished(self, task: asyncio.Task):
+        self._inflight.discard(task)
+        self.handled_total += 1
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def drain(self) -> bool:
+        """Ожидание обработчиков до конца срока; незавершенные отменяются (False)"""
+        tasks = [task for task in self._inflight if task is not asyncio.current_task()]
+        if not tasks:
+            return True
+        _, pending = await asyncio.wait(tasks, timeout=self.remaining())
+        if not pending:
+            logger.info("In-flight handlers drained", extra={"handlers": len(tasks)})
+            return True
+        logger.warning("Shutdown deadline reached, cancelling handlers", extra={"handlers": len(pending)})
+        self.cancelled_total += len(pending)
+        for task in pending:
+            task.cancel()
+        await asyncio.wait(pending)
+        return False
+
+    def reject_when_stopping(self, paths: Collection[str]):
+        """Middleware aiohttp: во время остановки запросы к paths получают 503
+
+        Telegram повторит непринятый webhook, и его обработает другой экземпляр
+        или этот процесс после перезапуска.
+        """
+        @web.middleware
+        async def middleware(request: web.Request, handler):
+            if self.stopping and request.path in paths:
+                return web.Response(status=503)
+            return await handler(request)
+
+        return middleware
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stopping": self.stopping,
+            "inflight": len(self._inflight),
+            "handled_total": self.handled_total,
+            "cancelled_total": self.cancelled_total,
+        }
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """Учет обработчиков обновлений, которые нужно дождаться при остановке"""
+
+    def __init__(self, lifecycle: Lifecycle):
+        self.lifecycle = lifecycle
+        # Наибольший update_id, поступивший в обработку (для подтверждения getUpdates)
+        self.last_update_id: Optional[int] = None
+
+    async def __call__(self, handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        update_id = getattr(event, "update_id", None)
+        if update_id is not None and (self.last_update_id is None or update_id > self.last_update_id):
+            self.last_update_id = update_id
+        # Каждое обновление обрабатывается в своей задаче (polling, webhook и
+        # рабочий процесс), при остановке ожидаются именно эти задачи
+        task = asyncio.current_task()
+        self.lifecycle.handler_started(task)
+        try:
+            return await handler(event, data)
+        finally:
+            self.lifecycle.handler_finished(task)
+
+
+async def confirm_updates(bot: Any, last_update_id: Optional[int]):
+    """Подтверждение полученных через getUpdates обновлений перед выходом
+
+    Telegram считает обновления доставленными только при следующем getUpdates
+    со смещением больше их update_id; без подтверждения уже обработанные
+    обновления пришли бы повторно после перезапуска.
+    """
+    if last_update_id is None:
+        return
+    try:
+        await bot.get_updates(offset=last_update_id + 1, limit=1, timeout=0)
+    except Exception as e:
+        logger.warning("Failed to confirm updates", extra={"offset": last_update_id + 1, "error": repr(e)})
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from aiogram.types import BotCommand, InlineKeyboardButton, InlineKeyboardMarkup
+from pydantic import ConfigDict
+
+
+@dataclass(frozen=True)
+class Choice:
+    """Вариант выбора: кнопка, значение для backend API и текст подтверждения"""
+    callback_data: str
+    label: str
+    value: str
+    selected_text: str
+
+
+class FrozenInlineKeyboardButton(InlineKeyboardButton):
+    """Неизменяемая кнопка: одни и те же объекты входят во все ответы с меню"""
+    model_config = ConfigDict(frozen=True)
+
+
+class ChoiceMenu:
+    """Меню выбора из inline-кнопок, собираемое один раз при импорте модуля"""
+
+    def __init__(self, prefix: str, prompt: str, selected: str, error: str, options: Sequence[Tuple[str, str, str, str]]):
+        self.prefix = prefix
+        self.prompt = prompt
+        self.error = error
+        # options: (ключ callback_data, текст кнопки, значение, текст в подтверждении)
+        self.choices: Dict[str, Choice] = {
+            f"{prefix}{key}": Choice(f"{prefix}{key}", label, value, f"{selected}{shown}")
+            for key, label, value, shown in options
+        }
+        self.values: FrozenSet[str] = frozenset(choice.value for choice in self.choices.values())
+        self.rows: Tuple[Tuple[FrozenInlineKeyboardButton, ...], ...] = tuple(
+            (FrozenInlineKeyboardButton(text=choice.label, callback_data=choice.callback_data),)
+            for choice in self.choices.values()
+        )
+
+    @property
+    def markup(self) -> InlineKeyboardMarkup:
+        """Клавиатура меню: новые списки строк из готовых неизменяемых кнопок без повторной проверки
+
+        Изменение клавиатуры одного ответа (например, добавление строки) не
+        затрагивает остальные ответы.
+        """
+        return InlineKeyboardMarkup.model_construct(inline_keyboard=[list(row) for row in self.rows])
+
+    def resolve(self, callback_data: str) -> Optional[Choice]:
+        return self.choices.get(callback_data)
+
+
+# Единая таблица вариантов: по ней строятся клавиатуры и проверяются нажатия
+CURRENCY_MENU = ChoiceMenu(
+    "currency_",
+    "💱 Выберите валюту:",
+    "💱 Валюта выбрана: ",
+    "❌ Неподдерживаемая валюта",
+    [
+        ("USD", "USD", "USD", "USD"),
+        ("EUR", "EUR", "EUR", "EUR"),
+        ("RUB", "RUB", "RUB", "RUB"),
+    ],
+)
+
+CYCLE_MENU = ChoiceMenu(
+    "cycle_",
+    "🔄 Выберите цикл оплаты:",
+    "🔄 Цикл оплаты выбран: ",
+    "❌ Неподдерживаемый цикл оплаты",
+    [
+        ("monthly", "Ежемесячно", "monthly", "ежемесячно"),
+        ("yearly", "Ежегодно", "yearly", "ежегодно"),
+    ],
+)
+
+CATEGORY_MENU = ChoiceMenu(
+    "category_",
+    "📂 Выберите категорию подписки:",
+    "📂 Категория выбрана: ",
+    "❌ Неподдерживаемая категория",
+    [
+        ("entertainment", "Развлечения", "Entertainment", "Entertainment"),
+        ("productivity", "Продуктивность", "Productivity", "Productivity"),
+        ("design", "Дизайн", "Design", "Design"),
+        ("cloud", "Облачные сервисы", "Cloud Services", "Cloud Services"),
+        ("music", "Музыка", "Music", "Music"),
+        ("video", "Видео", "Video", "Video"),
+        ("other", "Другое", "Other", "Other"),
+    ],
+)
+
+# Меню команд бота
+BOT_COMMANDS: List[BotCommand] = [
+    BotCommand(command="start", description="Запустить бота"),
+    BotCommand(command="help", description="Показать справку"),
+    BotCommand(command="login", description="Войти в систему"),
+    BotCommand(command="list", description="Показать все подписки"),
+    BotCommand(command="add", description="Добавить новую подписку"),
+    BotCommand(command="delete", description="Удалить подписку"),
+    BotCommand(command="stats", description="Показать статистику расходов"),
+    BotCommand(command="import", description="Импортировать подписки из файла"),
+    BotCommand(command="export", description="Выгрузить подписки в CSV или календарь"),
+]
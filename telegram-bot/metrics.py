@@ -0,0 +1,398 @@
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+
+
+# Границы корзин гистограмм задержек (секунды)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, Any] = {}
+
+    def labels(self, *values: str):
+        """Серия метрики с заданными значениями меток (создается при первом обращении)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in self._children.items():
+            yield "", self.labelnames, values, child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    """Текущее значение, которое может расти и уменьшаться"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def samples(self):
+        for values, child in self._children.items():
+            yield "", self.labelnames, values, child.value
+
+
+class CallbackGauge(_Metric):
+    """Значения, вычисляемые только в момент запроса /metrics"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], func: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def samples(self):
+        for values, value in self.func().items():
+            yield "", self.labelnames, values, value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя корзина: значения больше всех границ (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """Распределение значений по фиксированным корзинам"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for values, child in self._children.items():
+            # Корзины хранятся раздельно, накопительные суммы считаются при выводе
+            total = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                total += count
+                yield "_bucket", names, values + (_format_value(bound),), total
+            yield "_sum", self.labelnames, values, child.sum
+            yield "_count", self.labelnames, values, total
+
+
+class MetricsRegistry:
+    """Набор метрик, выводимых в текстовом формате Prometheus"""
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = namespace
+        self._metrics: List[_Metric] = []
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(self._name(name), documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(self._name(name), documentation, labelnames))
+
+    def callback_gauge(self, name: str, documentation: str, labelnames: Sequence[str], func: Callable[[], Dict[LabelValues, float]]) -> CallbackGauge:
+        return self.register(CallbackGauge(self._name(name), documentation, labelnames, func))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(self._name(name), documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def state_name(state: Any) -> Optional[str]:
+    if isinstance(state, State):
+        return state.state
+    return state
+
+
+class StateTracker:
+    """Распределение чатов по состояниям FSM, обновляемое при каждой смене состояния"""
+
+    def __init__(self, gauge: Gauge, idle_states: Iterable[Any] = ()):
+        self.gauge = gauge
+        # Состояния "нет диалога": чат в них не учитывается, как и после сброса состояния
+        self.idle_states = frozenset(state_name(state) for state in idle_states)
+        # Только чаты в середине диалога: запись удаляется при выходе из него
+        self._states: Dict[Any, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def record(self, key: Any, state: Any):
+        new = state_name(state)
+        if new in self.idle_states:
+            new = None
+        old = self._states.pop(key, None)
+        if old is not None:
+            self.gauge.labels(old).dec()
+        if new is not None:
+            self._states[key] = new
+            self.gauge.labels(new).inc()
+
+
+class TrackingFSMContext(FSMContext):
+    """Контекст FSM, сообщающий о смене состояния в StateTracker"""
+
+    def __init__(self, context: FSMContext, tracker: StateTracker):
+        super().__init__(storage=context.storage, key=context.key)
+        self.tracker = tracker
+
+    async def set_state(self, state: Any = None) -> None:
+        await super().set_state(state)
+        self.tracker.record(self.key, state)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Замер времени выполнения обработчиков и отслеживание состояний FSM"""
+
+    def __init__(self, metrics: "BotMetrics"):
+        self.metrics = metrics
+
+    async def __call__(self, handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        context = data.get("state")
+        if isinstance(context, FSMContext):
+            data["state"] = TrackingFSMContext(context, self.metrics.states)
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.metrics.handler_errors.labels(name).inc()
+            raise
+        finally:
+            self.metrics.handler_latency.labels(name).observe(time.perf_counter() - started)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Подсчет вызовов Telegram Bot API и ошибок по методам"""
+
+    def __init__(self, metrics: "BotMetrics"):
+        self.metrics = metrics
+
+    async def __call__(self, make_request, bot, method):
+        api_method = getattr(method, "__api_method__", type(method).__name__)
+        self.metrics.telegram_requests.labels(api_method).inc()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            self.metrics.telegram_errors.labels(api_method, type(e).__name__).inc()
+            raise
+
+
+class LoopLagMonitor:
+    """Измерение задержки цикла событий: насколько позже запланированного просыпается таймер"""
+
+    def __init__(self, gauge: Gauge, histogram: Histogram, interval: float = 0.5):
+        self.gauge = gauge
+        self.histogram = histogram
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.gauge.set(lag)
+            self.histogram.observe(lag)
+
+
+class BotMetrics:
+    """Метрики бота для эндпоинта /metrics"""
+
+    # Ограничение числа различных путей backend API в кэше серий
+    MAX_ENDPOINTS = 1000
+
+    def __init__(self, namespace: str = "subtracker_bot", idle_states: Iterable[Any] = ()):
+        self.registry = registry = MetricsRegistry(namespace)
+        self.handler_latency = registry.histogram("handler_duration_seconds", "Update handler latency", ("handler",))
+        self.handler_errors = registry.counter("handler_errors_total", "Update handlers that raised an exception", ("handler",))
+        self.backend_latency = registry.histogram("backend_request_duration_seconds", "Backend API request latency", ("method", "endpoint"))
+        self.backend_responses = registry.counter("backend_responses_total", "Backend API responses by status code", ("method", "endpoint", "status"))
+        self.telegram_requests = registry.counter("telegram_requests_total", "Telegram Bot API calls", ("method",))
+        self.telegram_errors = registry.counter("telegram_errors_total", "Failed Telegram Bot API calls", ("method", "error"))
+        self.fsm_states = registry.gauge("fsm_state_chats", "Chats in each FSM state (changes since start)", ("state",))
+        self.loop_lag = registry.gauge("event_loop_lag_seconds", "Last measured event loop lag")
+        self.loop_lag_histogram = registry.histogram("event_loop_lag_distribution_seconds", "Event loop lag")
+        self.update_wait = registry.histogram("update_wait_seconds", "Time an update waits for its chat queue and a free executor slot")
+        self.states = StateTracker(self.fsm_states, idle_states)
+        self.loop_monitor = LoopLagMonitor(self.loop_lag, self.loop_lag_histogram)
+        # (метод, путь, статус) -> серии гистограммы и счетчика, чтобы не нормализовать путь при каждом запросе
+        self._backend_series: Dict[Tuple[str, str, str], Tuple[_HistogramChild, _CounterChild]] = {}
+
+    def add_cache_ratios(self, caches: Dict[str, Callable[[], Dict[str, Any]]]):
+        """Регистрация долей попаданий кэшей; stats() каждого кэша вызывается при запросе /metrics"""
+
+        def collect() -> Dict[LabelValues, float]:
+            ratios = {}
+            for name, stats in caches.items():
+                values = stats()
+                lookups = values["hits"] + values["misses"]
+                ratios[(name,)] = values["hits"] / lookups if lookups else 0.0
+            return ratios
+
+        self.registry.callback_gauge("cache_hit_ratio", "Cache hit ratio", ("cache",), collect)
+
+    def add_update_executor(self, stats: Callable[[], Dict[str, Any]]):
+        """Регистрация загрузки исполнителя обновлений; stats() вызывается при запросе /metrics"""
+        self.registry.callback_gauge(
+            "update_queue_depth", "Updates waiting for their chat queue or a free executor slot", (),
+            lambda: {(): stats()["queued"]},
+        )
+        self.registry.callback_gauge(
+            "updates_running", "Updates being processed", (),
+            lambda: {(): stats()["running"]},
+        )
+        self.registry.callback_gauge(
+            "update_active_chats", "Chats with an update being processed or queued", (),
+            lambda: {(): stats()["active_chats"]},
+        )
+
+    @staticmethod
+    def endpoint(path: str) -> str:
+        """Шаблон пути backend API: идентификаторы заменяются на {id}"""
+        segments = path.split("?", 1)[0].split("/")
+        return "/".join(segment if segment.isalpha() or not segment else "{id}" for segment in segments)
+
+    def observe_backend(self, method: str, path: str, status: str, elapsed: float):
+        key = (method, path, status)
+        series = self._backend_series.get(key)
+        if series is None:
+            endpoint = self.endpoint(path)
+            series = (self.backend_latency.labels(method, endpoint), self.backend_responses.labels(method, endpoint, status))
+            if len(self._backend_series) < self.MAX_ENDPOINTS:
+                self._backend_series[key] = series
+        series[0].observe(elapsed)
+        series[1].inc()
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -0,0 +1,102 @@
+from typing import Any, Optional
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from functools import lru_cache
+
+
+# Определение моделей данных
+@dataclass
+class User:
+    id: str
+    username: str
+    email: str
+    password_hash: str
+
+
+class BillingCycle(str, Enum):
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+    WEEKLY = "weekly"
+
+
+_CYCLES_BY_VALUE = {cycle.value: cycle for cycle in BillingCycle}
+
+
+# Значения разбираются через кэш: одинаковые цены и даты в ответе backend
+# разбираются один раз и хранятся одним неизменяемым объектом
+@lru_cache(maxsize=4096, typed=True)
+def parse_price(value: Any) -> Optional[Decimal]:
+    """Цена подписки как Decimal (None для некорректной цены)"""
+    try:
+        price = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    return price if price.is_finite() else None
+
+
+@lru_cache(maxsize=4096, typed=True)
+def parse_date(value: Any) -> Optional[date]:
+    """Дата платежа из строки ISO 8601 (None для некорректной даты)"""
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def parse_cycle(value: Any) -> BillingCycle:
+    """Цикл оплаты; неизвестный цикл считается ежемесячным, как по умолчанию в backend"""
+    cycle = _CYCLES_BY_VALUE.get(value)
+    if cycle is None:
+        cycle = _CYCLES_BY_VALUE.get(str(value).lower(), BillingCycle.MONTHLY)
+    return cycle
+
+
+# slots без frozen: __init__ замороженного dataclass присваивает поля через
+# object.__setattr__ и вдвое замедляет декодирование списка подписок
+@dataclass(slots=True)
+class Subscription:
+    id: str
+    user_id: str
+    name: str
+    price: Optional[Decimal]
+    currency: str
+    billing_period: BillingCycle
+    next_payment: Optional[date]
+    category: str
+    is_active: bool
+    description: Optional[str] = None
+
+    def __post_init__(self):
+        # schema.decode_subscription передает уже разобранные значения;
+        # строки разбираются здесь только при создании объекта вручную
+        if not isinstance(self.price, Decimal) and self.price is not None:
+            self.price = parse_price(self.price)
+        if not isinstance(self.billing_period, BillingCycle):
+            self.billing_period = parse_cycle(self.billing_period)
+        if not isinstance(self.next_payment, date) and self.next_payment is not None:
+            self.next_payment = parse_date(self.next_payment)
+
+
+@dataclass
+class CreateSubscriptionRequest:
+    user_id: str
+    name: str
+    price: str
+    currency: str
+    billing_period: str
+    next_payment: str
+    category: str
+    description: Optional[str] = None
+
+
+@dataclass
+class LoginRequest:
+    username: str
+    password: str
+
+
+@dataclass
+class LoginResponse:
+    token: str
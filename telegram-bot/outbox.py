@@ -0,0 +1,316 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter
+
+
+logger = logging.getLogger(__name__)
+
+
+# Полосы приоритета исходящих сообщений
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+LANE_NAMES = ("interactive", "bulk")
+
+
+class TokenBucket:
+    """Ограничитель частоты по алгоритму token bucket"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Время ожидания до появления одного токена"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    __slots__ = ("chat_id", "priority", "func", "args", "kwargs", "future", "attempts")
+
+    def __init__(self, chat_id: int, priority: int, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict, future: Optional[asyncio.Future]):
+        self.chat_id = chat_id
+        self.priority = priority
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.attempts = 0
+
+
+class OutboundDispatcher:
+    """Очередь исходящих сообщений Telegram с глобальным и по-чатовым ограничением частоты"""
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        max_in_flight: int = 30,
+        max_retries: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self._clock = clock
+
+        self._global = TokenBucket(global_rate, global_rate, clock())
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        # Для каждой полосы: очереди по чатам и куча (время готовности, порядковый номер, chat_id)
+        self._queues: List[Dict[int, Deque[_Job]]] = [{} for _ in LANE_NAMES]
+        self._ready: List[List[Tuple[float, int, int]]] = [[] for _ in LANE_NAMES]
+        self._scheduled: List[Set[int]] = [set() for _ in LANE_NAMES]
+        self._depth = [0 for _ in LANE_NAMES]
+        self._seq = itertools.count()
+
+        self._inflight_chats: Set[int] = set()
+        self._inflight_tasks: Set[asyncio.Task] = set()
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._accepting = False
+        self._last_prune = clock()
+
+        self.sent_total = 0
+        self.failed_total = 0
+        self.retry_after_total = 0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    async def start(self):
+        """Запуск фоновой отправки сообщений"""
+        if self._worker is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._accepting = True
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Остановка приема сообщений и отправка уже поставленных в очередь"""
+        worker = self._worker
+        if worker is None:
+            return
+        self._accepting = False
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(worker), timeout)
+        except asyncio.TimeoutError:
+            self._abort(worker)
+        except asyncio.CancelledError:
+            self._abort(worker)
+            raise
+        finally:
+            self._worker = None
+
+    def _abort(self, worker: asyncio.Task):
+        """Прерывание отправки: начатые отправки отменяются, ожидающие в очереди завершаются ошибкой"""
+        worker.cancel()
+        for task in list(self._inflight_tasks):
+            task.cancel()
+        for lane, queues in enumerate(self._queues):
+            for queue in queues.values():
+                while queue:
+                    # Ожидающие результат (send_and_wait) получают ту же ошибку, что и отмененные отправки
+                    self._fail(queue.popleft(), asyncio.CancelledError())
+            queues.clear()
+            self._ready[lane].clear()
+            self._scheduled[lane].clear()
+            self._depth[lane] = 0
+
+    def submit(
+        self,
+        chat_id: int,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        priority: int = PRIORITY_INTERACTIVE,
+        wait_result: bool = False,
+        **kwargs: Any,
+    ) -> Optional[asyncio.Future]:
+        """Постановка отправки в очередь; с wait_result возвращает future с результатом"""
+        future = asyncio.get_running_loop().create_future() if wait_result else None
+        job = _Job(chat_id, priority, func, args, kwargs, future)
+        self._push(job)
+        return future
+
+    def _push(self, job: _Job, front: bool = False):
+        lane = job.priority
+        queue = self._queues[lane].get(job.chat_id)
+        if queue is None:
+            queue = self._queues[lane][job.chat_id] = deque()
+        if front:
+            queue.appendleft(job)
+        else:
+            queue.append(job)
+        self._depth[lane] += 1
+        self._schedule(lane, job.chat_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _schedule(self, lane: int, chat_id: int):
+        if chat_id in self._scheduled[lane] or chat_id in self._inflight_chats:
+            return
+        now = self._clock()
+        bucket = self._chat_buckets.get(chat_id)
+        ready_at = now + bucket.delay(now) if bucket is not None else now
+        heapq.heappush(self._ready[lane], (ready_at, next(self._seq), chat_id))
+        self._scheduled[lane].add(chat_id)
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _pick(self, now: float) -> Tuple[Optional[_Job], Optional[float]]:
+        """Выбор следующего сообщения: сначала интерактивные, затем массовые"""
+        wait: Optional[float] = None
+        for lane, heap in enumerate(self._ready):
+            while heap:
+                ready_at, _, chat_id = heap[0]
+                if ready_at > now:
+                    wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                    break
+                heapq.heappop(heap)
+                self._scheduled[lane].discard(chat_id)
+                if chat_id in self._inflight_chats:
+                    # Чат будет снова поставлен в очередь после завершения отправки
+                    continue
+                delay = self._chat_bucket(chat_id, now).delay(now)
+                if delay > 0:
+                    heapq.heappush(heap, (now + delay, next(self._seq), chat_id))
+                    self._scheduled[lane].add(chat_id)
+                    continue
+                queue = self._queues[lane][chat_id]
+                job = queue.popleft()
+                if not queue:
+                    del self._queues[lane][chat_id]
+                self._depth[lane] -= 1
+                return job, None
+        return None, wait
+
+    def _has_work(self) -> bool:
+        return any(self._depth) or bool(self._inflight_tasks)
+
+    async def _wait(self, timeout: Optional[float]):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while self._accepting or self._has_work():
+            now = self._clock()
+            if now < self._paused_until:
+                await self._wait(self._paused_until - now)
+                continue
+            if len(self._inflight_tasks) >= self.max_in_flight:
+                await self._wait(None)
+                continue
+            global_delay = self._global.delay(now)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                continue
+            job, wait = self._pick(now)
+            if job is None:
+                if not self._accepting and not any(self._depth):
+                    # Остановка: ожидание только уже начатых отправок
+                    await self._wait(None)
+                else:
+                    await self._wait(wait)
+                continue
+            self._global.consume(now)
+            self._chat_bucket(job.chat_id, now).consume(now)
+            self._inflight_chats.add(job.chat_id)
+            task = asyncio.create_task(self._deliver(job))
+            self._inflight_tasks.add(task)
+            self._prune(now)
+
+    async def _deliver(self, job: _Job):
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except TelegramRetryAfter as e:
+            self.retry_after_total += 1
+            # Telegram просит подождать: пауза для всей очереди
+            self._paused_until = max(self._paused_until, self._clock() + e.retry_after)
+            job.attempts += 1
+            if job.attempts <= self.max_retries:
+                self._inflight_chats.discard(job.chat_id)
+                self._push(job, front=True)
+                return
+            self._fail(job, e)
+        except asyncio.CancelledError:
+            self._fail(job, asyncio.CancelledError())
+            raise
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self.sent_total += 1
+            if job.future is not None and not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._inflight_tasks.discard(asyncio.current_task())
+            self._inflight_chats.discard(job.chat_id)
+            for lane in range(len(LANE_NAMES)):
+                if job.chat_id in self._queues[lane]:
+                    self._schedule(lane, job.chat_id)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def _fail(self, job: _Job, error: BaseException):
+        self.failed_total += 1
+        if job.future is not None and not job.future.done():
+            job.future.set_exception(error)
+        else:
+            logger.warning("Outbound message failed", extra={"chat_id": job.chat_id, "error": repr(error)})
+
+    def _prune(self, now: float):
+        # Удаление полностью восстановившихся ограничителей неактивных чатов
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        active = self._inflight_chats.union(*(queues.keys() for queues in self._queues))
+        for chat_id in [chat_id for chat_id, bucket in self._chat_buckets.items() if chat_id not in active and bucket.is_full(now)]:
+            del self._chat_buckets[chat_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики очереди исходящих сообщений"""
+        return {
+            "running": self.running,
+            "queue_depth": dict(zip(LANE_NAMES, self._depth)),
+            "in_flight": len(self._inflight_tasks),
+            "sent_total": self.sent_total,
+            "failed_total": self.failed_total,
+            "retry_after_total": self.retry_after_total,
+            "paused_for": round(max(0.0, self._paused_until - self._clock()), 3),
+        }
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+
+logger = logging.getLogger(__name__)
+
+# Проверка зависимости: завершается без исключения, если зависимость доступна
+Probe = Callable[[], Awaitable[Any]]
+
+
+class DependencyStatus:
+    """Результат последней проверки одной зависимости"""
+
+    __slots__ = ("name", "ok", "latency_ms", "checked_at", "last_success", "error", "failures", "checks_total")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ok = False
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.error: Optional[str] = None
+        # Число неудачных проверок подряд
+        self.failures = 0
+        self.checks_total = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at,
+            "last_success": self.last_success,
+            "error": self.error,
+            "consecutive_failures": self.failures,
+        }
+
+
+class ReadinessProber:
+    """Фоновая проверка зависимостей с кэшированием результата для /ready
+
+    Зависимости проверяются раз в interval секунд независимо от числа запросов
+    к /ready: эндпоинт только читает последний результат, поэтому частые пробы
+    оркестратора не превращаются в запросы к backend API и Telegram.
+    """
+
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        interval: float = 10.0,
+        timeout: float = 3.0,
+        failure_threshold: int = 1,
+        clock: Callable[[], float] = time.time,
+        dumps: Callable[[Any], str] = json.dumps,
+    ):
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        # Число неудачных проверок подряд, после которого зависимость недоступна
+        self.failure_threshold = max(1, failure_threshold)
+        self._clock = clock
+        self._dumps = dumps
+        self.statuses = {name: DependencyStatus(name) for name in probes}
+        self._task: Optional[asyncio.Task] = None
+        # Процесс останавливается: /ready отвечает 503 независимо от зависимостей
+        self.draining = False
+
+    def set_draining(self):
+        self.draining = True
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.interval)
+
+    async def check_all(self):
+        """Одновременная проверка всех зависимостей"""
+        await asyncio.gather(*(self._check(name, probe) for name, probe in self.probes.items()))
+
+    async def _check(self, name: str, probe: Probe):
+        status = self.statuses[name]
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status.failures += 1
+            status.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            if status.failures >= self.failure_threshold:
+                if status.ok:
+                    logger.warning("Dependency is unavailable", extra={"dependency": name, "error": status.error})
+                status.ok = False
+        else:
+            if not status.ok:
+                logger.info("Dependency is available", extra={"dependency": name})
+            status.ok = True
+            status.failures = 0
+            status.error = None
+            status.last_success = self._clock()
+        status.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        status.checked_at = self._clock()
+        status.checks_total += 1
+
+    def stale(self) -> List[str]:
+        """Зависимости без проверки дольше двух интервалов (проверка зависла или не запускалась)"""
+        deadline = self._clock() - 2 * self.interval - self.timeout
+        return [
+            name for name, status in self.statuses.items()
+            if status.checked_at is None or status.checked_at < deadline
+        ]
+
+    @property
+    def ready(self) -> bool:
+        if self.draining:
+            return False
+        return all(status.ok for status in self.statuses.values()) and not self.stale()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "draining": self.draining,
+            "interval": self.interval,
+            "dependencies": {name: status.to_dict() for name, status in self.statuses.items()},
+        }
+
+    async def handle_ready(self, request: web.Request) -> web.Response:
+        """Эндпоинт /ready: 200, если все зависимости доступны по последней проверке, иначе 503"""
+        stats = self.stats()
+        stats["status"] = "READY" if stats["ready"] else "NOT_READY"
+        stale = self.stale()
+        if stale:
+            stats["stale"] = stale
+        return web.json_response(stats, status=200 if stats["ready"] else 503, dumps=self._dumps)
@@ -0,0 +1,350 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from models import Subscription, parse_date, parse_price
+from storage import KeyValueStore
+
+
+logger = logging.getLogger(__name__)
+
+
+# Число ключей, по которым распределен список чатов с напоминаниями
+INDEX_SHARDS = 64
+# Максимальная пауза планировщика (на случай перевода системных часов)
+MAX_SLEEP = 60.0
+
+
+class Reminder:
+    """Напоминание о платеже по одной подписке"""
+
+    __slots__ = ("chat_id", "subscription_id", "name", "price", "currency", "next_payment", "day", "notified")
+
+    def __init__(self, chat_id: int, subscription_id: str, name: str, price: Optional[Decimal], currency: str, next_payment: date, day: int, notified: bool = False):
+        self.chat_id = chat_id
+        self.subscription_id = subscription_id
+        self.name = name
+        self.price = price
+        self.currency = currency
+        self.next_payment = next_payment
+        # Порядковый номер дня отправки (date.toordinal)
+        self.day = day
+        self.notified = notified
+
+    def to_record(self) -> list:
+        return [self.subscription_id, self.name, str(self.price), self.currency, self.next_payment.isoformat(), self.notified]
+
+    def text(self) -> str:
+        return f"🔔 Напоминание: {self.next_payment} платеж за {self.name} - {self.price} {self.currency}"
+
+
+def payment_day(next_payment: Optional[date]) -> Optional[int]:
+    """Порядковый номер дня платежа (None, если дата некорректна)"""
+    return next_payment.toordinal() if next_payment is not None else None
+
+
+class ReminderScheduler:
+    """Напоминания о платежах за N дней до next_payment
+
+    Напоминания сгруппированы по дням отправки (календарное колесо): куча хранит
+    только различные дни, поэтому добавление и удаление стоят O(1), а планировщик
+    просыпается один раз на день с напоминаниями. Состояние каждого чата хранится
+    в KeyValueStore и восстанавливается после перезапуска.
+    """
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        send: Callable[[int, str], Awaitable[Any]],
+        loader: Optional[Callable[[int], Awaitable[Optional[List[Subscription]]]]] = None,
+        days_before: int = 3,
+        hour: int = 9,
+        max_concurrency: int = 20,
+        refresh_interval: float = 60.0,
+        refresh_batch: int = 100,
+        persist_interval: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.send = send
+        self.loader = loader
+        self.days_before = days_before
+        self.hour = hour
+        self.max_concurrency = max_concurrency
+        self.refresh_interval = refresh_interval
+        self.refresh_batch = refresh_batch
+        self.persist_interval = persist_interval
+        self._clock = clock
+        # Части индекса чатов, которые загружает этот процесс (все, кроме режима супервизора)
+        self.shards: Iterable[int] = range(INDEX_SHARDS)
+
+        # chat_id -> subscription_id -> напоминание (включая уже отправленные)
+        self._chats: Dict[int, Dict[str, Reminder]] = {}
+        # День отправки -> напоминания этого дня; куча различных дней
+        self._days: Dict[int, Set[Reminder]] = {}
+        self._day_heap: List[int] = []
+        # Дни, находящиеся в куче (в том числе опустевшие): каждый день входит в кучу один раз
+        self._heap_days: Set[int] = set()
+        self._scheduled = 0
+        self._dirty: Set[int] = set()
+        self._dirty_shards: Set[int] = set()
+        self._refresh_cursor: List[int] = []
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.sent_total = 0
+        self.failed_total = 0
+
+    # --- Изменение расписания ---
+
+    def sync_chat(self, chat_id: int, subscriptions: Iterable[Subscription]):
+        """Сверка напоминаний чата с актуальным списком подписок"""
+        current = self._chats.get(chat_id, {})
+        seen = set()
+        changed = False
+        for sub in subscriptions:
+            seen.add(sub.id)
+            existing = current.get(sub.id)
+            if existing is not None and existing.next_payment == sub.next_payment:
+                if (existing.name, existing.price, existing.currency) != (sub.name, sub.price, sub.currency):
+                    existing.name, existing.price, existing.currency = sub.name, sub.price, sub.currency
+                    changed = True
+                continue
+            self.add(chat_id, sub)
+            changed = True
+        for subscription_id in [sid for sid in current if sid not in seen]:
+            self.remove(chat_id, subscription_id)
+            changed = True
+        if changed:
+            self._mark_dirty(chat_id)
+
+    def add(self, chat_id: int, sub: Subscription):
+        """Добавление или замена напоминания для подписки"""
+        day = payment_day(sub.next_payment)
+        self.remove(chat_id, sub.id)
+        if day is None:
+            return
+        reminder = Reminder(chat_id, sub.id, sub.name, sub.price, sub.currency, sub.next_payment, day - self.days_before)
+        if chat_id not in self._chats:
+            self._chats[chat_id] = {}
+            self._dirty_shards.add(chat_id % INDEX_SHARDS)
+        self._chats[chat_id][sub.id] = reminder
+        self._schedule(reminder)
+        self._mark_dirty(chat_id)
+
+    def remove(self, chat_id: int, subscription_id: str):
+        """Удаление напоминания о подписке"""
+        reminders = self._chats.get(chat_id)
+        if not reminders:
+            return
+        reminder = reminders.pop(subscription_id, None)
+        if reminder is None:
+            return
+        if not reminders:
+            del self._chats[chat_id]
+            self._dirty_shards.add(chat_id % INDEX_SHARDS)
+        self._unschedule(reminder)
+        self._mark_dirty(chat_id)
+
+    def _schedule(self, reminder: Reminder):
+        if reminder.notified:
+            return
+        slot = self._days.get(reminder.day)
+        if slot is None:
+            slot = self._days[reminder.day] = set()
+        if reminder.day not in self._heap_days:
+            self._heap_days.add(reminder.day)
+            heapq.heappush(self._day_heap, reminder.day)
+            if self._wakeup is not None and self._day_heap[0] == reminder.day:
+                # Новый ближайший день: планировщик пересчитывает время ожидания
+                self._wakeup.set()
+        slot.add(reminder)
+        self._scheduled += 1
+
+    def _unschedule(self, reminder: Reminder):
+        slot = self._days.get(reminder.day)
+        if slot is None or reminder not in slot:
+            return
+        slot.discard(reminder)
+        self._scheduled -= 1
+        if not slot:
+            # День остается в куче и пропускается при извлечении; при новом
+            # напоминании на этот день повторно в кучу не добавляется
+            del self._days[reminder.day]
+
+    def _mark_dirty(self, chat_id: int):
+        self._dirty.add(chat_id)
+
+    # --- Время ---
+
+    def today(self) -> int:
+        return datetime.fromtimestamp(self._clock(), timezone.utc).date().toordinal()
+
+    def fire_time(self, day: int) -> float:
+        moment = datetime.combine(date.fromordinal(day), datetime.min.time(), timezone.utc)
+        return moment.timestamp() + self.hour * 3600
+
+    # --- Фоновые задачи ---
+
+    async def start(self):
+        """Восстановление расписания из хранилища и запуск планировщика"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        await self.load()
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._persist_loop()),
+        ]
+        if self.loader is not None:
+            self._tasks.append(asyncio.create_task(self._refresh_loop()))
+
+    async def stop(self):
+        """Остановка планировщика с сохранением изменений"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.persist()
+
+    async def _run(self):
+        while True:
+            now = self._clock()
+            while self._day_heap and self.fire_time(self._day_heap[0]) <= now:
+                day = heapq.heappop(self._day_heap)
+                self._heap_days.discard(day)
+                slot = self._days.pop(day, None)
+                if slot:
+                    self._scheduled -= len(slot)
+                    await self._fire(slot)
+            wait = MAX_SLEEP
+            if self._day_heap:
+                wait = min(wait, max(0.0, self.fire_time(self._day_heap[0]) - self._clock()))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, reminders: Iterable[Reminder]):
+        """Отправка напоминаний дня с ограниченным числом одновременных отправок"""
+        today = self.today()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = []
+        for reminder in reminders:
+            reminder.notified = True
+            self._mark_dirty(reminder.chat_id)
+            if reminder.day + self.days_before < today:
+                # Дата платежа уже прошла: напоминание не актуально
+                continue
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(self._deliver(reminder, semaphore)))
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _deliver(self, reminder: Reminder, semaphore: asyncio.Semaphore):
+        try:
+            await self.send(reminder.chat_id, reminder.text())
+            self.sent_total += 1
+        except Exception as e:
+            self.failed_total += 1
+            logger.warning("Reminder delivery failed", extra={"chat_id": reminder.chat_id, "error": repr(e)})
+        finally:
+            semaphore.release()
+
+    async def _refresh_loop(self):
+        """Постепенная сверка с backend API: по refresh_batch чатов за интервал"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            if not self._refresh_cursor:
+                self._refresh_cursor = list(self._chats)
+            batch = self._refresh_cursor[-self.refresh_batch:]
+            del self._refresh_cursor[-self.refresh_batch:]
+            for chat_id in batch:
+                try:
+                    subscriptions = await self.loader(chat_id)
+                except Exception as e:
+                    logger.warning("Reminder refresh failed", extra={"chat_id": chat_id, "error": repr(e)})
+                    continue
+                if subscriptions is not None:
+                    self.sync_chat(chat_id, subscriptions)
+
+    async def _persist_loop(self):
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            await self.persist()
+
+    # --- Хранилище ---
+
+    @staticmethod
+    def _chat_key(chat_id: int) -> str:
+        return f"reminders:{chat_id}"
+
+    @staticmethod
+    def _index_key(shard: int) -> str:
+        return f"reminders:index:{shard}"
+
+    async def persist(self):
+        """Запись изменившихся чатов и частей индекса чатов"""
+        dirty, self._dirty = self._dirty, set()
+        for chat_id in dirty:
+            reminders = self._chats.get(chat_id)
+            if reminders:
+                await self.store.set(self._chat_key(chat_id), json.dumps([r.to_record() for r in reminders.values()]))
+            else:
+                await self.store.delete(self._chat_key(chat_id))
+        if not self._dirty_shards:
+            return
+        # Индекс меняется только при появлении или исчезновении чата
+        shards, self._dirty_shards = self._dirty_shards, set()
+        members: Dict[int, List[int]] = {shard: [] for shard in shards}
+        for chat_id in self._chats:
+            shard_members = members.get(chat_id % INDEX_SHARDS)
+            if shard_members is not None:
+                shard_members.append(chat_id)
+        for shard, chat_ids in members.items():
+            await self.store.set(self._index_key(shard), json.dumps(chat_ids))
+
+    async def load(self):
+        """Восстановление напоминаний чатов из хранилища"""
+        for shard in self.shards:
+            raw = await self.store.get(self._index_key(shard))
+            for chat_id in json.loads(raw) if raw else ():
+                records = await self.store.get(self._chat_key(chat_id))
+                if not records:
+                    continue
+                for subscription_id, name, price, currency, next_payment, notified in json.loads(records):
+                    next_payment = parse_date(next_payment)
+                    if next_payment is None:
+                        continue
+                    reminder = Reminder(
+                        chat_id, subscription_id, name, parse_price(price), currency, next_payment,
+                        next_payment.toordinal() - self.days_before, notified,
+                    )
+                    self._chats.setdefault(chat_id, {})[subscription_id] = reminder
+                    self._schedule(reminder)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики планировщика напоминаний"""
+        next_fire = None
+        while self._day_heap and self._day_heap[0] not in self._days:
+            self._heap_days.discard(heapq.heappop(self._day_heap))
+        if self._day_heap:
+            next_fire = round(max(0.0, self.fire_time(self._day_heap[0]) - self._clock()), 1)
+        return {
+            "chats": len(self._chats),
+            "scheduled": self._scheduled,
+            "days": len(self._days),
+            "next_fire_in": next_fire,
+            "sent_total": self.sent_total,
+            "failed_total": self.failed_total,
+        }
@@ -0,0 +1,89 @@
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional, Sequence, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from models import BillingCycle, Subscription
+
+
+# Ограничение Telegram на длину текста сообщения
+MESSAGE_LIMIT = 4096
+# Максимальная длина полей подписки в списке
+NAME_LIMIT = 64
+FIELD_LIMIT = 40
+# Префикс callback_data кнопок навигации по списку
+LIST_PAGE_PREFIX = "list_page:"
+LIST_PAGE_NOOP = f"{LIST_PAGE_PREFIX}noop"
+
+_HEADER = "📋 Ваши подписки:"
+# Запас под заголовок с номером страницы
+_HEADER_RESERVE = 100
+
+
+def _clip(value: object, limit: int = FIELD_LIMIT) -> str:
+    # Некорректные цена и дата разбираются в None
+    text = "—" if value is None else str(value)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def format_subscription(sub: Subscription) -> str:
+    """Форматирование одной подписки для списка"""
+    return (
+        f"• {_clip(sub.name, NAME_LIMIT)} - {_clip(sub.price)} {_clip(sub.currency)} ({sub.billing_period.value})\n"
+        f"  ID: {_clip(sub.id)} | Следующий платеж: {_clip(sub.next_payment)}\n"
+        f"  Категория: {_clip(sub.category)}\n"
+    )
+
+
+# Верхняя граница длины одной записи при обрезанных полях
+_ENTRY_LIMIT = len(format_subscription(Subscription(
+    id="x" * FIELD_LIMIT,
+    user_id="x",
+    name="x" * NAME_LIMIT,
+    price=Decimal("9" * FIELD_LIMIT),
+    currency="x" * FIELD_LIMIT,
+    billing_period=max(BillingCycle, key=lambda cycle: len(cycle.value)),
+    next_payment=date.max,
+    category="x" * FIELD_LIMIT,
+    is_active=True,
+)))
+
+
+class ListRenderer:
+    """Постраничное форматирование списка подписок с кнопками навигации"""
+
+    def __init__(self, page_size: int = 10, message_limit: int = MESSAGE_LIMIT):
+        # Размер страницы выбирается так, чтобы страница всегда помещалась в одно сообщение
+        self.page_size = max(1, min(page_size, (message_limit - _HEADER_RESERVE) // _ENTRY_LIMIT))
+        self.message_limit = message_limit
+
+    def page_count(self, total: int) -> int:
+        return max(1, -(-total // self.page_size))
+
+    def render_page(self, subscriptions: Sequence[Subscription], page: int) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+        """Форматирование одной страницы: форматируются только подписки этой страницы"""
+        pages = self.page_count(len(subscriptions))
+        page = min(max(page, 0), pages - 1)
+        start = page * self.page_size
+
+        parts: List[str] = [_HEADER]
+        if pages > 1:
+            parts.append(f" (страница {page + 1}/{pages}, всего {len(subscriptions)})")
+        parts.append("\n")
+        parts.extend(format_subscription(sub) for sub in subscriptions[start:start + self.page_size])
+        text = "".join(parts)
+
+        return text, self.keyboard(page, pages)
+
+    def keyboard(self, page: int, pages: int) -> Optional[InlineKeyboardMarkup]:
+        """Кнопки перехода на соседние страницы"""
+        if pages <= 1:
+            return None
+        row = []
+        if page > 0:
+            row.append(InlineKeyboardButton(text="« Назад", callback_data=f"{LIST_PAGE_PREFIX}{page - 1}"))
+        row.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data=LIST_PAGE_NOOP))
+        if page < pages - 1:
+            row.append(InlineKeyboardButton(text="Вперед »", callback_data=f"{LIST_PAGE_PREFIX}{page + 1}"))
+        return InlineKeyboardMarkup(inline_keyboard=[row])
@@ -48,19 +48,28 @@ async def main():
     if not check_dependencies():
         return
     
+    # Журнал пишется фоновым потоком, чтобы не блокировать цикл событий
+    from bot_logging import setup_logging_from_env
+    log_listener = setup_logging_from_env()
+    
     try:
         # Импортируем и запускаем бота
         from bot import SubTrackerBot
+        from supervisor import Supervisor
         
         print("🔄 Инициализация бота...")
-        bot = SubTrackerBot()
+        workers = int(os.getenv("BOT_WORKERS", "1"))
+        # Несколько рабочих процессов: входной процесс распределяет обновления по чатам
+        bot = Supervisor() if workers > 1 else SubTrackerBot()
         
         print("✅ Бот успешно инициализирован")
         print("📡 Подключение к Telegram API...")
         print("💡 Бот запущен! Нажмите Ctrl+C для остановки")
         
-        # Запуск бота
+        # Запуск бота; SIGTERM и Ctrl+C завершают его штатно: обработчики и
+        # исходящие сообщения дожидаются завершения (SHUTDOWN_TIMEOUT)
         await bot.start()
+        print("👋 Бот остановлен")
         
     except KeyboardInterrupt:
         print("\n👋 Бот остановлен пользователем")
@@ -68,6 +77,8 @@ async def main():
         print(f"❌ Ошибка при запуске бота: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        log_listener.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
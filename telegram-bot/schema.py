@@ -0,0 +1,56 @@
+from dataclasses import fields
+from typing import Any, Dict, Iterable, List, Tuple
+
+from models import Subscription, CreateSubscriptionRequest, parse_cycle, parse_date, parse_price
+
+
+def _camel(name: str) -> str:
+    """Преобразование snake_case в camelCase (только при построении схемы)"""
+    head, *tail = name.split("_")
+    return head + "".join(part.capitalize() for part in tail)
+
+
+def _decode_keys(model) -> Dict[str, str]:
+    """Таблица ключ JSON -> имя поля модели: camelCase и snake_case варианты"""
+    mapping: Dict[str, str] = {}
+    for field in fields(model):
+        mapping[field.name] = field.name
+        mapping[_camel(field.name)] = field.name
+    return mapping
+
+
+def _encode_keys(model) -> Tuple[Tuple[str, str], ...]:
+    """Пары (имя поля модели, ключ JSON в camelCase)"""
+    return tuple((field.name, _camel(field.name)) for field in fields(model))
+
+
+# Таблицы строятся один раз при импорте модуля.
+# Backend отдает snake_case (Jackson SNAKE_CASE), поэтому принимаются оба варианта.
+SUBSCRIPTION_KEYS = _decode_keys(Subscription)
+CREATE_REQUEST_KEYS = _encode_keys(CreateSubscriptionRequest)
+# Ключ во входных данных -> поле запроса создания (импорт из файла)
+CREATE_REQUEST_FIELDS = _decode_keys(CreateSubscriptionRequest)
+# Поля, которые разбираются из строк backend в типизированные значения
+SUBSCRIPTION_PARSERS = (("price", parse_price), ("billing_period", parse_cycle), ("next_payment", parse_date))
+
+
+def decode_subscription(raw: Dict[str, Any]) -> Subscription:
+    """Создание Subscription из JSON объекта backend API за один проход по ключам"""
+    get = SUBSCRIPTION_KEYS.get
+    # Неизвестные ключи (новые поля backend) пропускаются
+    values = {name: value for key, value in raw.items() if (name := get(key)) is not None}
+    for name, parse in SUBSCRIPTION_PARSERS:
+        value = values.get(name)
+        if value is not None:
+            values[name] = parse(value)
+    return Subscription(**values)
+
+
+def decode_subscriptions(items: Iterable[Dict[str, Any]]) -> List[Subscription]:
+    """Декодирование списка подписок из ответа backend API"""
+    return [decode_subscription(raw) for raw in items]
+
+
+def encode_create_request(request: CreateSubscriptionRequest) -> Dict[str, Any]:
+    """Преобразование запроса создания подписки в JSON объект с ключами camelCase"""
+    return {key: getattr(request, name) for name, key in CREATE_REQUEST_KEYS}
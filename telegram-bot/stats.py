@@ -0,0 +1,149 @@
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import BillingCycle, Subscription
+
+
+# Количество платежей в год для каждого цикла оплаты
+PAYMENTS_PER_YEAR: Dict[BillingCycle, Decimal] = {
+    BillingCycle.WEEKLY: Decimal(52),
+    BillingCycle.MONTHLY: Decimal(12),
+    BillingCycle.YEARLY: Decimal(1),
+}
+
+CYCLE_NAMES: Dict[BillingCycle, str] = {
+    BillingCycle.WEEKLY: "еженедельно",
+    BillingCycle.MONTHLY: "ежемесячно",
+    BillingCycle.YEARLY: "ежегодно",
+}
+
+_MONTHS = Decimal(12)
+_CENTS = Decimal("0.01")
+_ZERO = Decimal(0)
+
+
+@dataclass
+class CycleTotals:
+    """Итоги по одному циклу оплаты"""
+    count: int = 0
+    yearly: Decimal = _ZERO
+
+    @property
+    def monthly(self) -> Decimal:
+        return self.yearly / _MONTHS
+
+
+@dataclass
+class SubscriptionStats:
+    """Агрегированная статистика расходов на подписки"""
+    count: int = 0
+    skipped: int = 0
+    yearly: Decimal = _ZERO
+    by_cycle: Dict[BillingCycle, CycleTotals] = field(default_factory=dict)
+    by_category: Dict[str, Decimal] = field(default_factory=dict)
+    by_currency: Dict[str, Decimal] = field(default_factory=dict)
+    cheapest: Optional[Subscription] = None
+    most_expensive: Optional[Subscription] = None
+
+    @property
+    def monthly(self) -> Decimal:
+        return self.yearly / _MONTHS
+
+
+def normalize(subscription: Subscription) -> Optional[Tuple[Decimal, BillingCycle]]:
+    """Годовая стоимость и цикл оплаты подписки (None для некорректной цены)"""
+    price = subscription.price
+    if price is None:
+        return None
+    cycle = subscription.billing_period
+    return price * PAYMENTS_PER_YEAR[cycle], cycle
+
+
+def compute_stats(subscriptions: Iterable[Subscription]) -> SubscriptionStats:
+    """Расчет всей статистики за один проход по списку подписок"""
+    stats = SubscriptionStats()
+    by_cycle = stats.by_cycle
+    by_category = stats.by_category
+    by_currency = stats.by_currency
+    total = _ZERO
+    min_yearly: Optional[Decimal] = None
+    max_yearly: Optional[Decimal] = None
+
+    for sub in subscriptions:
+        record = normalize(sub)
+        if record is None:
+            stats.skipped += 1
+            continue
+        yearly, cycle = record
+        stats.count += 1
+        total += yearly
+
+        cycle_totals = by_cycle.get(cycle)
+        if cycle_totals is None:
+            cycle_totals = by_cycle[cycle] = CycleTotals()
+        cycle_totals.count += 1
+        cycle_totals.yearly += yearly
+
+        by_category[sub.category] = by_category.get(sub.category, _ZERO) + yearly
+        by_currency[sub.currency] = by_currency.get(sub.currency, _ZERO) + yearly
+
+        # Сравнение по годовой стоимости, чтобы разные циклы были сопоставимы
+        if min_yearly is None or yearly < min_yearly:
+            min_yearly = yearly
+            stats.cheapest = sub
+        if max_yearly is None or yearly > max_yearly:
+            max_yearly = yearly
+            stats.most_expensive = sub
+
+    stats.yearly = total
+    return stats
+
+
+def money(amount: Decimal) -> str:
+    """Округление суммы до копеек для вывода"""
+    return str(amount.quantize(_CENTS, rounding=ROUND_HALF_UP))
+
+
+def _sorted_amounts(amounts: Dict[str, Decimal]) -> List[Tuple[str, Decimal]]:
+    return sorted(amounts.items(), key=lambda item: item[1], reverse=True)
+
+
+def render_stats(stats: SubscriptionStats) -> str:
+    """Формирование сообщения со статистикой"""
+    lines = [
+        "📊 Статистика ваших подписок:",
+        f"💰 Всего подписок: {stats.count}",
+        f"💵 Общие расходы в месяц: ${money(stats.monthly)}",
+        f"💵 Общие расходы в год: ${money(stats.yearly)}",
+    ]
+    if stats.cheapest is not None:
+        lines.append(f"💚 Самая дешевая: {stats.cheapest.name} - {stats.cheapest.price} {stats.cheapest.currency}")
+    if stats.most_expensive is not None:
+        lines.append(f"💔 Самая дорогая: {stats.most_expensive.name} - {stats.most_expensive.price} {stats.most_expensive.currency}")
+
+    if stats.by_cycle:
+        lines.append("")
+        lines.append("🔄 По циклам оплаты (в месяц / в год):")
+        for cycle in PAYMENTS_PER_YEAR:
+            totals = stats.by_cycle.get(cycle)
+            if totals is not None:
+                lines.append(f"• {CYCLE_NAMES[cycle]} ({totals.count}): {money(totals.monthly)} / {money(totals.yearly)}")
+
+    if stats.by_currency:
+        lines.append("")
+        lines.append("💱 По валютам (в месяц / в год):")
+        for currency, yearly in _sorted_amounts(stats.by_currency):
+            lines.append(f"• {currency}: {money(yearly / _MONTHS)} / {money(yearly)}")
+
+    if stats.by_category:
+        lines.append("")
+        lines.append("📂 По категориям (в месяц):")
+        for category, yearly in _sorted_amounts(stats.by_category):
+            lines.append(f"• {category}: {money(yearly / _MONTHS)}")
+
+    if stats.skipped:
+        lines.append("")
+        lines.append(f"⚠️ Не учтено подписок с некорректной ценой: {stats.skipped}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,540 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+
+logger = logging.getLogger(__name__)
+
+
+# Отложенная запись: (значение или None для удаления, время истечения)
+_PendingItem = Tuple[Optional[str], Optional[float]]
+
+
+class KeyValueStore(ABC):
+    """Асинхронное хранилище строковых значений с TTL"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Запись всех отложенных изменений"""
+
+    async def close(self) -> None:
+        """Освобождение ресурсов хранилища"""
+
+
+class MemoryStore(KeyValueStore):
+    """Хранилище в памяти процесса"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._data: Dict[str, _PendingItem] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._data[key] = (value, self._clock() + ttl if ttl else None)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+class BatchingStore(KeyValueStore):
+    """Базовое хранилище с пакетной отложенной записью изменений"""
+
+    def __init__(
+        self,
+        flush_interval: float = 0.05,
+        batch_size: int = 100,
+        max_retry_interval: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # Предел интервала повторной записи, удваивающегося после каждой ошибки подряд
+        self.max_retry_interval = max_retry_interval
+        self._clock = clock
+
+        self._pending: Dict[str, _PendingItem] = {}
+        self._inflight: Dict[str, _PendingItem] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._closed = False
+
+        self.writes = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        # Ошибки записи подряд: задают задержку повтора и частоту предупреждений в журнале
+        self._failures = 0
+
+    @abstractmethod
+    async def _read(self, key: str) -> Optional[str]:
+        """Чтение значения из хранилища"""
+
+    @abstractmethod
+    async def _write_batch(self, batch: Dict[str, _PendingItem]) -> None:
+        """Запись пакета изменений в хранилище"""
+
+    async def _close(self) -> None:
+        """Закрытие соединения с хранилищем"""
+
+    def _lookup_pending(self, key: str) -> Tuple[bool, Optional[str]]:
+        # Чтение собственных, еще не записанных изменений
+        item = self._pending.get(key)
+        if item is None:
+            item = self._inflight.get(key)
+        if item is None:
+            return False, None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= self._clock():
+            return True, None
+        return True, value
+
+    async def get(self, key: str) -> Optional[str]:
+        found, value = self._lookup_pending(key)
+        if found:
+            return value
+        return await self._read(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._enqueue(key, (value, self._clock() + ttl if ttl else None))
+
+    async def delete(self, key: str) -> None:
+        self._enqueue(key, (None, None))
+
+    def _enqueue(self, key: str, item: _PendingItem):
+        if self._closed:
+            raise RuntimeError("Storage is closed")
+        self._pending[key] = item
+        self.writes += 1
+        if self._flush_task is None or self._flush_task.done():
+            delay = 0 if len(self._pending) >= self.batch_size else self.flush_interval
+            self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+
+    async def _delayed_flush(self, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+        except Exception:
+            self._failures += 1
+            self.flush_failures += 1
+            # Трассировка только у первой ошибки серии, далее запись при 2, 4, 8... ошибках подряд
+            if self._failures & (self._failures - 1) == 0:
+                logger.warning(
+                    "Storage flush failed, batch re-queued",
+                    exc_info=self._failures == 1,
+                    extra={"failures": self._failures},
+                )
+        else:
+            if self._failures:
+                logger.info("Storage flush recovered", extra={"failures": self._failures})
+                self._failures = 0
+        # Изменения, пришедшие во время записи или оставшиеся после ошибки
+        if self._pending and not self._closed:
+            self._flush_task = asyncio.create_task(self._delayed_flush(self.retry_delay()))
+
+    def retry_delay(self) -> float:
+        """Задержка следующей записи: flush_interval, после ошибок - экспоненциально до max_retry_interval"""
+        if not self._failures:
+            return self.flush_interval
+        return min(self.max_retry_interval, self.flush_interval * 2 ** self._failures)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+            try:
+                await self._write_batch(batch)
+                self.flushes += 1
+            except Exception:
+                # Возврат пакета, кроме ключей, измененных за время попытки записи
+                for key, item in batch.items():
+                    self._pending.setdefault(key, item)
+                raise
+            finally:
+                self._inflight = {}
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        task = self._flush_task
+        if task is not None and not task.done():
+            task.cancel()
+        try:
+            await self.flush()
+        finally:
+            self._closed = True
+            await self._close()
+
+
+class SQLiteStore(BatchingStore):
+    """Встроенное хранилище SQLite, общее для процессов одного хоста"""
+
+    def __init__(self, path: str, purge_interval: float = 60.0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.path = path
+        self.purge_interval = purge_interval
+        # Все обращения к базе выполняются в одном фоновом потоке
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_purge = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at)")
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _read_sync(self, key: str, now: float) -> Optional[str]:
+        row = self._connection().execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        return row[0]
+
+    def _write_sync(self, batch: Dict[str, _PendingItem], now: float):
+        conn = self._connection()
+        upserts = [(key, value, expires_at) for key, (value, expires_at) in batch.items() if value is not None]
+        deletes = [(key,) for key, (value, _) in batch.items() if value is None]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                upserts,
+            )
+            conn.executemany("DELETE FROM kv WHERE key = ?", deletes)
+            # Периодическая очистка истекших записей
+            if now - self._last_purge >= self.purge_interval:
+                conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                self._last_purge = now
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _close_sync(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _read(self, key: str) -> Optional[str]:
+        return await self._run(self._read_sync, key, self._clock())
+
+    async def _write_batch(self, batch: Dict[str, _PendingItem]) -> None:
+        await self._run(self._write_sync, batch, self._clock())
+
+    async def _close(self) -> None:
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=False)
+
+
+class RedisError(Exception):
+    """Ошибка, возвращенная сервером Redis"""
+
+
+def encode_command(args: Sequence[Any]) -> bytes:
+    """Кодирование команды в протокол RESP"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Чтение одного ответа в протоколе RESP"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by Redis server")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode()
+    if prefix == b"-":
+        return RedisError(payload.decode())
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply prefix: {prefix!r}")
+
+
+class RedisStore(BatchingStore):
+    """Хранилище на Redis (или любом сервере с протоколом RESP) с конвейерной отправкой команд"""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._connect_lock = asyncio.Lock()
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._reader_task = asyncio.create_task(self._read_replies(reader))
+            setup: List[Tuple[Any, ...]] = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            try:
+                if setup:
+                    await self._send(setup, writer)
+            except BaseException as e:
+                # Без AUTH/SELECT соединение не используется: следующая команда подключится заново
+                task, self._reader_task = self._reader_task, None
+                task.cancel()
+                writer.close()
+                self._disconnect(ConnectionError(f"Redis connection setup failed: {e!r}"))
+                raise
+            # Соединение доступно другим командам только после успешной настройки
+            self._reader, self._writer = reader, writer
+
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        """Разбор ответов сервера по порядку отправки команд"""
+        try:
+            while True:
+                reply = await read_reply(reader)
+                waiter = self._waiters.popleft()
+                if waiter.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    waiter.set_exception(reply)
+                else:
+                    waiter.set_result(reply)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+            self._disconnect(ConnectionError(f"Redis connection lost: {e}"))
+
+    def _disconnect(self, error: Exception):
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is not None:
+            writer.close()
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(error)
+
+    async def _send(self, commands: Sequence[Sequence[Any]], writer: Optional[asyncio.StreamWriter] = None) -> List[Any]:
+        if writer is None:
+            writer = self._writer
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in commands]
+        # Запись в сокет и постановка ожидающих в очередь без переключения задач
+        self._waiters.extend(futures)
+        writer.write(b"".join(encode_command(command) for command in commands))
+        await writer.drain()
+        return await asyncio.gather(*futures)
+
+    async def execute(self, *commands: Sequence[Any]) -> List[Any]:
+        """Отправка команд одним пакетом (pipeline)"""
+        if self._writer is None:
+            await self._connect()
+        return await self._send(commands)
+
+    async def _read(self, key: str) -> Optional[str]:
+        (value,) = await self.execute(("GET", key))
+        return value.decode() if value is not None else None
+
+    async def _write_batch(self, batch: Dict[str, _PendingItem]) -> None:
+        now = self._clock()
+        commands: List[Tuple[Any, ...]] = []
+        for key, (value, expires_at) in batch.items():
+            if value is None:
+                commands.append(("DEL", key))
+            elif expires_at is None:
+                commands.append(("SET", key, value))
+            elif expires_at > now:
+                commands.append(("SET", key, value, "PX", max(1, int((expires_at - now) * 1000))))
+            else:
+                commands.append(("DEL", key))
+        await self.execute(*commands)
+
+    async def _close(self) -> None:
+        task = self._reader_task
+        self._disconnect(ConnectionError("Redis store is closed"))
+        if task is not None:
+            task.cancel()
+
+
+class CachedStore(KeyValueStore):
+    """Локальный кэш чтения поверх общего хранилища"""
+
+    def __init__(self, inner: KeyValueStore, ttl: float = 1.0, max_size: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.inner = inner
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._cache: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: Optional[str]):
+        if self.ttl <= 0:
+            return
+        self._cache[key] = (value, self._clock() + self.ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._cache.get(key)
+        if item is not None and item[1] > self._clock():
+            self.hits += 1
+            return item[0]
+        self.misses += 1
+        value = await self.inner.get(key)
+        self._remember(key, value)
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        await self.inner.set(key, value, ttl)
+        self._remember(key, value)
+
+    async def delete(self, key: str) -> None:
+        await self.inner.delete(key)
+        self._remember(key, None)
+
+    async def flush(self) -> None:
+        await self.inner.flush()
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика локального кэша чтения"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class KeyValueFSMStorage(BaseStorage):
+    """Хранилище состояний FSM aiogram поверх KeyValueStore"""
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        key_builder: Optional[KeyBuilder] = None,
+        state_ttl: Optional[float] = None,
+    ):
+        self.store = store
+        self.key_builder = key_builder or DefaultKeyBuilder(prefix="fsm")
+        self.state_ttl = state_ttl
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key, "state")
+        if isinstance(state, State):
+            state = state.state
+        if state is None:
+            await self.store.delete(storage_key)
+        else:
+            await self.store.set(storage_key, state, self.state_ttl)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self.store.get(self.key_builder.build(key, "state"))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.store.delete(storage_key)
+        else:
+            await self.store.set(storage_key, json.dumps(dict(data)), self.state_ttl)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        raw = await self.store.get(self.key_builder.build(key, "data"))
+        return json.loads(raw) if raw else {}
+
+    async def close(self) -> None:
+        await self.store.close()
+
+
+def create_store(url: str) -> KeyValueStore:
+    """Создание хранилища по URL: memory://, sqlite:///path.db или redis://[:password@]host:port/db"""
+    parsed = urlparse(url)
+    options = {key: float(values[-1]) for key, values in parse_qs(parsed.query).items()}
+    batching = {name: options[name] for name in ("flush_interval", "max_retry_interval") if name in options}
+    if "batch_size" in options:
+        batching["batch_size"] = int(options["batch_size"])
+
+    if parsed.scheme in ("", "memory"):
+        return MemoryStore()
+    if parsed.scheme == "sqlite":
+        # sqlite:///relative.db -> relative.db, sqlite:////abs/path.db -> /abs/path.db
+        path = unquote(parsed.path)[1:]
+        return SQLiteStore(path or "bot_state.db", **batching)
+    if parsed.scheme == "redis":
+        db = int(parsed.path.lstrip("/") or 0)
+        return RedisStore(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=db,
+            password=unquote(parsed.password) if parsed.password else None,
+            **batching,
+        )
+    raise ValueError(f"Unsupported storage URL scheme: {parsed.scheme}")
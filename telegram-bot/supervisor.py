@@ -0,0 +1,478 @@
+import asyncio
+import bisect
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import os
+import signal
+import struct
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot
+
+from codec import JsonCodec, get_codec
+from executor import UpdateExecutor
+from menus import BOT_COMMANDS
+from lifecycle import Lifecycle, confirm_updates
+from readiness import ReadinessProber
+from reminders import INDEX_SHARDS
+
+
+logger = logging.getLogger(__name__)
+
+
+# Типы обновлений, на которые подписан бот (совпадает с dp.resolve_used_update_types())
+ALLOWED_UPDATES = ["callback_query", "message"]
+# Заголовок кадра IPC: ключ чата и длина тела обновления в JSON
+FRAME = struct.Struct("!qI")
+# Пауза перед повторным подключением к рабочему процессу и опросом Telegram
+RECONNECT_DELAY = 0.2
+POLL_RETRY_DELAY = 1.0
+
+
+def chat_key(update: Dict[str, Any]) -> int:
+    """Ключ упорядочивания обновления: чат, иначе пользователь, иначе update_id"""
+    for event_type, event in update.items():
+        if event_type == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat is not None:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user is not None:
+            return user["id"]
+    return update.get("update_id", 0)
+
+
+def _hash(value: str) -> int:
+    # Стабильный между процессами хеш (hash() строк зависит от PYTHONHASHSEED)
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Консистентное хеширование частей чатов по рабочим процессам
+
+    Чаты делятся на INDEX_SHARDS частей (chat_id % INDEX_SHARDS) - тех же, что
+    части индекса напоминаний, поэтому каждый процесс записывает только свои
+    части индекса. При изменении числа процессов переезжает лишь ~1/N частей.
+    """
+
+    def __init__(self, workers: int, replicas: int = 160, partitions: int = INDEX_SHARDS):
+        if not 1 <= workers <= partitions:
+            raise ValueError(f"Number of workers must be between 1 and {partitions}")
+        points = sorted((_hash(f"worker-{worker}:{replica}"), worker) for worker in range(workers) for replica in range(replicas))
+        keys = [point for point, _ in points]
+        self.workers = workers
+        self.partitions = partitions
+        # Таблица часть -> процесс считается один раз: маршрутизация стоит O(1)
+        self.owners: List[int] = [
+            points[bisect.bisect(keys, _hash(f"partition-{partition}")) % len(points)][1]
+            for partition in range(partitions)
+        ]
+
+    def worker_for(self, key: int) -> int:
+        return self.owners[key % self.partitions]
+
+    def partitions_of(self, worker: int) -> List[int]:
+        return [partition for partition, owner in enumerate(self.owners) if owner == worker]
+
+
+class UpdateReceiver:
+    """Прием обновлений рабочим процессом по локальному сокету
+
+    Кадры одного соединения читаются по порядку и передаются исполнителю:
+    обновления одного чата обрабатываются последовательно, разных чатов -
+    параллельно в пределах его общего лимита.
+    """
+
+    def __init__(self, handle: Callable[[bytes], Awaitable[Any]], executor: Optional[UpdateExecutor] = None):
+        self.handle = handle
+        self.executor = executor or UpdateExecutor()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._connections: Set[asyncio.Task] = set()
+        self.received_total = 0
+        self.failed_total = 0
+
+    async def start(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._serve, path)
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Закрытие сокета и ожидание обработки уже принятых обновлений (не дольше timeout)"""
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await self._server.wait_closed()
+            self._server = None
+        if self._tasks:
+            _, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                key, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+                self.submit(key, await reader.readexactly(size))
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def submit(self, key: int, body: bytes):
+        self.received_total += 1
+        # Задачи начинаются в порядке создания и сразу встают в очередь чата
+        task = asyncio.create_task(self._process(key, body))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, key: int, body: bytes):
+        try:
+            await self.executor.run(key, lambda: self.handle(body))
+        except Exception:
+            self.failed_total += 1
+            logger.exception("Update processing failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received_total": self.received_total,
+            "failed_total": self.failed_total,
+            "active_chats": self.executor.stats()["active_chats"],
+        }
+
+
+class WorkerChannel:
+    """Отправка обновлений одному рабочему процессу с сохранением порядка
+
+    Единственная задача-отправитель пишет кадры в порядке поступления; при
+    разрыве соединения (перезапуск процесса) она переподключается и отправляет
+    неотправленный кадр повторно.
+    """
+
+    def __init__(self, path: str, queue_size: int = 1000):
+        self.path = path
+        self._queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self.sent_total = 0
+        self.reconnects_total = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание отправки всех поставленных в очередь обновлений"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Worker channel not flushed", extra={"path": self.path, "queued": self._queue.qsize()})
+            return False
+        return True
+
+    async def put(self, key: int, body: bytes):
+        """Постановка обновления в очередь (ожидание при переполненной очереди)"""
+        await self._queue.put(FRAME.pack(key, len(body)) + body)
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        while True:
+            try:
+                _, writer = await asyncio.open_unix_connection(self.path)
+                return writer
+            except (FileNotFoundError, ConnectionError):
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _run(self):
+        writer: Optional[asyncio.StreamWriter] = None
+        frame: Optional[bytes] = None
+        try:
+            while True:
+                if frame is None:
+                    frame = await self._queue.get()
+                if writer is None:
+                    writer = await self._connect()
+                try:
+                    writer.write(frame)
+                    await writer.drain()
+                except ConnectionError:
+                    writer.close()
+                    writer = None
+                    self.reconnects_total += 1
+                    continue
+                frame = None
+                self.sent_total += 1
+                self._queue.task_done()
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "sent_total": self.sent_total,
+            "reconnects_total": self.reconnects_total,
+        }
+
+
+def run_worker(index: int, workers: int, socket_path: str, port: int):
+    """Точка входа рабочего процесса"""
+    # Остановкой управляет супервизор (SIGTERM); Ctrl+C в терминале ловит только он
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from bot import SubTrackerBot
+    from bot_logging import setup_logging_from_env
+
+    log_listener = setup_logging_from_env()
+    try:
+        bot = SubTrackerBot()
+        bot.reminders.shards = HashRing(workers).partitions_of(index)
+        asyncio.run(bot.run_worker(socket_path, port))
+    except Exception:
+        logger.exception("Worker failed", extra={"worker": index})
+    finally:
+        log_listener.stop()
+
+
+class Supervisor:
+    """Входной процесс: получает обновления и распределяет их по рабочим процессам"""
+
+    def __init__(self):
+        self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+        if not self.bot_token:
+            raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
+        self.workers = int(os.getenv("BOT_WORKERS", "1"))
+        self.ring = HashRing(self.workers)
+        self.socket_dir = os.getenv("BOT_WORKER_SOCKET_DIR") or tempfile.mkdtemp(prefix="subtracker-")
+        self.worker_port_base = int(os.getenv("BOT_WORKER_PORT_BASE", "8090"))
+        self.poll_timeout = int(os.getenv("POLLING_TIMEOUT", "30"))
+        self.codec: JsonCodec = get_codec(os.getenv("JSON_CODEC", "auto"))
+
+        self.update_mode = os.getenv("BOT_MODE", "polling").lower()
+        if self.update_mode not in ("polling", "webhook"):
+            raise ValueError("BOT_MODE must be either 'polling' or 'webhook'")
+        self.webhook_url = os.getenv("WEBHOOK_URL", "").rstrip("/")
+        self.webhook_path = os.getenv("WEBHOOK_PATH", "/webhook")
+        self.webhook_secret = os.getenv("WEBHOOK_SECRET")
+        if self.update_mode == "webhook" and not (self.webhook_url and self.webhook_secret):
+            raise ValueError("WEBHOOK_URL and WEBHOOK_SECRET environment variables are required in webhook mode")
+
+        self.bot = Bot(token=self.bot_token)
+        self.channels = [
+            WorkerChannel(self.socket_path(index), queue_size=int(os.getenv("BOT_WORKER_QUEUE_SIZE", "1000")))
+            for index in range(self.workers)
+        ]
+        self._context = multiprocessing.get_context("spawn")
+        self.processes: List[Optional[multiprocessing.process.BaseProcess]] = [None] * self.workers
+        self.restarts_total = 0
+        self.routed_total = 0
+        # Остановка: обновления, уже полученные от Telegram, передаются рабочим процессам,
+        # которые сами дожидаются своих обработчиков (SHUTDOWN_TIMEOUT)
+        self.lifecycle = Lifecycle(drain_timeout=float(os.getenv("SHUTDOWN_TIMEOUT", "25")))
+        # Смещение getUpdates после последнего переданного процессам обновления
+        self.poll_offset: Optional[int] = None
+
+        # Готовность входного процесса: Telegram доступен и все рабочие процессы живы
+        # (backend API проверяют рабочие процессы на своих /ready)
+        self.readiness = ReadinessProber(
+            {"telegram": self.probe_telegram, "workers": self.probe_workers},
+            interval=float(os.getenv("READY_CHECK_INTERVAL", "10")),
+            timeout=float(os.getenv("READY_CHECK_TIMEOUT", "3")),
+            failure_threshold=int(os.getenv("READY_FAILURE_THRESHOLD", "2")),
+            dumps=self.codec.dumps_str,
+        )
+
+        self.app = web.Application()
+        self.app.router.add_get('/health', self.health_check)
+        self.app.router.add_get('/ready', self.readiness.handle_ready)
+        if self.update_mode == "webhook":
+            self.app.router.add_post(self.webhook_path, self.handle_webhook)
+
+    def socket_path(self, index: int) -> str:
+        return os.path.join(self.socket_dir, f"worker-{index}.sock")
+
+    # --- Рабочие процессы ---
+
+    def spawn(self, index: int):
+        process = self._context.Process(
+            target=run_worker,
+            args=(index, self.workers, self.socket_path(index), self.worker_port_base + index),
+            name=f"subtracker-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info("Worker started", extra={"worker": index, "pid": process.pid})
+
+    async def watch_workers(self, interval: float = 1.0):
+        """Перезапуск завершившихся рабочих процессов"""
+        while not self.lifecycle.stopping:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self.lifecycle.stopping:
+                    logger.warning("Worker exited, restarting", extra={"worker": index, "exitcode": process.exitcode})
+                    self.restarts_total += 1
+                    self.spawn(index)
+
+    def terminate_workers(self, timeout: float = 10.0):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    # --- Маршрутизация ---
+
+    async def route(self, update: Dict[str, Any], body: Optional[bytes] = None):
+        """Передача обновления процессу, которому принадлежит его чат"""
+        key = chat_key(update)
+        if body is None:
+            body = self.codec.dumps(update)
+        self.routed_total += 1
+        await self.channels[self.ring.worker_for(key)].put(key, body)
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        # Сравнение за постоянное время: время ответа не выдает совпавшую часть секрета
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not self.webhook_secret or not hmac.compare_digest(secret.encode(), self.webhook_secret.encode()):
+            return web.Response(status=401)
+        if self.lifecycle.stopping:
+            # Telegram повторит обновление, его получит новый экземпляр
+            return web.Response(status=503)
+        body = await request.read()
+        try:
+            update = self.codec.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+        # Тело передается процессу без повторного кодирования
+        await self.route(update, body)
+        return web.Response()
+
+    async def poll(self):
+        """Long polling getUpdates без разбора обновлений в модели aiogram"""
+        url = self.bot.session.api.api_url(token=self.bot_token, method="getUpdates")
+        timeout = aiohttp.ClientTimeout(total=self.poll_timeout + 10)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while True:
+                params: Dict[str, Any] = {"timeout": self.poll_timeout, "allowed_updates": ALLOWED_UPDATES}
+                if self.poll_offset is not None:
+                    params["offset"] = self.poll_offset
+                try:
+                    async with session.post(url, data=self.codec.dumps(params), headers={"Content-Type": "application/json"}) as response:
+                        result = self.codec.loads(await response.read())
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    logger.warning("getUpdates failed", extra={"error": repr(e)})
+                    await asyncio.sleep(POLL_RETRY_DELAY)
+                    continue
+                if not result.get("ok"):
+                    logger.warning("getUpdates failed", extra={"error": result.get("description")})
+                    await asyncio.sleep(POLL_RETRY_DELAY)
+                    continue
+                for update in result["result"]:
+                    await self.route(update)
+                    # Смещение сдвигается только после передачи процессу
+                    self.poll_offset = update["update_id"] + 1
+
+    # --- Запуск ---
+
+    async def probe_telegram(self):
+        await self.bot.get_me()
+
+    async def probe_workers(self):
+        dead = [index for index, process in enumerate(self.processes) if process is None or not process.is_alive()]
+        if dead:
+            raise RuntimeError(f"workers not running: {dead}")
+
+    async def health_check(self, request):
+        return web.json_response(self.stats(), dumps=self.codec.dumps_str)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": "UP",
+            "component": "telegram-bot-supervisor",
+            "mode": self.update_mode,
+            "routed_total": self.routed_total,
+            "restarts_total": self.restarts_total,
+            "readiness": self.readiness.stats(),
+            "workers": [
+                {
+                    "pid": process.pid if process is not None else None,
+                    "alive": process is not None and process.is_alive(),
+                    "partitions": len(self.ring.partitions_of(index)),
+                    **channel.stats(),
+                }
+                for index, (process, channel) in enumerate(zip(self.processes, self.channels))
+            ],
+        }
+
+    async def start(self):
+        """Запуск рабочих процессов и прием обновлений"""
+        logger.info("Starting supervisor", extra={"workers": self.workers, "mode": self.update_mode})
+        for index in range(self.workers):
+            self.spawn(index)
+        for channel in self.channels:
+            channel.start()
+        watcher = asyncio.create_task(self.watch_workers())
+        self.lifecycle.on_stop.append(self.readiness.set_draining)
+        # SIGTERM (остановка контейнера) и Ctrl+C завершают прием обновлений и рабочие процессы
+        self.lifecycle.install_signal_handlers()
+
+        runner = web.AppRunner(self.app)
+        try:
+            await runner.setup()
+            await self.bot.set_my_commands(BOT_COMMANDS)
+            site = web.TCPSite(runner, '0.0.0.0', 8081)
+            await site.start()
+            await self.readiness.start()
+            if self.update_mode == "webhook":
+                await self.bot.set_webhook(
+                    f"{self.webhook_url}{self.webhook_path}",
+                    secret_token=self.webhook_secret,
+                    allowed_updates=ALLOWED_UPDATES,
+                )
+                await self.lifecycle.run(asyncio.Event().wait())
+            else:
+                await self.bot.delete_webhook()
+                await self.lifecycle.run(self.poll())
+        finally:
+            self.lifecycle.request_stop()
+            watcher.cancel()
+            await self.readiness.stop()
+            # Уже полученные обновления передаются рабочим процессам до их остановки
+            for channel in self.channels:
+                await channel.flush(self.lifecycle.remaining())
+            for channel in self.channels:
+                await channel.stop()
+            if self.update_mode == "polling" and self.poll_offset is not None:
+                await confirm_updates(self.bot, self.poll_offset - 1)
+            # Рабочие процессы по SIGTERM сами дожидаются своих обработчиков
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.terminate_workers, self.lifecycle.drain_timeout + 5
+            )
+            await runner.cleanup()
+            await self.bot.session.close()
+            self.lifecycle.remove_signal_handlers()
+            logger.info("Supervisor stopped")
@@ -0,0 +1,25 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from bot import SubTrackerBot
+from fake_backend import FakeBackend
+
+@pytest.fixture
+def fake_backend():
+    """Локальный backend API в памяти: адрес занят сразу, сервер запускает тест (async with fake_backend)"""
+    backend = FakeBackend()
+    backend.bind()
+    yield backend
+    backend.close()
+
+@pytest.fixture
+def backend_bot(fake_backend):
+    """Бот с запросами к fake_backend через настоящие соединения; Telegram подменен"""
+    env = {
+        'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ',
+        'BACKEND_API_URL': fake_backend.url,
+        'BACKEND_MAX_RETRIES': '0',
+    }
+    with patch.dict('os.environ', env):
+        bot = SubTrackerBot()
+    bot.bot.session.make_request = AsyncMock(return_value=True)
+    return bot
@@ -255,6 +255,28 @@ class TestAPIIntegration:
             # Проверяем, что отправлено сообщение об успешном удалении
             message.answer.assert_called_once_with("✅ Подписка успешно удалена!")
     
+    @pytest.mark.asyncio
+    async def test_handle_delete_subscription_no_content(self, bot, message):
+        """Тест удаления по контракту backend: 204 No Content - успех, 404 - ошибка"""
+        from aiogram.filters import CommandObject
+        
+        bot.user_tokens[12345] = "test_token"
+        command = Mock(spec=CommandObject)
+        command.args = "sub1"
+        
+        with aioresponses() as m:
+            # SubscriptionController.deleteSubscription: ResponseEntity.noContent() или notFound()
+            m.delete("http://localhost:8080/api/subscriptions/sub1", status=204)
+            m.delete("http://localhost:8080/api/subscriptions/sub1", status=404)
+            
+            await bot.handle_delete_command(message, command)
+            await bot.handle_delete_command(message, command)
+        
+        assert [call.args[0] for call in message.answer.call_args_list] == [
+            "✅ Подписка успешно удалена!",
+            "❌ Ошибка при удалении подписки",
+        ]
+    
     @pytest.mark.asyncio
     async def test_handle_stats_command_success(self, bot, message):
         """Тест успешного получения статистики"""
@@ -303,5 +325,88 @@ class TestAPIIntegration:
             assert "Всего подписок: 2" in message_text
             assert "Общие расходы в месяц: $25.98" in message_text
 
+    @pytest.mark.asyncio
+    async def test_list_uses_subscription_cache(self, bot, message):
+        """Тест повторного /list без запроса к API"""
+        bot.user_tokens[12345] = "test_token"
+        
+        subscriptions_data = [
+            {
+                "id": "sub1",
+                "userId": "12345",
+                "name": "Netflix",
+                "price": "15.99",
+                "currency": "USD",
+                "billingPeriod": "monthly",
+                "nextPayment": "2023-12-31",
+                "category": "Video",
+                "isActive": True
+            }
+        ]
+        
+        with aioresponses() as m:
+            # Мокируем только один GET запрос: второй должен обслуживаться из кэша
+            m.get(
+                "http://localhost:8080/api/subscriptions",
+                payload=subscriptions_data,
+                status=200
+            )
+            
+            await bot.handle_list_command(message)
+            await bot.handle_list_command(message)
+        
+        assert message.answer.call_count == 2
+        for call in message.answer.call_args_list:
+            assert "Netflix" in call.args[0]
+        assert bot.subscription_cache.stats()["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_delete_updates_subscription_cache(self, bot, message):
+        """Тест удаления подписки из кэша после /delete"""
+        from aiogram.filters import CommandObject
+        
+        bot.user_tokens[12345] = "test_token"
+        bot.subscription_cache.set(12345, "test_token", [Subscription(
+            id="sub1", user_id="12345", name="Netflix", price="15.99", currency="USD",
+            billing_period="monthly", next_payment="2023-12-31", category="Video", is_active=True
+        )])
+        
+        command = Mock(spec=CommandObject)
+        command.args = "sub1"
+        
+        with aioresponses() as m:
+            m.delete("http://localhost:8080/api/subscriptions/sub1", status=200)
+            await bot.handle_delete_command(message, command)
+        
+        assert bot.subscription_cache.get(12345, "test_token") == []
+
+    @pytest.mark.asyncio
+    async def test_stale_list_not_cached(self, bot, message):
+        """Тест списка, запрошенного до удаления и полученного после: в кэш не попадает"""
+        from backend_client import BackendResponse
+        
+        bot.user_tokens[12345] = "test_token"
+        started = asyncio.Event()
+        release = asyncio.Event()
+        body = b'[{"id": "sub1", "userId": "12345", "name": "Netflix", "price": "15.99", "currency": "USD", "billingPeriod": "monthly", "nextPayment": "2023-12-31", "category": "Video", "isActive": true}]'
+        
+        async def backend_request(method, path, **kwargs):
+            if method == "DELETE":
+                return BackendResponse(status=204, body=b"")
+            started.set()
+            await release.wait()
+            return BackendResponse(status=200, body=body)
+        
+        bot.backend.request = backend_request
+        load = asyncio.create_task(bot.load_subscriptions(12345, "test_token"))
+        await started.wait()
+        command = Mock()
+        command.args = "sub1"
+        await bot.handle_delete_command(message, command)
+        release.set()
+        
+        assert [sub.id for sub in await load] == ["sub1"]
+        assert bot.subscription_cache.get(12345, "test_token") is None
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
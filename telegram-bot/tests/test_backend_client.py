@@ -0,0 +1,244 @@
+import pytest
+import asyncio
+import aiohttp
+from aioresponses import aioresponses
+from yarl import URL
+from backend_client import BackendClient, BackendResponse, BackendUnavailableError, CircuitBreaker
+
+class TestBackendClient:
+    """Тесты для общего HTTP клиента backend API"""
+
+    @pytest.fixture
+    def client(self):
+        """Фикстура для создания клиента"""
+        return BackendClient("http://localhost:8080/", pool_size=10, pool_size_per_host=5)
+
+    def test_base_url_normalized(self, client):
+        """Тест нормализации базового URL"""
+        assert client.base_url == "http://localhost:8080"
+
+    def test_pool_stats_before_start(self, client):
+        """Тест статистики пула до запуска"""
+        stats = client.pool_stats()
+        assert stats["limit"] == 10
+        assert stats["limit_per_host"] == 5
+        assert stats["active"] == 0
+        assert stats["idle"] == 0
+
+    @pytest.mark.asyncio
+    async def test_session_is_reused(self, client):
+        """Тест повторного использования одной сессии"""
+        await client.start()
+        session = client.session
+
+        with aioresponses() as m:
+            m.get("http://localhost:8080/api/subscriptions", payload=[], status=200)
+            m.get("http://localhost:8080/api/subscriptions", payload=[], status=200)
+
+            await client.request("GET", "/api/subscriptions", token="t")
+            await client.request("GET", "/api/subscriptions", token="t")
+
+        # Проверяем, что сессия не пересоздавалась
+        assert client.session is session
+        assert client.pool_stats()["requests_total"] == 2
+
+        await client.close()
+        assert client.session is None
+
+    @pytest.mark.asyncio
+    async def test_request_sends_token(self, client):
+        """Тест передачи JWT токена в заголовке"""
+        with aioresponses() as m:
+            m.get("http://localhost:8080/api/subscriptions", payload=[{"id": "1"}], status=200)
+
+            response = await client.request("GET", "/api/subscriptions", token="jwt")
+
+            request = m.requests[("GET", URL("http://localhost:8080/api/subscriptions"))][0]
+            assert request.kwargs["headers"]["Authorization"] == "Bearer jwt"
+
+        assert response.status == 200
+        assert response.json() == [{"id": "1"}]
+        await client.close()
+
+    @pytest.fixture
+    def slow_send(self, client):
+        """Фикстура, заменяющая отправку запроса на управляемую событием"""
+        release = asyncio.Event()
+        calls = []
+
+        async def send(method, path, token=None, payload=None, data=None, timeout=None):
+            calls.append((method, path, token))
+            await release.wait()
+            return BackendResponse(status=200, body=b"[]")
+
+        client._send = send
+        return release, calls
+
+    @pytest.mark.asyncio
+    async def test_identical_reads_coalesced(self, client, slow_send):
+        """Тест объединения одинаковых параллельных GET запросов"""
+        release, calls = slow_send
+        tasks = [asyncio.create_task(client.request("GET", "/api/subscriptions", token="t")) for _ in range(5)]
+        other = asyncio.create_task(client.request("GET", "/api/subscriptions", token="other"))
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(*tasks, other)
+        assert len(calls) == 2
+        assert all(result.json() == [] for result in results)
+        stats = client.pool_stats()
+        assert stats["coalesced_total"] == 4
+        assert stats["in_flight_reads"] == 0
+
+    @pytest.mark.asyncio
+    async def test_writes_not_coalesced(self, client, slow_send):
+        """Тест независимого выполнения запросов с телом"""
+        release, calls = slow_send
+        release.set()
+        await asyncio.gather(*(client.request("POST", "/api/subscriptions", token="t", payload={}) for _ in range(3)))
+        assert len(calls) == 3
+        assert client.coalesced_total == 0
+
+    @pytest.mark.asyncio
+    async def test_coalesced_read_cancellation(self, client, slow_send):
+        """Тест отмены одного из ожидающих объединенного запроса"""
+        release, calls = slow_send
+        first = asyncio.create_task(client.request("GET", "/api/subscriptions", token="t"))
+        second = asyncio.create_task(client.request("GET", "/api/subscriptions", token="t"))
+        await asyncio.sleep(0)
+
+        # Отмена одного вызывающего не прерывает запрос второго
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert (await second).status == 200
+        assert first.cancelled()
+
+        # Запрос, который никто не ждет, отменяется
+        release.clear()
+        third = asyncio.create_task(client.request("GET", "/api/subscriptions", token="t"))
+        await asyncio.sleep(0)
+        third.cancel()
+        await asyncio.sleep(0)
+        assert client.pool_stats()["in_flight_reads"] == 0
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_request_observer(self):
+        """Тест передачи статуса и длительности запроса наблюдателю"""
+        observed = []
+        client = BackendClient("http://localhost:8080", on_request=lambda *args: observed.append(args))
+        with aioresponses() as m:
+            m.delete("http://localhost:8080/api/subscriptions/1", status=404)
+            await client.request("DELETE", "/api/subscriptions/1", token="t")
+
+        method, path, status, elapsed = observed[0]
+        assert (method, path, status) == ("DELETE", "/api/subscriptions/1", "404")
+        assert elapsed >= 0
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_idempotent_requests_retried(self):
+        """Тест повтора GET при временной недоступности backend API"""
+        client = BackendClient("http://localhost:8080", backoff_base=0)
+        with aioresponses() as m:
+            m.get("http://localhost:8080/api/subscriptions", status=503)
+            m.get("http://localhost:8080/api/subscriptions", exception=aiohttp.ClientConnectionError())
+            m.get("http://localhost:8080/api/subscriptions", payload=[], status=200)
+
+            response = await client.request("GET", "/api/subscriptions", token="t", timeout=3)
+
+            request = m.requests[("GET", URL("http://localhost:8080/api/subscriptions"))][0]
+            assert request.kwargs["timeout"].total == 3
+
+        assert response.status == 200
+        assert client.pool_stats()["retries_total"] == 2
+        assert client.breaker.state == CircuitBreaker.CLOSED
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_post_not_retried(self):
+        """Тест отсутствия повторов для неидемпотентных запросов"""
+        client = BackendClient("http://localhost:8080", backoff_base=0)
+        with aioresponses() as m:
+            m.post("http://localhost:8080/api/subscriptions", status=503)
+            response = await client.request("POST", "/api/subscriptions", token="t", payload={})
+
+        assert response.status == 503
+        assert client.retries_total == 0
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self):
+        """Тест отклонения запросов при разомкнутом автомате защиты"""
+        client = BackendClient("http://localhost:8080", max_retries=0, breaker=CircuitBreaker(failure_threshold=2))
+        with aioresponses() as m:
+            m.get("http://localhost:8080/api/subscriptions", status=500, repeat=True)
+            for _ in range(2):
+                assert (await client.request("GET", "/api/subscriptions", token="t")).status == 500
+            with pytest.raises(BackendUnavailableError):
+                await client.request("GET", "/api/subscriptions", token="t")
+            assert len(m.requests[("GET", URL("http://localhost:8080/api/subscriptions"))]) == 2
+
+        assert client.breaker.stats()["state"] == "open"
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_probe_bypasses_breaker(self):
+        """Тест проверки доступности: один запрос без повторов, автомат защиты не меняется"""
+        client = BackendClient("http://localhost:8080", backoff_base=0, breaker=CircuitBreaker(failure_threshold=1))
+        with aioresponses() as m:
+            m.get("http://localhost:8080/api/health", status=503, repeat=True)
+            m.get("http://localhost:8080/api/subscriptions", payload=[], status=200)
+            for _ in range(3):
+                assert (await client.probe("/api/health", timeout=1)).status == 503
+            assert len(m.requests[("GET", URL("http://localhost:8080/api/health"))]) == 3
+            assert (await client.request("GET", "/api/subscriptions", token="t")).status == 200
+
+        assert client.breaker.state == CircuitBreaker.CLOSED
+        assert client.retries_total == 0
+        await client.close()
+
+    def test_empty_body_json(self):
+        """Тест разбора пустого тела ответа"""
+        assert BackendResponse(status=200, body=b"").json() is None
+
+class TestCircuitBreaker:
+    """Тесты для автомата защиты backend API"""
+
+    def test_open_half_open_close(self):
+        """Тест переходов между состояниями автомата"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+        # После reset_timeout пропускается только один пробный запрос
+        now[0] = 10
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow()
+
+        # Неудачная проба снова размыкает автомат
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        now[0] = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.stats()["opened_total"] == 2
+        assert breaker.stats()["rejected_total"] == 2
+
+    def test_cancelled_probe_released(self):
+        """Тест освобождения пробного запроса при отмене"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.release()
+        assert breaker.allow()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,107 @@
+import pytest
+from types import SimpleNamespace
+from cache import SubscriptionCache
+
+class FakeClock:
+    """Управляемые часы для проверки TTL"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSubscriptionCache:
+    """Тесты для кэша списков подписок"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def cache(self, clock):
+        return SubscriptionCache(ttl=10, max_size=2, clock=clock)
+
+    def test_miss_then_hit(self, cache):
+        """Тест промаха и последующего попадания"""
+        assert cache.get(1, "token") is None
+        cache.set(1, "token", ["sub"])
+        assert cache.get(1, "token") == ["sub"]
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    def test_ttl_expiry(self, cache, clock):
+        """Тест устаревания записи по TTL"""
+        cache.set(1, "token", ["sub"])
+        clock.now = 10
+        assert cache.get(1, "token") is None
+        assert len(cache) == 0
+
+    def test_other_token_is_miss(self, cache):
+        """Тест промаха при смене токена пользователя"""
+        cache.set(1, "old", ["sub"])
+        assert cache.get(1, "new") is None
+
+    def test_lru_eviction(self, cache):
+        """Тест вытеснения давно не используемой записи"""
+        cache.set(1, "t", ["a"])
+        cache.set(2, "t", ["b"])
+        cache.get(1, "t")
+        cache.set(3, "t", ["c"])
+
+        assert cache.get(2, "t") is None
+        assert cache.get(1, "t") == ["a"]
+        assert cache.stats()["evictions"] == 1
+
+    def test_write_through(self, cache):
+        """Тест обновления закэшированного списка при создании и удалении"""
+        first = SimpleNamespace(id="1")
+        second = SimpleNamespace(id="2")
+        cache.set(1, "t", [first])
+        cached = cache.get(1, "t")
+
+        cache.add(1, second)
+        assert cache.get(1, "t") == [first, second]
+        # Ранее выданный список не изменился
+        assert cached == [first]
+
+        cache.remove(1, "1")
+        assert cache.get(1, "t") == [second]
+
+    def test_generation(self, cache):
+        """Тест поколения списка: меняется при создании, удалении и сбросе"""
+        start = cache.generation(1)
+        cache.set(1, "t", [])
+        assert cache.generation(1) == start
+
+        cache.add(1, SimpleNamespace(id="1"))
+        created = cache.generation(1)
+        assert created != start
+        cache.remove(1, "1")
+        assert cache.generation(1) != created
+        removed = cache.generation(1)
+        cache.invalidate(1)
+        assert cache.generation(1) != removed
+        assert cache.generation(2) == start
+
+    def test_generation_eviction(self, cache):
+        """Тест поколения вытесненного чата: изменение не теряется"""
+        cache.add(1, SimpleNamespace(id="1"))
+        before = cache.generation(1)
+        cache.invalidate(1)
+        cache.invalidate(2)
+        cache.invalidate(3)
+        # Запись чата 1 вытеснена, но поколение отличается от запомненного до изменения
+        assert cache.generation(1) != before
+
+    def test_disabled_cache(self, clock):
+        """Тест отключенного кэша"""
+        cache = SubscriptionCache(ttl=0, clock=clock)
+        cache.set(1, "t", ["a"])
+        assert cache.get(1, "t") is None
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
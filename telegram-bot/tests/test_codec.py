@@ -0,0 +1,52 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from aioresponses import aioresponses
+from yarl import URL
+from backend_client import BackendClient
+from codec import CODECS, get_codec
+from models import BillingCycle
+from schema import decode_subscriptions
+
+class TestCodec:
+    """Тесты для выбора и работы кодека JSON"""
+
+    @pytest.mark.parametrize("name", list(CODECS))
+    def test_round_trip(self, name):
+        """Тест кодирования значений моделей и разбора обратно"""
+        codec = get_codec(name)
+        body = codec.dumps({"price": Decimal("15.99"), "next": date(2024, 1, 15), "cycle": BillingCycle.YEARLY, "name": "Кино"})
+        assert isinstance(body, bytes)
+        assert codec.loads(body) == {"price": "15.99", "next": "2024-01-15", "cycle": "yearly", "name": "Кино"}
+        assert codec.loads(codec.dumps_str([1, None])) == [1, None]
+
+    def test_auto_prefers_fast_codec(self):
+        """Тест автоматического выбора самой быстрой установленной библиотеки"""
+        assert get_codec().name == next(iter(CODECS))
+        assert get_codec("JSON").name == "json"
+
+    def test_unknown_codec(self):
+        """Тест ошибки для неизвестного кодека"""
+        with pytest.raises(ValueError):
+            get_codec("yaml")
+
+    @pytest.mark.asyncio
+    async def test_backend_client_uses_codec(self):
+        """Тест кодирования запроса и разбора ответа backend API выбранным кодеком"""
+        client = BackendClient("http://localhost:8080", codec=get_codec("json"))
+        raw = {"id": "1", "userId": "1", "name": "Netflix", "price": "15.99", "currency": "USD",
+               "billingPeriod": "monthly", "nextPayment": "2024-01-15", "category": "Video", "isActive": True}
+        with aioresponses() as m:
+            m.post("http://localhost:8080/api/subscriptions", payload=[raw], status=201)
+            response = await client.request("POST", "/api/subscriptions", token="t", payload={"name": "Netflix"})
+
+            request = m.requests[("POST", URL("http://localhost:8080/api/subscriptions"))][0]
+            assert request.kwargs["data"] == b'{"name":"Netflix"}'
+            assert request.kwargs["headers"]["Content-Type"] == "application/json"
+        await client.close()
+
+        assert response.codec is client.codec
+        assert decode_subscriptions(response.json())[0].price == Decimal("15.99")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram.types import Update
+from bot import SubTrackerBot
+from executor import UpdateExecutor
+
+def make_update(update_id, text, chat_id=12345):
+    """Создание обновления с текстовым сообщением"""
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": text
+        }
+    })
+
+class TestUpdateExecutor:
+    """Тесты для исполнителя обновлений"""
+
+    @pytest.mark.asyncio
+    async def test_chat_order_and_parallel_chats(self):
+        """Тест порядка обновлений одного чата и параллельной обработки разных чатов"""
+        executor = UpdateExecutor(max_concurrency=10)
+        events = []
+
+        async def job(name, delay):
+            events.append(("start", name))
+            await asyncio.sleep(delay)
+            events.append(("end", name))
+
+        await asyncio.gather(
+            executor.run(1, lambda: job("a1", 0.02)),
+            executor.run(1, lambda: job("a2", 0)),
+            executor.run(2, lambda: job("b1", 0)),
+        )
+
+        # Второе обновление чата 1 начинается только после первого, чат 2 не ждет
+        assert events.index(("start", "a2")) > events.index(("end", "a1"))
+        assert events.index(("end", "b1")) < events.index(("end", "a1"))
+        assert executor.stats()["active_chats"] == 0
+
+    @pytest.mark.asyncio
+    async def test_global_limit(self):
+        """Тест общего лимита одновременно обрабатываемых обновлений"""
+        executor = UpdateExecutor(max_concurrency=3)
+        running = 0
+        peak = 0
+
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        tasks = [asyncio.create_task(executor.run(chat_id, job)) for chat_id in range(10)]
+        await asyncio.sleep(0)
+        stats = executor.stats()
+        assert stats["running"] == 3
+        assert stats["queued"] == 7
+        await asyncio.gather(*tasks)
+
+        assert peak == 3
+        stats = executor.stats()
+        assert stats["submitted_total"] == 10
+        assert stats["queued"] == 0
+        assert stats["max_wait_ms"] > 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_keeps_chat_queue(self):
+        """Тест отмены ожидающего обновления: следующее обновление чата выполняется"""
+        executor = UpdateExecutor()
+        release = asyncio.Event()
+        handled = []
+
+        async def job(name):
+            if name == "first":
+                await release.wait()
+            handled.append(name)
+
+        first = asyncio.create_task(executor.run(1, lambda: job("first")))
+        second = asyncio.create_task(executor.run(1, lambda: job("second")))
+        third = asyncio.create_task(executor.run(1, lambda: job("third")))
+        await asyncio.sleep(0)
+        second.cancel()
+        release.set()
+        await asyncio.gather(first, third)
+
+        assert second.cancelled()
+        assert handled == ["first", "third"]
+        assert executor.stats()["active_chats"] == 0
+
+    @pytest.mark.asyncio
+    async def test_nested_run_is_direct(self):
+        """Тест вложенного вызова: обновление не встает в очередь своего же чата"""
+        executor = UpdateExecutor(max_concurrency=1)
+
+        async def inner():
+            return "done"
+
+        result = await asyncio.wait_for(executor.run(1, lambda: executor.run(1, inner)), 1)
+        assert result == "done"
+        assert executor.stats()["submitted_total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_wait_observer(self):
+        """Тест передачи времени ожидания в метрики"""
+        waits = []
+        executor = UpdateExecutor(max_concurrency=1, on_wait=waits.append)
+
+        await asyncio.gather(executor.run(1, lambda: asyncio.sleep(0.01)), executor.run(2, lambda: asyncio.sleep(0)))
+
+        assert len(waits) == 2
+        assert waits[1] >= 0.005
+
+class TestBotExecutor:
+    """Тесты обработки обновлений бота через исполнитель"""
+
+    @pytest.fixture
+    def bot(self):
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ', 'UPDATE_MAX_CONCURRENCY': '4'}):
+            return SubTrackerBot()
+
+    @pytest.mark.asyncio
+    async def test_dispatcher_updates_go_through_executor(self, bot):
+        """Тест очереди чата для обновлений диспетчера"""
+        bot.bot.session.make_request = AsyncMock(return_value=True)
+
+        await asyncio.gather(
+            bot.dp.feed_update(bot.bot, make_update(1, "/help")),
+            bot.dp.feed_update(bot.bot, make_update(2, "/help")),
+            bot.dp.feed_update(bot.bot, make_update(3, "/help", chat_id=777)),
+        )
+
+        stats = bot.executor.stats()
+        assert stats["max_concurrency"] == 4
+        assert stats["submitted_total"] == 3
+        assert stats["active_chats"] == 0
+        assert bot.bot.session.make_request.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_health_and_metrics(self, bot):
+        """Тест загрузки исполнителя в /health и /metrics"""
+        client = TestClient(TestServer(bot.app))
+        await client.start_server()
+        try:
+            health = await (await client.get("/health")).json()
+            metrics = await (await client.get("/metrics")).text()
+        finally:
+            await client.close()
+
+        assert health["executor"]["queued"] == 0
+        assert "subtracker_bot_update_queue_depth 0" in metrics
+        assert "# TYPE subtracker_bot_update_wait_seconds histogram" in metrics
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
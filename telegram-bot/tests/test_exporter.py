@@ -0,0 +1,159 @@
+import io
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, Mock, patch
+from aiogram.filters import CommandObject
+from aiogram.methods import SendDocument
+from bot import SubTrackerBot
+from exporter import ExportCache, build_export, fingerprint, write_ics
+from importer import parse_csv, validate_row
+from models import BillingCycle, Subscription
+
+def make_subscription(index, **overrides):
+    values = dict(
+        id=f"sub-{index}", user_id="12345", name=f"Service {index}", price="9.99", currency="USD",
+        billing_period="monthly", next_payment="2024-01-15", category="Video", is_active=True,
+    )
+    values.update(overrides)
+    return Subscription(**values)
+
+async def single_chunk(data):
+    yield data
+
+class TestExportFormats:
+    """Тесты форматов выгрузки"""
+
+    @pytest.mark.asyncio
+    async def test_csv_round_trip(self):
+        """Тест загрузки выгруженного CSV обратно через /import"""
+        subscriptions = [make_subscription(1, name='Spotify, "Family"\nplan', description="shared"), make_subscription(2, billing_period="yearly")]
+        spool = build_export(subscriptions, "csv", spool_size=1024)
+        spool.seek(0)
+        rows = [row async for row in parse_csv(single_chunk(spool.read()))]
+        requests = [validate_row(raw, "12345") for _, raw in rows]
+        assert [request.name for request in requests] == ['Spotify, "Family"\nplan', "Service 2"]
+        assert requests[0].description == "shared"
+        assert requests[1].billing_period == "yearly"
+
+    @pytest.mark.asyncio
+    async def test_csv_round_trip_backend_values(self):
+        """Тест загрузки выгрузки с недельным циклом, своей категорией и валютой вне меню"""
+        subscriptions = [make_subscription(1, billing_period="weekly", category="Кино и ТВ", currency="GBP")]
+        spool = build_export(subscriptions, "csv", spool_size=1024)
+        spool.seek(0)
+        rows = [row async for row in parse_csv(single_chunk(spool.read()))]
+        request = validate_row(rows[0][1], "12345")
+        assert (request.billing_period, request.category, request.currency) == ("weekly", "Кино и ТВ", "GBP")
+
+    @pytest.mark.asyncio
+    async def test_csv_round_trip_all_fields(self):
+        """Тест загрузки выгрузки: каждый цикл оплаты и все поля запроса создания совпадают"""
+        subscriptions = [
+            make_subscription(index, billing_period=cycle.value, category=f"Своя {index}", description=f"note {index}")
+            for index, cycle in enumerate(BillingCycle)
+        ]
+        spool = build_export(subscriptions, "csv", spool_size=1024)
+        spool.seek(0)
+        rows = [row async for row in parse_csv(single_chunk(spool.read()))]
+        requests = [validate_row(raw, "12345") for _, raw in rows]
+        assert [
+            (r.name, r.price, r.currency, r.billing_period, r.next_payment, r.category, r.description) for r in requests
+        ] == [
+            (s.name, str(s.price), s.currency, s.billing_period.value, s.next_payment.isoformat(), s.category, s.description)
+            for s in subscriptions
+        ]
+
+    def test_ics(self):
+        """Тест календаря: повторение по циклу, экранирование и перенос длинных строк"""
+        subscriptions = [
+            make_subscription(1, name="Кинотеатр; семейный, " + "очень " * 10, billing_period="yearly"),
+            make_subscription(2, is_active=False),
+            make_subscription(3, next_payment=None),
+        ]
+        out = io.BytesIO()
+        write_ics(subscriptions, out, now=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        text = out.getvalue().decode()
+        assert text.count("BEGIN:VEVENT") == 1
+        assert "DTSTART;VALUE=DATE:20240115\r\nRRULE:FREQ=YEARLY\r\n" in text
+        assert "DTSTAMP:20240101T000000Z" in text
+        assert all(len(line.encode()) <= 75 for line in text.split("\r\n"))
+        unfolded = text.replace("\r\n ", "")
+        assert r"SUMMARY:💳 Кинотеатр\; семейный\, очень" in unfolded
+
+    def test_spool_moves_to_disk(self):
+        """Тест переноса большой выгрузки из памяти во временный файл"""
+        subscriptions = [make_subscription(index) for index in range(1000)]
+        spool = build_export(subscriptions, "csv", spool_size=4096)
+        assert spool._rolled
+        spool.close()
+
+    def test_fingerprint_and_cache(self):
+        """Тест хеша содержимого и кэша отправленных файлов"""
+        subscriptions = [make_subscription(1), make_subscription(2)]
+        digest = fingerprint(subscriptions, "csv")
+        assert digest == fingerprint([make_subscription(1), make_subscription(2)], "csv")
+        assert digest != fingerprint(subscriptions, "ics")
+        assert digest != fingerprint([make_subscription(1), make_subscription(2, price="10")], "csv")
+
+        cache = ExportCache(max_size=1)
+        cache.set(1, "csv", digest, "file-1")
+        assert cache.get(1, "csv", digest) == "file-1"
+        assert cache.get(1, "csv", "other") is None
+        cache.set(2, "csv", digest, "file-2")
+        assert cache.get(1, "csv", digest) is None
+        assert cache.stats()["hits"] == 1
+
+class TestExportCommand:
+    """Тесты команды /export"""
+
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            return SubTrackerBot()
+
+    @pytest.fixture
+    def message(self):
+        """Фикстура для создания сообщения"""
+        message = Mock()
+        message.chat.id = 12345
+        message.answer = AsyncMock()
+        return message
+
+    @pytest.mark.asyncio
+    async def test_repeat_export_uses_cached_file(self, bot, message):
+        """Тест повторной выгрузки неизмененных данных по file_id"""
+        bot.user_tokens[12345] = "test_token"
+        subscriptions = [make_subscription(index) for index in range(3)]
+        bot.load_subscriptions = AsyncMock(return_value=subscriptions)
+        uploads = []
+
+        async def make_request(_bot, method, timeout=None):
+            if not isinstance(method.document, str):
+                uploads.append(b"".join([chunk async for chunk in method.document.read(_bot)]))
+            return Mock(document=Mock(file_id="file-1"))
+
+        bot.bot.session.make_request = make_request
+        command = CommandObject(command="export", args="csv")
+
+        await bot.handle_export_command(message, command)
+        await bot.handle_export_command(message, command)
+
+        assert len(uploads) == 1
+        assert uploads[0].startswith(b"id,name,price")
+        assert bot.export_cache.stats()["hits"] == 1
+
+        # Изменение данных формирует выгрузку заново
+        subscriptions.append(make_subscription(3))
+        await bot.handle_export_command(message, command)
+        assert len(uploads) == 2
+        message.answer.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unknown_format(self, bot, message):
+        """Тест неизвестного формата выгрузки"""
+        await bot.handle_export_command(message, CommandObject(command="export", args="xlsx"))
+        message.answer.assert_called_once_with("❌ Использование: /export [csv|ics]")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,158 @@
+import asyncio
+import time
+import aiohttp
+import pytest
+from aiogram.types import Update
+from fake_backend import FakeBackend
+from tokens import jwt_expiry
+
+def make_update(update_id, text, chat_id=12345):
+    """Создание обновления с текстовым сообщением"""
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": text
+        }
+    })
+
+def sent_texts(bot):
+    """Тексты сообщений, отправленных ботом в Telegram"""
+    return [call.args[1].text for call in bot.bot.session.make_request.call_args_list]
+
+class TestFakeBackend:
+    """Тесты локального backend API"""
+
+    @pytest.mark.asyncio
+    async def test_login_and_subscriptions(self, fake_backend):
+        """Тест входа, списка, создания и удаления подписок"""
+        fake_backend.subscriptions = 3
+        async with fake_backend, aiohttp.ClientSession(fake_backend.url) as session:
+            async with session.post("/api/login", json={"username": "user", "password": "secret"}) as response:
+                assert response.status == 200
+                token = (await response.json())["token"]
+            assert jwt_expiry(token) > time.time()
+            headers = {"Authorization": f"Bearer {token}"}
+
+            async with session.get("/api/subscriptions", headers=headers) as response:
+                subscriptions = await response.json()
+            assert [item["id"] for item in subscriptions] == ["1-0", "1-1", "1-2"]
+            assert subscriptions[0]["billingPeriod"] == "monthly"
+
+            payload = {"name": "Netflix", "price": "9.99", "currency": "USD", "billingPeriod": "monthly", "nextPayment": "2025-01-15"}
+            async with session.post("/api/subscriptions", json=payload, headers=headers) as response:
+                assert response.status == 201
+                created = await response.json()
+            async with session.delete(f"/api/subscriptions/{created['id']}", headers=headers) as response:
+                assert response.status == 204
+            async with session.delete(f"/api/subscriptions/{created['id']}", headers=headers) as response:
+                assert response.status == 404
+
+            async with session.get("/api/subscriptions") as response:
+                assert response.status == 401
+            async with session.get("/api/subscriptions", headers={"Authorization": "Bearer forged.token.value"}) as response:
+                assert response.status == 401
+
+        assert fake_backend.stats()["requests"]["DELETE /api/subscriptions/{id}"] == 2
+
+    @pytest.mark.asyncio
+    async def test_known_users(self):
+        """Тест входа только с заданными учетными данными"""
+        async with FakeBackend(users={"user": "secret"}) as backend:
+            async with aiohttp.ClientSession(backend.url) as session:
+                async with session.post("/api/login", json={"username": "user", "password": "wrong"}) as response:
+                    assert response.status == 401
+
+    @pytest.mark.asyncio
+    async def test_expired_token(self, fake_backend):
+        """Тест отказа по истекшему токену"""
+        token = fake_backend.token_for(7, ttl=-1)
+        async with fake_backend, aiohttp.ClientSession(fake_backend.url) as session:
+            async with session.get("/api/subscriptions", headers={"Authorization": f"Bearer {token}"}) as response:
+                assert response.status == 401
+
+    @pytest.mark.asyncio
+    async def test_latency_and_errors(self, fake_backend):
+        """Тест задержки ответа и внесенных ошибок (/api/health без ошибок)"""
+        fake_backend.latency = 0.05
+        fake_backend.error_rate = 1.0
+        headers = {"Authorization": f"Bearer {fake_backend.token_for(1)}"}
+        async with fake_backend, aiohttp.ClientSession(fake_backend.url) as session:
+            started = time.perf_counter()
+            async with session.get("/api/subscriptions", headers=headers) as response:
+                assert response.status == 500
+            assert time.perf_counter() - started >= 0.05
+            async with session.get("/api/health") as response:
+                assert response.status == 200
+
+        assert fake_backend.stats()["errors_injected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_error_rate_is_reproducible(self):
+        """Тест одинаковой последовательности ошибок при одном seed"""
+        results = []
+        for _ in range(2):
+            async with FakeBackend(error_rate=0.3, seed=42) as backend:
+                async with aiohttp.ClientSession(backend.url) as session:
+                    statuses = []
+                    for _ in range(20):
+                        async with session.post("/api/login", json={"username": "user", "password": "secret"}) as response:
+                            statuses.append(response.status)
+                    results.append(statuses)
+        assert results[0] == results[1]
+        assert 500 in results[0] and 200 in results[0]
+
+class TestBotWithFakeBackend:
+    """Сквозные тесты бота с локальным backend API"""
+
+    @pytest.mark.asyncio
+    async def test_login_list_delete(self, backend_bot, fake_backend):
+        """Тест входа, списка и удаления подписки через диспетчер"""
+        fake_backend.subscriptions = 2
+        async with fake_backend:
+            for update_id, text in enumerate(("/login", "user", "secret", "/list", "/delete 1-0"), start=1):
+                await backend_bot.dp.feed_update(backend_bot.bot, make_update(update_id, text))
+            await backend_bot.backend.close()
+
+        texts = sent_texts(backend_bot)
+        assert texts[2].startswith("✅ Вход выполнен успешно!")
+        assert "Subscription 0" in texts[3] and "Subscription 1" in texts[3]
+        assert texts[4] == "✅ Подписка успешно удалена!"
+        assert list(fake_backend.subscriptions_of("1")) == ["1-1"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_chats(self, backend_bot, fake_backend):
+        """Тест параллельных запросов разных чатов через пул соединений"""
+        fake_backend.latency = 0.05
+        for chat_id in range(1, 21):
+            backend_bot.user_tokens[chat_id] = fake_backend.token_for(chat_id)
+
+        async with fake_backend:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                backend_bot.dp.feed_update(backend_bot.bot, make_update(chat_id, "/stats", chat_id=chat_id))
+                for chat_id in range(1, 21)
+            ))
+            elapsed = time.perf_counter() - started
+            await backend_bot.backend.close()
+
+        # Чаты ждут backend одновременно, а не по очереди
+        assert elapsed < 0.5
+        assert all(text.startswith("📊") for text in sent_texts(backend_bot))
+        assert fake_backend.stats()["requests"]["GET /api/subscriptions"] == 20
+
+    @pytest.mark.asyncio
+    async def test_backend_errors(self, backend_bot, fake_backend):
+        """Тест сообщения об ошибке при сбое backend"""
+        fake_backend.error_rate = 1.0
+        backend_bot.user_tokens[12345] = fake_backend.token_for(12345)
+        async with fake_backend:
+            await backend_bot.dp.feed_update(backend_bot.bot, make_update(1, "/list"))
+            await backend_bot.backend.close()
+        assert sent_texts(backend_bot) == ["❌ Ошибка при получении списка подписок"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,250 @@
+import pytest
+import asyncio
+import logging
+from unittest.mock import AsyncMock, Mock, patch
+from bot import SubTrackerBot
+from backend_client import BackendResponse
+from importer import ImportFormatError, SubscriptionImporter, parse_csv, parse_json, parse_rows, render_report, validate_row
+
+async def chunked(data, size=7):
+    """Поток байтов, разбитый на маленькие части"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(rows):
+    return [row async for row in rows]
+
+CSV_DATA = (
+    "﻿name,price,currency,billing_period,next_payment,category\n"
+    "Netflix,15.99,USD,monthly,2024-01-15,Video\n"
+    "\n"
+    "\"Spotify\nFamily\",9.99,eur,yearly,2024-02-01,Music\n"
+    "Broken,abc,USD,monthly,2024-01-15,Other\n"
+).encode()
+
+class TestParsing:
+    """Тесты для потокового разбора файлов импорта"""
+
+    @pytest.mark.asyncio
+    async def test_csv(self):
+        """Тест разбора CSV по частям с переводом строки внутри кавычек"""
+        rows = await collect(parse_csv(chunked(CSV_DATA)))
+        assert [row for row, _ in rows] == [2, 4, 6]
+        assert rows[0][1]["name"] == "Netflix"
+        assert rows[1][1]["name"] == "Spotify\nFamily"
+
+    @pytest.mark.asyncio
+    async def test_json_array_and_lines(self):
+        """Тест разбора массива JSON и JSON Lines по частям"""
+        array = b'[{"name": "A", "price": 1}, {"name": "B", "price": 20}]'
+        lines = b'{"name": "A"}\n{"name": "B"}\n'
+        assert [row["name"] for _, row in await collect(parse_json(chunked(array)))] == ["A", "B"]
+        assert [index for index, _ in await collect(parse_json(chunked(lines, 3)))] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_format_errors(self):
+        """Тест ошибок формата файла"""
+        with pytest.raises(ImportFormatError):
+            parse_rows(chunked(b""), "subscriptions.xlsx")
+        with pytest.raises(ImportFormatError):
+            await collect(parse_json(chunked(b'[{"name": "A"}, {"name": ')))
+        with pytest.raises(ImportFormatError):
+            await collect(parse_csv(chunked(b"")))
+
+    def test_validate_row(self):
+        """Тест проверки строки по полям запроса создания подписки"""
+        request = validate_row({"name": "Netflix", "price": "15.99", "currency": "usd", "billingPeriod": "Monthly", "nextPayment": "2024-01-15"}, "12345")
+        assert (request.user_id, request.currency, request.billing_period, request.category) == ("12345", "USD", "monthly", "Other")
+        row = {"name": "Netflix", "price": "15.99", "currency": "USD", "billing_period": "monthly", "next_payment": "2024-01-15"}
+        for field, value, error in [
+            ("price", "-1", "некорректная цена"),
+            ("currency", "US$", "некорректная валюта"),
+            ("category", "x" * 256, "категория длиннее 255 символов"),
+            ("billing_period", "daily", "неподдерживаемый цикл оплаты"),
+            ("next_payment", "15.01.2024", "некорректная дата"),
+            ("name", "", "нет полей: name"),
+        ]:
+            with pytest.raises(ValueError, match=error):
+                validate_row({**row, field: value}, "12345")
+
+    def test_validate_row_backend_values(self):
+        """Тест значений, которые backend хранит, но меню /add не предлагает"""
+        row = {"name": "Netflix", "price": "15.99", "currency": "gbp", "billing_period": "weekly", "next_payment": "2024-01-15", "category": "Кино и ТВ"}
+        request = validate_row(row, "12345")
+        assert (request.currency, request.billing_period, request.category) == ("GBP", "weekly", "Кино и ТВ")
+
+    def test_validate_row_nested_values(self):
+        """Тест строки JSON со списком или объектом вместо значения"""
+        row = {"name": "Netflix", "price": "15.99", "currency": "USD", "billingPeriod": "monthly", "nextPayment": "2024-01-15"}
+        for field, value in [("price", [1]), ("price", {"a": 1}), ("category", ["x"]), ("currency", {"code": "USD"})]:
+            with pytest.raises(ValueError, match=f"некорректное значение поля {field}"):
+                validate_row({**row, field: value}, "12345")
+
+    @pytest.mark.asyncio
+    async def test_nested_value_is_row_error(self):
+        """Тест импорта JSON: строка с вложенным значением попадает в ошибки, остальные создаются"""
+        data = b'[{"name": "A", "price": [1], "currency": "USD", "billingPeriod": "monthly", "nextPayment": "2024-01-15"},' \
+               b' {"name": "B", "price": "5", "currency": "USD", "billingPeriod": "monthly", "nextPayment": "2024-01-15"}]'
+        create = AsyncMock(return_value=None)
+        report = await SubscriptionImporter(create).run(parse_json(chunked(data)), "12345")
+        assert (report.total, report.created) == (2, 1)
+        assert report.errors == [(1, "некорректное значение поля price")]
+
+class TestSubscriptionImporter:
+    """Тесты для создания подписок из строк файла"""
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency_and_report(self):
+        """Тест ограничения одновременных запросов и отчета по строкам"""
+        active = 0
+        peak = 0
+
+        async def create(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.001)
+            active -= 1
+            return "ошибка backend API (500)" if request.name == "Fail" else None
+
+        async def rows():
+            for i in range(20):
+                yield i + 2, {"name": "Fail" if i == 5 else f"S{i}", "price": "1", "currency": "USD",
+                              "billing_period": "monthly", "next_payment": "2024-01-15"}
+            yield 22, {"name": "Bad"}
+
+        report = await SubscriptionImporter(create, max_concurrency=3).run(rows(), "12345")
+        assert peak == 3
+        assert report.total == 21
+        assert report.created == 19
+        assert report.errors == [(7, "ошибка backend API (500)"), (22, "нет полей: price, currency, billing_period, next_payment")]
+        text = render_report(report)
+        assert "создано 19 из 21" in text
+        assert "• Строка 7: ошибка backend API (500)" in text
+
+    @pytest.mark.asyncio
+    async def test_progress_throttled_and_row_limit(self):
+        """Тест редких сообщений о ходе импорта и ограничения числа строк"""
+        clock = [0.0]
+        progress = []
+
+        async def create(request):
+            clock[0] += 0.5
+            return None
+
+        async def on_progress(report):
+            progress.append(report.created)
+
+        async def rows():
+            for i in range(10):
+                yield i + 2, {"name": f"S{i}", "price": "1", "currency": "USD", "billing_period": "monthly", "next_payment": "2024-01-15"}
+
+        importer = SubscriptionImporter(create, max_concurrency=1, max_rows=8, progress=on_progress, progress_interval=2.0, clock=lambda: clock[0])
+        report = await importer.run(rows(), "12345")
+        assert progress == [4, 8]
+        assert report.created == 8
+        assert "больше 8 строк" in report.aborted
+
+class TestImportCommand:
+    """Тесты команды /import"""
+
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            return SubTrackerBot()
+
+    @pytest.mark.asyncio
+    async def test_import_document(self, bot):
+        """Тест импорта файла, приложенного к команде"""
+        bot.user_tokens[12345] = "test_token"
+        bot.bot.get_file = AsyncMock(return_value=Mock(file_path="documents/file.csv"))
+        bot.bot.session.stream_content = Mock(return_value=chunked(CSV_DATA))
+        created = b'{"id": "1", "userId": "12345", "name": "Netflix", "price": "15.99", "currency": "USD", "billingPeriod": "monthly", "nextPayment": "2024-01-15", "category": "Video", "isActive": true}'
+        bot.backend.request = AsyncMock(return_value=BackendResponse(status=201, body=created))
+
+        message = Mock()
+        message.chat.id = 12345
+        message.document.file_name = "subscriptions.csv"
+        message.document.file_size = len(CSV_DATA)
+        progress_message = Mock()
+        progress_message.edit_text = AsyncMock()
+        message.answer = AsyncMock(return_value=progress_message)
+        bot.subscription_cache.set(12345, "test_token", [])
+
+        await bot.handle_import_command(message, AsyncMock())
+
+        assert bot.backend.request.call_count == 2
+        # Кэш сброшен после импорта, напоминания добавлены по созданным подпискам
+        assert bot.subscription_cache.get(12345, "test_token") is None
+        assert bot.reminders.stats()["scheduled"] >= 1
+        payload = bot.backend.request.call_args_list[1].kwargs["payload"]
+        assert payload["name"] == "Spotify\nFamily"
+        assert payload["currency"] == "EUR"
+        report = progress_message.edit_text.call_args.args[0]
+        assert "создано 2 из 3" in report
+        assert "Строка 6: некорректная цена 'abc'" in report
+
+    @pytest.mark.asyncio
+    async def test_import_logged_at_info(self, bot, caplog):
+        """Тест итогового отчета при журнале уровня INFO (поля записи не совпадают с атрибутами LogRecord)"""
+        caplog.set_level(logging.INFO)
+        bot.user_tokens[12345] = "test_token"
+        bot.bot.get_file = AsyncMock(return_value=Mock(file_path="documents/file.csv"))
+        bot.bot.session.stream_content = Mock(return_value=chunked(CSV_DATA))
+        created = b'{"id": "1", "userId": "12345", "name": "Netflix", "price": "15.99", "currency": "USD", "billingPeriod": "monthly", "nextPayment": "2024-01-15", "category": "Video", "isActive": true}'
+        bot.backend.request = AsyncMock(return_value=BackendResponse(status=201, body=created))
+
+        message = Mock()
+        message.chat.id = 12345
+        message.document.file_name = "subscriptions.csv"
+        message.document.file_size = len(CSV_DATA)
+        progress_message = Mock()
+        progress_message.edit_text = AsyncMock()
+        message.answer = AsyncMock(return_value=progress_message)
+
+        await bot.handle_import_command(message, AsyncMock())
+
+        assert "создано 2 из 3" in progress_message.edit_text.call_args.args[0]
+        record = next(record for record in caplog.records if record.getMessage() == "Import finished")
+        assert (record.rows, record.created_count) == (3, 2)
+
+    @pytest.mark.asyncio
+    async def test_import_failure_reported(self, bot):
+        """Тест непредвиденной ошибки импорта: сообщение о ходе заменяется ошибкой, состояние сбрасывается"""
+        bot.user_tokens[12345] = "test_token"
+        bot.bot.get_file = AsyncMock(return_value=Mock(file_path="documents/file.csv"))
+        bot.bot.session.stream_content = Mock(return_value=chunked(CSV_DATA))
+
+        message = Mock()
+        message.chat.id = 12345
+        message.document.file_name = "subscriptions.csv"
+        message.document.file_size = len(CSV_DATA)
+        progress_message = Mock()
+        progress_message.edit_text = AsyncMock()
+        message.answer = AsyncMock(return_value=progress_message)
+        state = AsyncMock()
+
+        with patch.object(SubscriptionImporter, "run", new=AsyncMock(side_effect=RuntimeError("boom"))):
+            await bot.handle_import_command(message, state)
+
+        progress_message.edit_text.assert_called_once_with("❌ Ошибка при импорте подписок")
+        state.clear.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_import_waits_for_file(self, bot):
+        """Тест команды без файла: ожидание документа"""
+        bot.user_tokens[12345] = "test_token"
+        message = Mock()
+        message.chat.id = 12345
+        message.document = None
+        message.answer = AsyncMock()
+        state = AsyncMock()
+
+        await bot.handle_import_command(message, state)
+
+        state.set_state.assert_called_once()
+        assert "Отправьте файл CSV" in message.answer.call_args.args[0]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
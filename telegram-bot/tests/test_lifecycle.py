@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram.methods import GetMe, GetUpdates, SendMessage
+from aiogram.types import Update, User
+from bot import SubTrackerBot
+from backend_client import BackendResponse
+from lifecycle import Lifecycle
+
+UPDATE = {
+    "update_id": 7,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 12345, "type": "private"},
+        "from": {"id": 12345, "is_bot": False, "first_name": "Test"},
+        "text": "/list"
+    }
+}
+
+class TestLifecycle:
+    """Тесты порядка остановки"""
+
+    @pytest.mark.asyncio
+    async def test_run_stops_receiver(self):
+        """Тест завершения приема обновлений по запросу остановки"""
+        lifecycle = Lifecycle()
+        stop = AsyncMock()
+        receiver = asyncio.Event()
+
+        task = asyncio.create_task(lifecycle.run(receiver.wait(), stop=stop))
+        await asyncio.sleep(0)
+        lifecycle.request_stop()
+        await task
+
+        stop.assert_called_once()
+        assert lifecycle.stopping
+        assert 0 < lifecycle.remaining() <= lifecycle.drain_timeout
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_then_cancels(self):
+        """Тест ожидания обработчиков и отмены по истечении срока"""
+        lifecycle = Lifecycle(drain_timeout=0.05)
+        finished = []
+
+        async def handler(delay):
+            task = asyncio.current_task()
+            lifecycle.handler_started(task)
+            try:
+                await asyncio.sleep(delay)
+                finished.append(delay)
+            finally:
+                lifecycle.handler_finished(task)
+
+        tasks = [asyncio.create_task(handler(0.01)), asyncio.create_task(handler(10))]
+        await asyncio.sleep(0)
+        lifecycle.request_stop()
+
+        assert not await lifecycle.drain()
+        assert finished == [0.01]
+        assert tasks[1].cancelled()
+        assert lifecycle.stats()["cancelled_total"] == 1
+        assert lifecycle.inflight == 0
+
+class TestBotShutdown:
+    """Тесты штатной остановки бота"""
+
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            return SubTrackerBot()
+
+    @pytest.mark.asyncio
+    async def test_polling_shutdown_drains_handler(self, bot):
+        """Тест остановки во время обработки: ответ отправлен, обновление подтверждено, ресурсы закрыты"""
+        bot.user_tokens[12345] = "test_token"
+        handler_started = asyncio.Event()
+        requests = []
+
+        async def backend_request(method, path, **kwargs):
+            if path == "/api/subscriptions":
+                handler_started.set()
+                await asyncio.sleep(0.1)
+            return BackendResponse(status=200, body=b"[]")
+
+        async def make_request(_bot, method, timeout=None):
+            requests.append(method)
+            if isinstance(method, GetMe):
+                return User(id=123456789, is_bot=True, first_name="SubTracker", username="subtracker_bot")
+            if isinstance(method, GetUpdates) and method.offset is None:
+                return [Update.model_validate(UPDATE, context={"bot": _bot})]
+            if isinstance(method, GetUpdates) and method.timeout != 0:
+                await asyncio.sleep(3600)
+                return []
+            return True
+
+        bot.backend.request = backend_request
+        bot.bot.session.make_request = make_request
+        bot.bot.session.close = AsyncMock()
+
+        with patch("bot.web.TCPSite", return_value=AsyncMock()):
+            task = asyncio.create_task(bot.start())
+            await asyncio.wait_for(handler_started.wait(), 5)
+            bot.lifecycle.request_stop()
+            await asyncio.wait_for(task, 5)
+
+        replies = [method for method in requests if isinstance(method, SendMessage)]
+        assert replies and replies[0].text.startswith("📋 У вас пока нет подписок")
+        confirm = requests[-1]
+        assert isinstance(confirm, GetUpdates) and confirm.offset == 8 and confirm.timeout == 0
+        assert bot.lifecycle.stats()["cancelled_total"] == 0
+        assert not bot.outbox.running
+        bot.bot.session.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_webhook_rejected_while_stopping(self):
+        """Тест ответа 503 на webhook во время остановки"""
+        env = {
+            'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ',
+            'BOT_MODE': 'webhook',
+            'WEBHOOK_URL': 'https://bot.example.com/',
+            'WEBHOOK_SECRET': 'test_secret'
+        }
+        with patch.dict('os.environ', env):
+            bot = SubTrackerBot()
+        bot.lifecycle.request_stop()
+
+        async with TestClient(TestServer(bot.app)) as client:
+            response = await client.post("/webhook", json=UPDATE, headers={"X-Telegram-Bot-Api-Secret-Token": "test_secret"})
+            assert response.status == 503
+            response = await client.get("/ready")
+            assert response.status == 503
+            response = await client.get("/health")
+            assert response.status == 200
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+import pytest
+import io
+import json
+import logging
+from unittest.mock import AsyncMock, Mock
+from bot_logging import DebugSampler, HandlerLoggingMiddleware, JsonFormatter, parse_levels, setup_logging
+
+def make_record(level=logging.INFO, msg="event", **extra):
+    """Создание записи журнала с дополнительными полями"""
+    record = logging.LogRecord("test", level, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+class TestLogging:
+    """Тесты для структурированного журнала"""
+
+    def test_json_formatter(self):
+        """Тест вывода события с дополнительными полями"""
+        event = json.loads(JsonFormatter().format(make_record(chat_id=12345, handler="handle_list_command")))
+        assert event["event"] == "event"
+        assert event["level"] == "INFO"
+        assert event["chat_id"] == 12345
+        assert event["handler"] == "handle_list_command"
+
+    def test_debug_sampling(self):
+        """Тест выборки отладочных событий"""
+        sampler = DebugSampler(every=3)
+        kept = [sampler.filter(make_record(logging.DEBUG)) for _ in range(9)]
+        assert kept.count(True) == 3
+        assert all(sampler.filter(make_record(logging.WARNING)) for _ in range(3))
+
+    def test_parse_levels(self):
+        """Тест разбора уровней по модулям"""
+        assert parse_levels("backend_client=DEBUG, aiogram=warning") == {"backend_client": logging.DEBUG, "aiogram": logging.WARNING}
+        with pytest.raises(ValueError):
+            parse_levels("aiogram=LOUD")
+
+    def test_queue_listener_writes_json(self):
+        """Тест записи событий фоновым потоком"""
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        stream = io.StringIO()
+        try:
+            listener = setup_logging(level="INFO", module_levels="noisy=ERROR", stream=stream)
+            logging.getLogger("bot").info("Bot started", extra={"mode": "polling"})
+            logging.getLogger("noisy").warning("dropped")
+            listener.stop()
+        finally:
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+            logging.getLogger("noisy").setLevel(logging.NOTSET)
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["mode"] == "polling"
+
+    @pytest.mark.asyncio
+    async def test_handler_failure_logged(self, caplog):
+        """Тест события об ошибке обработчика с чатом, обработчиком и длительностью"""
+        async def handle_list_command():
+            pass
+
+        middleware = HandlerLoggingMiddleware()
+        data = {"event_chat": Mock(id=12345), "handler": Mock(callback=handle_list_command)}
+        with caplog.at_level(logging.ERROR, logger="bot.handlers"):
+            with pytest.raises(RuntimeError):
+                await middleware(AsyncMock(side_effect=RuntimeError("boom")), Mock(), data)
+
+        record = caplog.records[0]
+        assert record.chat_id == 12345
+        assert record.handler == "handle_list_command"
+        assert record.latency_ms >= 0
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,80 @@
+import pytest
+from pydantic import ValidationError
+from unittest.mock import AsyncMock, Mock, patch
+from bot import SubTrackerBot, BotState
+from menus import CATEGORY_MENU, CURRENCY_MENU, CYCLE_MENU
+
+class TestMenus:
+    """Тесты для таблицы меню выбора"""
+
+    def test_table_drives_markup_and_values(self):
+        """Тест построения клавиатур и допустимых значений из одной таблицы"""
+        buttons = [row[0] for row in CURRENCY_MENU.markup.inline_keyboard]
+        assert [button.callback_data for button in buttons] == ["currency_USD", "currency_EUR", "currency_RUB"]
+        assert CURRENCY_MENU.values == {"USD", "EUR", "RUB"}
+        assert CYCLE_MENU.values == {"monthly", "yearly"}
+        assert "Cloud Services" in CATEGORY_MENU.values
+        assert len(CATEGORY_MENU.markup.inline_keyboard) == 7
+
+    def test_markup_not_shared(self):
+        """Тест изменения клавиатуры одного ответа без влияния на следующие"""
+        markup = CURRENCY_MENU.markup
+        markup.inline_keyboard.append([])
+        markup.inline_keyboard[0].clear()
+        assert [len(row) for row in CURRENCY_MENU.markup.inline_keyboard] == [1, 1, 1]
+        with pytest.raises(ValidationError):
+            CURRENCY_MENU.rows[0][0].text = "GBP"
+
+    def test_resolve(self):
+        """Тест разбора нажатой кнопки"""
+        choice = CYCLE_MENU.resolve("cycle_yearly")
+        assert choice.value == "yearly"
+        assert choice.selected_text == "🔄 Цикл оплаты выбран: ежегодно"
+        assert CATEGORY_MENU.resolve("category_cloud").value == "Cloud Services"
+        assert CURRENCY_MENU.resolve("currency_GBP") is None
+
+class TestMenuCallbacks:
+    """Тесты обработки нажатий кнопок меню"""
+
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            return SubTrackerBot()
+
+    @pytest.fixture
+    def callback_query(self):
+        """Фикстура для создания callback-запроса"""
+        callback_query = Mock()
+        callback_query.message.chat.id = 12345
+        callback_query.message.answer = AsyncMock()
+        callback_query.message.edit_text = AsyncMock()
+        callback_query.answer = AsyncMock()
+        return callback_query
+
+    @pytest.mark.asyncio
+    async def test_currency_selected(self, bot, callback_query):
+        """Тест выбора валюты и показа следующего меню"""
+        state = AsyncMock()
+        callback_query.data = "currency_EUR"
+
+        await bot.handle_callback_query(callback_query, state)
+
+        state.update_data.assert_called_once_with(currency="EUR")
+        state.set_state.assert_called_once_with(BotState.ADDING_SUBSCRIPTION_CYCLE)
+        callback_query.message.edit_text.assert_called_once_with("💱 Валюта выбрана: EUR")
+        callback_query.message.answer.assert_called_once_with(CYCLE_MENU.prompt, reply_markup=CYCLE_MENU.markup)
+
+    @pytest.mark.asyncio
+    async def test_unsupported_category(self, bot, callback_query):
+        """Тест нажатия неизвестной категории"""
+        state = AsyncMock()
+        callback_query.data = "category_unknown"
+
+        await bot.handle_callback_query(callback_query, state)
+
+        callback_query.answer.assert_called_once_with("❌ Неподдерживаемая категория")
+        state.set_state.assert_not_called()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+import pytest
+import time
+from unittest.mock import AsyncMock, patch
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram.types import Update
+from bot import SubTrackerBot
+from metrics import BotMetrics, MetricsRegistry
+
+def make_update(update_id, text, chat_id=12345):
+    """Создание обновления с текстовым сообщением"""
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": text
+        }
+    })
+
+class TestMetricsRegistry:
+    """Тесты для метрик в формате Prometheus"""
+
+    def test_histogram_render(self):
+        """Тест вывода накопительных корзин гистограммы"""
+        registry = MetricsRegistry("test")
+        histogram = registry.histogram("latency_seconds", "Latency", ("handler",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.labels("list").observe(value)
+
+        lines = registry.render().splitlines()
+        assert "# TYPE test_latency_seconds histogram" in lines
+        assert 'test_latency_seconds_bucket{handler="list",le="0.1"} 1' in lines
+        assert 'test_latency_seconds_bucket{handler="list",le="1"} 3' in lines
+        assert 'test_latency_seconds_bucket{handler="list",le="+Inf"} 4' in lines
+        assert 'test_latency_seconds_sum{handler="list"} 6.05' in lines
+        assert 'test_latency_seconds_count{handler="list"} 4' in lines
+
+    def test_counter_label_escaping(self):
+        """Тест экранирования значений меток"""
+        registry = MetricsRegistry()
+        registry.counter("errors_total", "Errors", ("error",)).labels('bad "quote"\n').inc()
+        assert 'errors_total{error="bad \\"quote\\"\\n"} 1' in registry.render()
+
+    def test_backend_endpoint_template(self):
+        """Тест замены идентификаторов в пути backend API"""
+        metrics = BotMetrics()
+        metrics.observe_backend("DELETE", "/api/subscriptions/5f0c-11", "200", 0.01)
+        metrics.observe_backend("DELETE", "/api/subscriptions/42", "404", 0.01)
+        text = metrics.render()
+        assert 'endpoint="/api/subscriptions/{id}",status="200"} 1' in text
+        assert 'endpoint="/api/subscriptions/{id}",status="404"} 1' in text
+
+    def test_recording_is_cheap(self):
+        """Тест стоимости записи метрики на горячем пути"""
+        metrics = BotMetrics()
+        count = 100000
+        started = time.perf_counter()
+        for _ in range(count):
+            metrics.handler_latency.labels("handle_list_command").observe(0.003)
+        # Запас относительно цели в 1 мкс на медленных машинах CI
+        assert (time.perf_counter() - started) / count < 2e-6
+
+class TestMetricsEndpoint:
+    """Тесты для эндпоинта /metrics бота"""
+
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота без обращений к Telegram"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            bot = SubTrackerBot()
+        bot.bot.session.make_request = AsyncMock(return_value=True)
+        return bot
+
+    @pytest.mark.asyncio
+    async def test_handler_and_fsm_metrics(self, bot):
+        """Тест метрик обработчиков, вызовов Telegram и состояний FSM"""
+        await bot.dp.feed_update(bot.bot, make_update(1, "/login"))
+        await bot.dp.feed_update(bot.bot, make_update(2, "/login", chat_id=777))
+        await bot.dp.feed_update(bot.bot, make_update(3, "user"))
+
+        async with TestClient(TestServer(bot.app)) as client:
+            response = await client.get("/metrics")
+            assert response.status == 200
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            text = await response.text()
+
+        assert 'subtracker_bot_handler_duration_seconds_count{handler="handle_login_command"} 2' in text
+        assert 'subtracker_bot_handler_duration_seconds_count{handler="handle_login_username"} 1' in text
+        assert 'subtracker_bot_telegram_requests_total{method="sendMessage"} 3' in text
+        assert 'subtracker_bot_fsm_state_chats{state="BotState:LOGIN_USERNAME"} 1' in text
+        assert 'subtracker_bot_fsm_state_chats{state="BotState:LOGIN_PASSWORD"} 1' in text
+        assert 'subtracker_bot_cache_hit_ratio{cache="subscriptions"} 0' in text
+
+    @pytest.mark.asyncio
+    async def test_finished_dialogs_not_tracked(self, bot):
+        """Тест учета состояний: чаты вне диалога не хранятся в StateTracker"""
+        bot.bot.session.make_request = AsyncMock(return_value=True)
+        bot.handle_login = AsyncMock()
+        for chat_id in range(1, 4):
+            await bot.dp.feed_update(bot.bot, make_update(chat_id * 10, "/start", chat_id=chat_id))
+        assert len(bot.metrics.states) == 0
+
+        for update_id, text in enumerate(("/login", "user", "secret"), start=100):
+            await bot.dp.feed_update(bot.bot, make_update(update_id, text, chat_id=1))
+            if text == "user":
+                assert len(bot.metrics.states) == 1
+        assert len(bot.metrics.states) == 0
+        assert all(value == 0 for _, _, _, value in bot.metrics.fsm_states.samples())
+
+    @pytest.mark.asyncio
+    async def test_telegram_errors_counted(self, bot):
+        """Тест подсчета ошибок Telegram Bot API"""
+        bot.bot.session.make_request = AsyncMock(side_effect=RuntimeError("network"))
+        with pytest.raises(RuntimeError):
+            await bot.dp.feed_update(bot.bot, make_update(1, "/help"))
+
+        text = bot.metrics.render()
+        assert 'subtracker_bot_telegram_errors_total{method="sendMessage",error="RuntimeError"} 1' in text
+        assert 'subtracker_bot_handler_errors_total{handler="handle_help_command"} 1' in text
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,145 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, Mock
+from aiogram.exceptions import TelegramRetryAfter
+from outbox import OutboundDispatcher, TokenBucket, PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+class TestTokenBucket:
+    """Тесты для ограничителя частоты"""
+
+    def test_bucket_refill(self):
+        """Тест расходования и восстановления токенов"""
+        bucket = TokenBucket(rate=1, capacity=2, now=0)
+        bucket.consume(0)
+        bucket.consume(0)
+        assert bucket.delay(0) == 1.0
+        assert bucket.delay(0.5) == 0.5
+        assert bucket.delay(1) == 0.0
+        assert not bucket.is_full(1)
+        assert bucket.is_full(5)
+
+class TestOutboundDispatcher:
+    """Тесты для очереди исходящих сообщений"""
+
+    @pytest.mark.asyncio
+    async def test_sends_in_chat_order(self):
+        """Тест сохранения порядка сообщений внутри чата"""
+        outbox = OutboundDispatcher(global_rate=1000, chat_rate=1000, chat_burst=1000)
+        await outbox.start()
+        sent = []
+
+        async def send(text):
+            sent.append(text)
+
+        for i in range(5):
+            outbox.submit(1, send, f"a{i}")
+            outbox.submit(2, send, f"b{i}")
+        await outbox.stop(timeout=5)
+
+        assert [text for text in sent if text.startswith("a")] == [f"a{i}" for i in range(5)]
+        assert [text for text in sent if text.startswith("b")] == [f"b{i}" for i in range(5)]
+        assert outbox.stats()["sent_total"] == 10
+
+    @pytest.mark.asyncio
+    async def test_interactive_before_bulk(self):
+        """Тест приоритета интерактивных ответов над массовыми сообщениями"""
+        outbox = OutboundDispatcher(global_rate=1000, chat_rate=1000, chat_burst=1000, max_in_flight=1)
+        sent = []
+
+        async def send(text):
+            sent.append(text)
+
+        for chat_id in range(3):
+            outbox.submit(chat_id, send, "bulk", priority=PRIORITY_BULK)
+        outbox.submit(10, send, "reply", priority=PRIORITY_INTERACTIVE)
+        assert outbox.stats()["queue_depth"] == {"interactive": 1, "bulk": 3}
+
+        await outbox.start()
+        await outbox.stop(timeout=5)
+        assert sent[0] == "reply"
+
+    @pytest.mark.asyncio
+    async def test_chat_rate_limit(self):
+        """Тест ограничения частоты отправки в один чат"""
+        outbox = OutboundDispatcher(global_rate=1000, chat_rate=20, chat_burst=1)
+        await outbox.start()
+        loop = asyncio.get_running_loop()
+        times = []
+
+        async def send():
+            times.append(loop.time())
+
+        for _ in range(3):
+            outbox.submit(1, send)
+        await outbox.stop(timeout=5)
+
+        assert len(times) == 3
+        assert times[2] - times[0] >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_retry_after(self):
+        """Тест повторной отправки после ответа 429 с retry_after"""
+        outbox = OutboundDispatcher(global_rate=1000, chat_rate=1000, chat_burst=1000)
+        await outbox.start()
+        error = TelegramRetryAfter(method=Mock(), message="Too Many Requests", retry_after=0)
+        send = AsyncMock(side_effect=[error, "ok"])
+
+        result = await outbox.submit(1, send, "text", wait_result=True)
+        await outbox.stop(timeout=5)
+
+        assert result == "ok"
+        assert send.call_count == 2
+        assert outbox.stats()["retry_after_total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_reported_to_waiter(self):
+        """Тест передачи ошибки отправки ожидающему результат"""
+        outbox = OutboundDispatcher()
+        await outbox.start()
+        send = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError):
+            await outbox.submit(1, send, wait_result=True)
+        await outbox.stop(timeout=5)
+        assert outbox.stats()["failed_total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_timeout_fails_queued_waiters(self):
+        """Тест остановки по таймауту: ожидающие в очереди получают ошибку, а не зависают"""
+        outbox = OutboundDispatcher(chat_rate=0.001, chat_burst=1)
+        await outbox.start()
+        send = AsyncMock(return_value="ok")
+
+        first = outbox.submit(1, send, wait_result=True)
+        queued = outbox.submit(1, send, wait_result=True)
+        assert await first == "ok"
+        await outbox.stop(timeout=0.05)
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(queued, 1)
+        assert send.call_count == 1
+        assert outbox.stats()["queue_depth"] == {"interactive": 0, "bulk": 0}
+        assert outbox.stats()["failed_total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bot_sends_directly_when_outbox_stopped(self):
+        """Тест прямой отправки ответа, если очередь не запущена"""
+        from unittest.mock import patch
+        from bot import SubTrackerBot
+
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            bot = SubTrackerBot()
+        message = Mock()
+        message.chat.id = 1
+        message.answer = AsyncMock()
+
+        await bot.reply(message, "text")
+        message.answer.assert_called_once_with("text")
+
+        await bot.outbox.start()
+        await bot.reply(message, "queued")
+        await bot.outbox.stop(timeout=5)
+        message.answer.assert_called_with("queued")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
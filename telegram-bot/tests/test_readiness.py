@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from aiohttp.test_utils import TestClient, TestServer
+from bot import SubTrackerBot
+from backend_client import BackendResponse
+from readiness import ReadinessProber
+
+class TestReadinessProber:
+    """Тесты фоновой проверки зависимостей"""
+
+    @pytest.mark.asyncio
+    async def test_failure_threshold_and_last_success(self):
+        """Тест порога неудачных проверок и времени последнего успеха"""
+        now = [1000.0]
+        backend = AsyncMock()
+        prober = ReadinessProber({"backend": backend}, interval=10, failure_threshold=2, clock=lambda: now[0])
+        assert not prober.ready
+
+        await prober.check_all()
+        assert prober.ready
+        assert prober.statuses["backend"].last_success == 1000.0
+
+        backend.side_effect = ConnectionError("refused")
+        now[0] = 1010.0
+        await prober.check_all()
+        assert prober.ready  # одна неудача ниже порога
+        now[0] = 1020.0
+        await prober.check_all()
+        assert not prober.ready
+        dependency = prober.stats()["dependencies"]["backend"]
+        assert dependency["error"] == "ConnectionError: refused"
+        assert dependency["last_success"] == 1000.0
+        assert dependency["consecutive_failures"] == 2
+        assert dependency["latency_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_timeout_and_stale(self):
+        """Тест зависшей проверки и устаревшего результата"""
+        now = [1000.0]
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        prober = ReadinessProber({"telegram": hang}, interval=10, timeout=0.01, clock=lambda: now[0])
+        await prober.check_all()
+        assert prober.statuses["telegram"].error == "TimeoutError"
+
+        prober.probes["telegram"] = AsyncMock()
+        await prober.check_all()
+        assert prober.ready
+        now[0] = 1030.0
+        assert prober.stale() == ["telegram"]
+        assert not prober.ready
+
+class TestReadyEndpoint:
+    """Тесты эндпоинта /ready"""
+
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            return SubTrackerBot()
+
+    @pytest.mark.asyncio
+    async def test_probe_storm_served_from_cache(self, bot):
+        """Тест частых запросов /ready без запросов к зависимостям"""
+        bot.backend.probe = AsyncMock(return_value=BackendResponse(status=200, body=b'{"status": "UP"}'))
+        bot.bot.get_me = AsyncMock()
+
+        async with TestClient(TestServer(bot.app)) as client:
+            response = await client.get("/ready")
+            assert response.status == 503
+
+            await bot.readiness.check_all()
+            for _ in range(20):
+                response = await client.get("/ready")
+                assert response.status == 200
+            body = await response.json()
+
+        assert body["status"] == "READY"
+        assert set(body["dependencies"]) == {"backend", "telegram"}
+        bot.backend.probe.assert_called_once_with("/api/health", timeout=bot.readiness.timeout)
+        bot.bot.get_me.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_backend_error_status(self, bot):
+        """Тест ответа backend API с ошибкой"""
+        bot.backend.probe = AsyncMock(return_value=BackendResponse(status=503, body=b""))
+        bot.bot.get_me = AsyncMock()
+        bot.readiness.failure_threshold = 1
+
+        await bot.readiness.check_all()
+
+        stats = bot.readiness.stats()
+        assert not stats["ready"]
+        assert stats["dependencies"]["backend"]["error"] == "RuntimeError: status 503"
+        assert stats["dependencies"]["telegram"]["ok"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
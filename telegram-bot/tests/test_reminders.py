@@ -0,0 +1,163 @@
+import pytest
+import asyncio
+from datetime import datetime, timezone
+from models import Subscription
+from reminders import ReminderScheduler
+from storage import MemoryStore
+
+# 2024-01-12 09:00 UTC: время отправки напоминаний о платежах 2024-01-15
+FIRE_TIME = datetime(2024, 1, 12, 9, tzinfo=timezone.utc).timestamp()
+
+def make_subscription(subscription_id, next_payment="2024-01-15", name="Netflix"):
+    """Создание тестовой подписки"""
+    return Subscription(
+        id=subscription_id,
+        user_id="12345",
+        name=name,
+        price="15.99",
+        currency="USD",
+        billing_period="monthly",
+        next_payment=next_payment,
+        category="Entertainment",
+        is_active=True
+    )
+
+class TestReminderScheduler:
+    """Тесты для планировщика напоминаний о платежах"""
+
+    def make_scheduler(self, store=None, now=FIRE_TIME - 3600, **kwargs):
+        sent = []
+        clock = [now]
+
+        async def send(chat_id, text):
+            sent.append((chat_id, text))
+
+        scheduler = ReminderScheduler(store or MemoryStore(), send, days_before=3, hour=9, clock=lambda: clock[0], **kwargs)
+        return scheduler, sent, clock
+
+    def test_sync_chat_diff(self):
+        """Тест сверки напоминаний с актуальным списком подписок"""
+        scheduler, _, _ = self.make_scheduler()
+        scheduler.sync_chat(1, [make_subscription("a"), make_subscription("b", "2024-02-01")])
+        assert scheduler.stats()["scheduled"] == 2
+        assert scheduler.stats()["days"] == 2
+
+        # Подписка "b" удалена, у "a" изменилась дата платежа
+        scheduler.sync_chat(1, [make_subscription("a", "2024-01-20")])
+        stats = scheduler.stats()
+        assert stats["scheduled"] == 1
+        assert stats["days"] == 1
+        assert stats["next_fire_in"] == 5 * 86400 + 3600
+
+        scheduler.remove(1, "a")
+        assert scheduler.stats()["chats"] == 0
+
+    def test_reschedule_same_day_once_in_heap(self):
+        """Тест повторного планирования на тот же день: день входит в кучу один раз"""
+        scheduler, _, _ = self.make_scheduler()
+        for _ in range(100):
+            scheduler.add(1, make_subscription("a"))
+            scheduler.remove(1, "a")
+        scheduler.add(1, make_subscription("a"))
+        scheduler.add(2, make_subscription("b"))
+
+        assert len(scheduler._day_heap) == 1
+        assert scheduler.stats()["scheduled"] == 2
+        assert scheduler.stats()["next_fire_in"] == 3600
+
+    @pytest.mark.asyncio
+    async def test_reminder_sent_once(self):
+        """Тест однократной отправки напоминания в назначенное время"""
+        scheduler, sent, clock = self.make_scheduler()
+        await scheduler.start()
+        scheduler.sync_chat(1, [make_subscription("a")])
+        await asyncio.sleep(0.01)
+        assert sent == []
+
+        clock[0] = FIRE_TIME
+        scheduler._wakeup.set()
+        await asyncio.sleep(0.01)
+        assert sent == [(1, "🔔 Напоминание: 2024-01-15 платеж за Netflix - 15.99 USD")]
+
+        # Повторная сверка с той же датой платежа не планирует напоминание заново
+        scheduler.sync_chat(1, [make_subscription("a")])
+        assert scheduler.stats()["scheduled"] == 0
+        await scheduler.stop()
+        assert scheduler.stats()["sent_total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_past_payment_skipped(self):
+        """Тест пропуска напоминаний о прошедших платежах"""
+        scheduler, sent, _ = self.make_scheduler(now=FIRE_TIME + 10 * 86400)
+        await scheduler.start()
+        scheduler.sync_chat(1, [make_subscription("a")])
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        assert sent == []
+        assert scheduler.stats()["scheduled"] == 0
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency(self):
+        """Тест ограничения числа одновременных отправок"""
+        active = 0
+        peak = 0
+
+        async def send(chat_id, text):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.001)
+            active -= 1
+
+        scheduler = ReminderScheduler(MemoryStore(), send, max_concurrency=3, clock=lambda: FIRE_TIME)
+        for chat_id in range(20):
+            scheduler.sync_chat(chat_id, [make_subscription("a")])
+        await scheduler.start()
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        assert scheduler.sent_total == 20
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_survives_restart(self):
+        """Тест восстановления расписания после перезапуска"""
+        store = MemoryStore()
+        first, _, _ = self.make_scheduler(store)
+        first.sync_chat(1, [make_subscription("a"), make_subscription("b", "2024-03-01")])
+        first.sync_chat(2, [make_subscription("c")])
+        await first.persist()
+
+        second, sent, clock = self.make_scheduler(store)
+        await second.start()
+        assert second.stats()["scheduled"] == 3
+        assert second.stats()["chats"] == 2
+
+        clock[0] = FIRE_TIME
+        second._wakeup.set()
+        await asyncio.sleep(0.01)
+        await second.stop()
+        assert sorted(chat_id for chat_id, _ in sent) == [1, 2]
+
+        # Отметка об отправке сохраняется: после перезапуска напоминание не повторяется
+        third, third_sent, _ = self.make_scheduler(store, now=FIRE_TIME)
+        await third.start()
+        await asyncio.sleep(0.01)
+        await third.stop()
+        assert third_sent == []
+        assert third.stats()["scheduled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh_from_loader(self):
+        """Тест постепенной сверки с backend API"""
+        async def loader(chat_id):
+            return [make_subscription("new", "2024-01-16")]
+
+        scheduler, _, _ = self.make_scheduler(loader=loader, refresh_interval=0.001, refresh_batch=1)
+        scheduler.sync_chat(1, [make_subscription("old")])
+        await scheduler.start()
+        await asyncio.sleep(0.02)
+        await scheduler.stop()
+        assert list(scheduler._chats[1]) == ["new"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from bot import SubTrackerBot
+from models import Subscription
+from render import ListRenderer, MESSAGE_LIMIT, LIST_PAGE_NOOP
+
+def make_subscriptions(count, name="Subscription"):
+    """Создание списка тестовых подписок"""
+    return [
+        Subscription(
+            id=f"sub{i}",
+            user_id="12345",
+            name=f"{name} {i}",
+            price="9.99",
+            currency="USD",
+            billing_period="monthly",
+            next_payment="2024-01-15",
+            category="Other",
+            is_active=True
+        )
+        for i in range(count)
+    ]
+
+class TestListRenderer:
+    """Тесты для постраничного вывода списка подписок"""
+
+    def test_single_page_without_keyboard(self):
+        """Тест короткого списка без кнопок навигации"""
+        text, keyboard = ListRenderer().render_page(make_subscriptions(3), 0)
+        assert text.startswith("📋 Ваши подписки:\n")
+        assert "Subscription 2" in text
+        assert keyboard is None
+
+    def test_pages_and_navigation(self):
+        """Тест разбиения на страницы и кнопок навигации"""
+        renderer = ListRenderer(page_size=10)
+        subscriptions = make_subscriptions(25)
+
+        text, keyboard = renderer.render_page(subscriptions, 1)
+        assert "страница 2/3, всего 25" in text
+        assert "Subscription 10" in text
+        assert "Subscription 20" not in text
+
+        buttons = keyboard.inline_keyboard[0]
+        assert [button.callback_data for button in buttons] == ["list_page:0", LIST_PAGE_NOOP, "list_page:2"]
+
+        _, last_keyboard = renderer.render_page(subscriptions, 2)
+        assert [button.callback_data for button in last_keyboard.inline_keyboard[0]] == ["list_page:1", LIST_PAGE_NOOP]
+
+    def test_page_is_clamped(self):
+        """Тест номера страницы за пределами списка"""
+        text, _ = ListRenderer(page_size=10).render_page(make_subscriptions(15), 99)
+        assert "страница 2/2" in text
+
+    def test_page_fits_message_limit(self):
+        """Тест ограничения длины страницы при длинных названиях"""
+        renderer = ListRenderer(page_size=50)
+        text, _ = renderer.render_page(make_subscriptions(100, name="x" * 1000), 0)
+        assert len(text) <= MESSAGE_LIMIT
+
+    def test_render_large_account_page(self):
+        """Тест страницы большого списка: только подписки этой страницы (время - benchmarks/bench_render.py)"""
+        renderer = ListRenderer(page_size=10)
+        text, _ = renderer.render_page(make_subscriptions(5000), 250)
+        assert "страница 251/500, всего 5000" in text
+        assert text.count("Subscription ") == 10
+        assert "Subscription 2500" in text and "Subscription 2509" in text
+
+    @pytest.mark.asyncio
+    async def test_bot_switches_page_in_place(self):
+        """Тест перехода на другую страницу с редактированием сообщения"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            bot = SubTrackerBot()
+        bot.user_tokens[12345] = "test_token"
+        bot.subscription_cache.set(12345, "test_token", make_subscriptions(25))
+
+        callback_query = Mock()
+        callback_query.data = "list_page:2"
+        callback_query.message.chat.id = 12345
+        callback_query.message.edit_text = AsyncMock()
+        callback_query.answer = AsyncMock()
+
+        await bot.handle_callback_query(callback_query, Mock())
+
+        callback_query.answer.assert_called_once_with()
+        text = callback_query.message.edit_text.call_args[0][0]
+        assert "страница 3/3" in text
+        assert "Subscription 24" in text
+
+    @pytest.mark.asyncio
+    async def test_bot_page_of_empty_list(self):
+        """Тест перехода на страницу, когда все подписки уже удалены"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            bot = SubTrackerBot()
+        bot.user_tokens[12345] = "test_token"
+        bot.subscription_cache.set(12345, "test_token", [])
+
+        callback_query = Mock()
+        callback_query.data = "list_page:1"
+        callback_query.message.chat.id = 12345
+        callback_query.message.edit_text = AsyncMock()
+        callback_query.answer = AsyncMock()
+
+        await bot.handle_callback_query(callback_query, Mock())
+
+        callback_query.answer.assert_called_once_with()
+        callback_query.message.edit_text.assert_called_once_with("📋 У вас пока нет подписок.\nДобавьте первую: /add")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
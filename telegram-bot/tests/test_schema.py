@@ -0,0 +1,105 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from models import BillingCycle, Subscription, CreateSubscriptionRequest
+from schema import (
+    SUBSCRIPTION_KEYS,
+    CREATE_REQUEST_KEYS,
+    decode_subscription,
+    decode_subscriptions,
+    encode_create_request,
+)
+
+class TestSchema:
+    """Тесты для преобразования JSON объектов backend API"""
+
+    @pytest.fixture
+    def raw_camel(self):
+        return {
+            "id": "sub1",
+            "userId": "12345",
+            "name": "Netflix",
+            "price": "15.99",
+            "currency": "USD",
+            "billingPeriod": "monthly",
+            "nextPayment": "2023-12-31",
+            "category": "Video",
+            "isActive": True,
+            "description": None
+        }
+
+    def test_key_tables(self):
+        """Тест таблиц соответствия ключей"""
+        assert SUBSCRIPTION_KEYS["billingPeriod"] == "billing_period"
+        assert SUBSCRIPTION_KEYS["billing_period"] == "billing_period"
+        assert ("next_payment", "nextPayment") in CREATE_REQUEST_KEYS
+
+    def test_decode_camel_case(self, raw_camel):
+        """Тест декодирования ключей camelCase"""
+        sub = decode_subscription(raw_camel)
+        assert isinstance(sub, Subscription)
+        assert sub.user_id == "12345"
+        assert sub.billing_period == "monthly"
+        assert sub.is_active is True
+
+    def test_decode_typed_values(self, raw_camel):
+        """Тест разбора цены, даты и цикла оплаты при декодировании"""
+        sub = decode_subscription(raw_camel)
+        assert sub.price == Decimal("15.99")
+        assert sub.next_payment == date(2023, 12, 31)
+        assert sub.billing_period is BillingCycle.MONTHLY
+        assert not hasattr(sub, "__dict__")
+        # Одинаковые значения в ответе разбираются в общий объект
+        assert decode_subscription(raw_camel).next_payment is sub.next_payment
+
+    def test_decode_invalid_values(self, raw_camel):
+        """Тест некорректных цены, даты и неизвестного цикла оплаты"""
+        raw_camel.update(price="abc", nextPayment="soon", billingPeriod="QUARTERLY")
+        sub = decode_subscription(raw_camel)
+        assert sub.price is None
+        assert sub.next_payment is None
+        assert sub.billing_period is BillingCycle.MONTHLY
+
+    def test_decode_snake_case(self, raw_camel):
+        """Тест декодирования ключей snake_case"""
+        raw = {SUBSCRIPTION_KEYS[key]: value for key, value in raw_camel.items()}
+        assert decode_subscription(raw) == decode_subscription(raw_camel)
+
+    def test_decode_ignores_unknown_keys(self, raw_camel):
+        """Тест пропуска неизвестных ключей"""
+        raw_camel["createdAt"] = "2023-01-01"
+        assert decode_subscription(raw_camel).name == "Netflix"
+
+    def test_decode_missing_field(self):
+        """Тест ошибки при отсутствии обязательного поля"""
+        with pytest.raises(TypeError):
+            decode_subscription({"id": "sub1"})
+
+    def test_decode_list(self, raw_camel):
+        """Тест декодирования списка"""
+        assert len(decode_subscriptions([raw_camel, raw_camel])) == 2
+
+    def test_encode_create_request(self):
+        """Тест кодирования запроса создания подписки"""
+        request = CreateSubscriptionRequest(
+            user_id="12345",
+            name="Netflix",
+            price="15.99",
+            currency="USD",
+            billing_period="monthly",
+            next_payment="2023-12-31",
+            category="Video"
+        )
+        assert encode_create_request(request) == {
+            "userId": "12345",
+            "name": "Netflix",
+            "price": "15.99",
+            "currency": "USD",
+            "billingPeriod": "monthly",
+            "nextPayment": "2023-12-31",
+            "category": "Video",
+            "description": None
+        }
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
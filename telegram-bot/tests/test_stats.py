@@ -0,0 +1,84 @@
+import pytest
+from decimal import Decimal
+from models import BillingCycle, Subscription
+from stats import compute_stats, render_stats, money
+
+def make_subscription(name, price, cycle="monthly", currency="USD", category="Other"):
+    """Создание тестовой подписки"""
+    return Subscription(
+        id=name,
+        user_id="12345",
+        name=name,
+        price=price,
+        currency=currency,
+        billing_period=cycle,
+        next_payment="2024-01-15",
+        category=category,
+        is_active=True
+    )
+
+class TestStats:
+    """Тесты для расчета статистики расходов"""
+
+    def test_monthly_only(self):
+        """Тест статистики по ежемесячным подпискам"""
+        stats = compute_stats([
+            make_subscription("Netflix", "15.99"),
+            make_subscription("Spotify", "9.99"),
+        ])
+        assert stats.count == 2
+        assert money(stats.monthly) == "25.98"
+        assert money(stats.yearly) == "311.76"
+        assert stats.cheapest.name == "Spotify"
+        assert stats.most_expensive.name == "Netflix"
+
+    def test_cycles_are_normalized(self):
+        """Тест приведения годовых и еженедельных подписок к месячным расходам"""
+        stats = compute_stats([
+            make_subscription("Yearly", "120", cycle="yearly"),
+            make_subscription("Weekly", "1", cycle="WEEKLY"),
+        ])
+        assert stats.yearly == Decimal("172")
+        assert stats.by_cycle[BillingCycle.YEARLY].yearly == Decimal("120")
+        assert stats.by_cycle[BillingCycle.WEEKLY].count == 1
+        assert money(stats.by_cycle[BillingCycle.YEARLY].monthly) == "10.00"
+        # Сравнение по годовой стоимости: 52 против 120
+        assert stats.cheapest.name == "Weekly"
+        assert stats.most_expensive.name == "Yearly"
+
+    def test_decimal_precision(self):
+        """Тест точности вычислений без ошибок float"""
+        stats = compute_stats([make_subscription(str(i), "0.10") for i in range(3)])
+        assert stats.monthly == Decimal("0.30")
+
+    def test_breakdowns(self):
+        """Тест разбивки по категориям и валютам"""
+        stats = compute_stats([
+            make_subscription("A", "10", currency="USD", category="Music"),
+            make_subscription("B", "5", currency="EUR", category="Music"),
+            make_subscription("C", "100", currency="RUB", category="Video"),
+        ])
+        assert stats.by_currency == {"USD": Decimal(120), "EUR": Decimal(60), "RUB": Decimal(1200)}
+        assert stats.by_category == {"Music": Decimal(180), "Video": Decimal(1200)}
+
+    def test_invalid_price_skipped(self):
+        """Тест пропуска подписок с некорректной ценой"""
+        stats = compute_stats([make_subscription("A", "abc"), make_subscription("B", "1")])
+        assert stats.count == 1
+        assert stats.skipped == 1
+        assert "некорректной ценой: 1" in render_stats(stats)
+
+    def test_render(self):
+        """Тест формирования сообщения"""
+        text = render_stats(compute_stats([
+            make_subscription("Netflix", "15.99"),
+            make_subscription("Spotify", "9.99"),
+        ]))
+        assert "📊 Статистика ваших подписок:" in text
+        assert "Всего подписок: 2" in text
+        assert "Общие расходы в месяц: $25.98" in text
+        assert "Самая дешевая: Spotify - 9.99 USD" in text
+        assert "• USD: 25.98 / 311.76" in text
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
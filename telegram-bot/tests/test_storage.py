@@ -0,0 +1,264 @@
+import pytest
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+from aiogram.fsm.storage.base import StorageKey
+from bot import SubTrackerBot, BotState
+from storage import (
+    BatchingStore,
+    CachedStore,
+    KeyValueFSMStorage,
+    MemoryStore,
+    RedisError,
+    RedisStore,
+    SQLiteStore,
+    create_store,
+    encode_command,
+)
+
+class FakeRedisServer:
+    """Локальная замена сервера Redis с поддержкой GET/SET/DEL/PING/SELECT"""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.server = None
+        self.writers = set()
+        self.password = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for writer in self.writers:
+            writer.close()
+        await self.server.wait_closed()
+        await asyncio.sleep(0)
+
+    async def read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def handle(self, reader, writer):
+        self.writers.add(writer)
+        while True:
+            args = await self.read_command(reader)
+            if args is None:
+                break
+            name = args[0].decode().upper()
+            self.commands.append(name)
+            writer.write(self.execute(name, args[1:]))
+        self.writers.discard(writer)
+        writer.close()
+
+    def execute(self, name, args):
+        now = time.time()
+        if name == "AUTH" and args[0].decode() != self.password:
+            return b"-WRONGPASS invalid password\r\n"
+        if name in ("PING", "SELECT", "AUTH"):
+            return b"+OK\r\n"
+        if name == "SET":
+            expires_at = now + int(args[3]) / 1000 if len(args) > 3 else None
+            self.data[args[0]] = (args[1], expires_at)
+            return b"+OK\r\n"
+        if name == "GET":
+            value, expires_at = self.data.get(args[0], (None, None))
+            if value is None or (expires_at is not None and expires_at <= now):
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "DEL":
+            return b":%d\r\n" % int(self.data.pop(args[0], None) is not None)
+        return b"-ERR unknown command\r\n"
+
+class TestKeyValueStores:
+    """Тесты для хранилищ состояния бота"""
+
+    @pytest.mark.asyncio
+    async def test_memory_store_ttl(self):
+        """Тест истечения записи в памяти"""
+        now = [0.0]
+        store = MemoryStore(clock=lambda: now[0])
+        await store.set("key", "value", ttl=10)
+        assert await store.get("key") == "value"
+        now[0] = 10
+        assert await store.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_batches_writes(self, tmp_path):
+        """Тест пакетной записи в SQLite"""
+        store = SQLiteStore(str(tmp_path / "state.db"), flush_interval=10)
+        for i in range(10):
+            await store.set(f"key{i}", str(i))
+        # Чтение собственных изменений до записи на диск
+        assert await store.get("key5") == "5"
+        assert store.flushes == 0
+
+        await store.flush()
+        assert store.flushes == 1
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_persists(self, tmp_path):
+        """Тест сохранения данных SQLite между запусками"""
+        path = str(tmp_path / "state.db")
+        store = SQLiteStore(path)
+        await store.set("token:1", "jwt")
+        await store.set("expired", "value", ttl=0.001)
+        await store.set("deleted", "value")
+        await store.delete("deleted")
+        await store.close()
+
+        await asyncio.sleep(0.01)
+        reopened = SQLiteStore(path)
+        assert await reopened.get("token:1") == "jwt"
+        assert await reopened.get("expired") is None
+        assert await reopened.get("deleted") is None
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_redis_store(self):
+        """Тест хранилища Redis на локальной замене сервера"""
+        server = FakeRedisServer()
+        port = await server.start()
+        store = RedisStore(port=port, db=1, flush_interval=0.01)
+        try:
+            await store.set("a", "1")
+            await store.set("b", "2", ttl=60)
+            await store.delete("a")
+            await store.flush()
+
+            assert await store.get("a") is None
+            assert await store.get("b") == "2"
+            # Параллельные чтения отправляются по одному соединению
+            results = await asyncio.gather(*(store.get("b") for _ in range(20)))
+            assert results == ["2"] * 20
+            assert server.commands.count("SELECT") == 1
+        finally:
+            await store.close()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_redis_auth_failure_drops_connection(self):
+        """Тест ошибки AUTH: команды не выполняются на ненастроенном соединении"""
+        server = FakeRedisServer()
+        server.password = "secret"
+        port = await server.start()
+        store = RedisStore(port=port, password="wrong")
+        try:
+            for _ in range(2):
+                with pytest.raises(RedisError):
+                    await store.get("a")
+                assert store._writer is None and store._reader_task is None
+            assert server.commands == ["AUTH", "AUTH"]
+
+            store.password = "secret"
+            assert await store.get("a") is None
+            assert server.commands == ["AUTH", "AUTH", "AUTH", "GET"]
+        finally:
+            await store.close()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_flush_retry_backoff(self, caplog):
+        """Тест экспоненциальной задержки повторной записи и редких предупреждений"""
+
+        class FailingStore(BatchingStore):
+            attempts = 0
+
+            async def _read(self, key):
+                return None
+
+            async def _write_batch(self, batch):
+                self.attempts += 1
+                raise ConnectionError("storage is down")
+
+        store = FailingStore(flush_interval=0.01, max_retry_interval=0.04, batch_size=1)
+        await store.set("key", "value")
+        with patch("storage.asyncio.sleep", AsyncMock()) as sleep:
+            # Каждая попытка планирует следующую с задержкой retry_delay()
+            while store.attempts < 5:
+                await store._flush_task
+            store._flush_task.cancel()
+        delays = [call.args[0] for call in sleep.call_args_list]
+
+        assert delays[:5] == [0, 0.02, 0.04, 0.04, 0.04]
+        assert 5 <= store.attempts == store.flush_failures < 8
+        warnings = [record for record in caplog.records if record.getMessage() == "Storage flush failed, batch re-queued"]
+        # Предупреждения на 1, 2 и 4 ошибке подряд, трассировка только у первой
+        assert len(warnings) == 3
+        assert warnings[0].exc_info and not any(record.exc_info for record in warnings[1:])
+        assert await store.get("key") == "value"
+
+    def test_encode_command(self):
+        """Тест кодирования команды RESP"""
+        assert encode_command(("GET", "key")) == b"*2\r\n$3\r\nGET\r\n$3\r\nkey\r\n"
+
+    @pytest.mark.asyncio
+    async def test_cached_store(self):
+        """Тест локального кэша чтения"""
+        inner = MemoryStore()
+        store = CachedStore(inner, ttl=60)
+        await inner.set("key", "value")
+        assert await store.get("key") == "value"
+        await inner.delete("key")
+        # Значение берется из кэша без обращения к хранилищу
+        assert await store.get("key") == "value"
+        assert store.hits == 1
+
+    def test_create_store(self, tmp_path):
+        """Тест выбора хранилища по URL"""
+        assert isinstance(create_store("memory://"), MemoryStore)
+        sqlite_store = create_store(f"sqlite:///{tmp_path}/state.db?flush_interval=0.2")
+        assert isinstance(sqlite_store, SQLiteStore)
+        assert sqlite_store.path == f"{tmp_path}/state.db"
+        assert sqlite_store.flush_interval == 0.2
+        redis_store = create_store("redis://:secret@redis:6380/2")
+        assert (redis_store.host, redis_store.port, redis_store.db, redis_store.password) == ("redis", 6380, 2, "secret")
+        with pytest.raises(ValueError):
+            create_store("ftp://host")
+
+    @pytest.mark.asyncio
+    async def test_fsm_storage(self):
+        """Тест хранения состояний FSM"""
+        storage = KeyValueFSMStorage(MemoryStore())
+        key = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+        await storage.set_state(key, BotState.ADDING_SUBSCRIPTION_NAME)
+        await storage.set_data(key, {"name": "Netflix"})
+        assert await storage.get_state(key) == BotState.ADDING_SUBSCRIPTION_NAME.state
+        assert await storage.get_data(key) == {"name": "Netflix"}
+
+        await storage.set_state(key, None)
+        await storage.set_data(key, {})
+        assert await storage.get_state(key) is None
+        assert await storage.get_data(key) == {}
+
+    @pytest.mark.asyncio
+    async def test_bot_tokens_survive_restart(self, tmp_path):
+        """Тест сохранения токенов пользователей между перезапусками бота"""
+        env = {
+            'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ',
+            'BOT_STORAGE_URL': f"sqlite:///{tmp_path}/bot.db"
+        }
+        with patch.dict('os.environ', env):
+            first = SubTrackerBot()
+            second = SubTrackerBot()
+
+        assert isinstance(first.dp.storage, KeyValueFSMStorage)
+        await first.save_token(12345, "jwt")
+        await first.store.close()
+
+        assert await second.get_token(12345) == "jwt"
+        assert second.user_tokens[12345] == "jwt"
+        await second.store.close()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,153 @@
+import pytest
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+from aiohttp.test_utils import TestClient, TestServer
+from bot import SubTrackerBot
+from supervisor import ALLOWED_UPDATES, HashRing, Supervisor, UpdateReceiver, WorkerChannel, chat_key
+
+def make_update(update_id, chat_id, text="/help"):
+    """Создание обновления с текстовым сообщением в виде JSON объекта"""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": text
+        }
+    }
+
+class TestRouting:
+    """Тесты для распределения чатов по рабочим процессам"""
+
+    def test_chat_key(self):
+        """Тест определения чата обновления"""
+        assert chat_key(make_update(1, -100500)) == -100500
+        callback = {"update_id": 2, "callback_query": {"id": "q", "from": {"id": 7}, "message": {"chat": {"id": 12345}}}}
+        assert chat_key(callback) == 12345
+        assert chat_key({"update_id": 3, "inline_query": {"id": "q", "from": {"id": 7}}}) == 7
+        assert chat_key({"update_id": 4}) == 4
+
+    def test_hash_ring(self):
+        """Тест равномерного и стабильного распределения частей"""
+        ring = HashRing(4)
+        assert sorted(set(ring.owners)) == [0, 1, 2, 3]
+        assert ring.worker_for(12345) == HashRing(4).worker_for(12345)
+        assert sum(len(ring.partitions_of(worker)) for worker in range(4)) == ring.partitions
+        # При добавлении процесса части переезжают только на новый процесс
+        grown = HashRing(5)
+        moved = [new for old, new in zip(ring.owners, grown.owners) if old != new]
+        assert moved and set(moved) == {4}
+        with pytest.raises(ValueError):
+            HashRing(0)
+
+    def test_allowed_updates(self):
+        """Тест совпадения типов обновлений с обработчиками бота"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            bot = SubTrackerBot()
+        assert sorted(bot.dp.resolve_used_update_types()) == ALLOWED_UPDATES
+
+class TestIPC:
+    """Тесты передачи обновлений рабочему процессу через локальный сокет"""
+
+    @pytest.mark.asyncio
+    async def test_per_chat_order(self, tmp_path):
+        """Тест порядка обновлений одного чата при параллельной обработке разных чатов"""
+        handled = []
+
+        async def handle(body):
+            update = json.loads(body)
+            if update["update_id"] == 1:
+                await asyncio.sleep(0.05)
+            handled.append(update["update_id"])
+
+        path = str(tmp_path / "worker.sock")
+        receiver = UpdateReceiver(handle)
+        await receiver.start(path)
+        channel = WorkerChannel(path)
+        channel.start()
+        for update in (make_update(1, 1), make_update(2, 2), make_update(3, 1), make_update(4, 2)):
+            await channel.put(chat_key(update), json.dumps(update).encode())
+        await asyncio.sleep(0.1)
+        await channel.stop()
+        await receiver.stop()
+
+        assert handled == [2, 4, 1, 3]
+        assert receiver.stats()["received_total"] == 4
+        assert channel.stats()["sent_total"] == 4
+
+    @pytest.mark.asyncio
+    async def test_reconnect_after_worker_restart(self, tmp_path):
+        """Тест повторного подключения к перезапущенному процессу"""
+        handled = []
+
+        async def handle(body):
+            handled.append(json.loads(body)["update_id"])
+
+        path = str(tmp_path / "worker.sock")
+        channel = WorkerChannel(path)
+        channel.start()
+        # Процесс еще не запущен: обновление ждет подключения
+        await channel.put(1, json.dumps(make_update(1, 1)).encode())
+        receiver = UpdateReceiver(handle)
+        await receiver.start(path)
+        await asyncio.sleep(0.3)
+        await channel.stop()
+        await receiver.stop()
+        assert handled == [1]
+
+    @pytest.mark.asyncio
+    async def test_worker_feeds_dispatcher(self):
+        """Тест обработки обновления из JSON рабочим процессом"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            bot = SubTrackerBot()
+        bot.bot.session.make_request = AsyncMock(return_value=True)
+        await bot.feed_update_json(json.dumps(make_update(1, 12345)).encode())
+        method = bot.bot.session.make_request.call_args.args[1]
+        assert method.chat_id == 12345
+        assert method.text.startswith("📖 Справка по командам")
+
+class TestSupervisor:
+    """Тесты для входного процесса супервизора"""
+
+    @pytest.mark.asyncio
+    async def test_webhook_routes_to_owner(self):
+        """Тест передачи обновления из webhook процессу, которому принадлежит чат"""
+        env = {
+            'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ',
+            'BOT_WORKERS': '3',
+            'BOT_MODE': 'webhook',
+            'WEBHOOK_URL': 'https://bot.example.com',
+            'WEBHOOK_SECRET': 'test_secret',
+        }
+        with patch.dict('os.environ', env):
+            supervisor = Supervisor()
+        client = TestClient(TestServer(supervisor.app))
+        await client.start_server()
+        try:
+            response = await client.post("/webhook", json=make_update(1, 12345))
+            assert response.status == 401
+            response = await client.post(
+                "/webhook",
+                json=make_update(1, 12345),
+                headers={"X-Telegram-Bot-Api-Secret-Token": "test_secrex"},
+            )
+            assert response.status == 401
+            response = await client.post(
+                "/webhook",
+                json=make_update(1, 12345),
+                headers={"X-Telegram-Bot-Api-Secret-Token": "test_secret"},
+            )
+            assert response.status == 200
+        finally:
+            await client.close()
+            await supervisor.bot.session.close()
+
+        owner = supervisor.ring.worker_for(12345)
+        assert [channel.stats()["queued"] for channel in supervisor.channels] == [int(index == owner) for index in range(3)]
+        assert supervisor.routed_total == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,122 @@
+import base64
+import json
+import pytest
+import time
+from unittest.mock import AsyncMock, Mock, patch
+from bot import SubTrackerBot
+from tokens import TokenManager, jwt_expiry
+
+def make_jwt(exp):
+    """JWT с заданным claim exp (подпись не проверяется)"""
+    payload = base64.urlsafe_b64encode(json.dumps({"sub": "user", "exp": exp}).encode()).rstrip(b"=").decode()
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload}.signature"
+
+class TestTokenManager:
+    """Тесты для учета срока действия токенов"""
+
+    def test_jwt_expiry(self):
+        """Тест чтения claim exp без проверки подписи"""
+        assert jwt_expiry(make_jwt(1700000000)) == 1700000000.0
+        assert jwt_expiry("test_token") is None
+        assert jwt_expiry("a.!!!.c") is None
+
+    def test_dict_interface(self):
+        """Тест работы как обычного словаря"""
+        tokens = TokenManager({1: "test_token"}, default_ttl=100, clock=lambda: 1000.0)
+        assert isinstance(tokens, dict)
+        assert tokens[1] == "test_token"
+        assert tokens.expires_at(1) == 1100.0
+        del tokens[1]
+        assert 1 not in tokens
+        assert tokens.remaining(1) is None
+
+    def test_bulk_eviction(self):
+        """Тест удаления истекших токенов пачкой по индексу сроков"""
+        now = [1000.0]
+        tokens = TokenManager(sweep_interval=10, clock=lambda: now[0])
+        for chat_id in range(10):
+            tokens[chat_id] = make_jwt(1000 + chat_id * 100)
+        # Новый токен чата 1 действует дольше: старая запись индекса пропускается
+        tokens[1] = make_jwt(5000)
+        tokens.pop(2)
+
+        now[0] = 1450.0
+        assert sorted(tokens.evict_expired()) == [0, 3, 4]
+        assert tokens.evict_expired() == []  # не чаще раза в sweep_interval
+        assert 1 in tokens and 5 in tokens
+        assert tokens.was_expired(3) and not tokens.was_expired(2)
+        assert tokens.stats()["evictions"] == 3
+
+        tokens[3] = make_jwt(9000)
+        assert not tokens.was_expired(3)
+
+    def test_needs_warning_once(self):
+        """Тест однократного предупреждения об истекающей сессии"""
+        now = [1000.0]
+        tokens = TokenManager(refresh_margin=300, clock=lambda: now[0])
+        tokens[1] = make_jwt(1500)
+        assert not tokens.needs_warning(1)
+        now[0] = 1250.0
+        assert tokens.needs_warning(1)
+        assert not tokens.needs_warning(1)
+        assert tokens.stats()["expiring"] == 1
+
+class TestBotTokens:
+    """Тесты проверки токена перед запросами к backend API"""
+
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ'}):
+            return SubTrackerBot()
+
+    @pytest.fixture
+    def message(self):
+        """Фикстура для создания сообщения"""
+        message = Mock()
+        message.chat.id = 12345
+        message.answer = AsyncMock()
+        return message
+
+    @pytest.mark.asyncio
+    async def test_expired_token_skips_backend(self, bot, message):
+        """Тест истекшего токена: без запроса к backend API и с сообщением о повторном входе"""
+        bot.user_tokens[12345] = make_jwt(1)
+        bot.backend.request = AsyncMock()
+
+        await bot.handle_list_command(message)
+
+        bot.backend.request.assert_not_called()
+        message.answer.assert_called_once_with("⌛ Сессия истекла, войдите снова: /login")
+        assert 12345 not in bot.user_tokens
+
+    @pytest.mark.asyncio
+    async def test_near_expiry_warning(self, bot):
+        """Тест предупреждения о скором истечении сессии"""
+        bot.user_tokens[12345] = make_jwt(time.time() + 120)
+        bot.bot.session.make_request = AsyncMock(return_value=True)
+
+        assert await bot.get_token(12345) == bot.user_tokens[12345]
+        assert await bot.get_token(12345) is not None
+
+        bot.bot.session.make_request.assert_called_once()
+        assert "Сессия истечет" in bot.bot.session.make_request.call_args.args[1].text
+
+    @pytest.mark.asyncio
+    async def test_store_ttl_follows_expiry(self, bot):
+        """Тест срока хранения токена не дольше срока действия JWT"""
+        bot.store.set = AsyncMock()
+
+        await bot.save_token(12345, make_jwt(time.time() + 3600))
+
+        ttl = bot.store.set.call_args.args[2]
+        assert 3590 < ttl <= 3600
+
+    def test_assigning_dict_keeps_manager(self, bot):
+        """Тест присваивания словаря токенов"""
+        bot.user_tokens = {12345: "test_token"}
+        assert isinstance(bot.user_tokens, TokenManager)
+        assert bot.user_tokens.expires_at(12345) is not None
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
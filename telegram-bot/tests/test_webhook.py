@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from aiohttp.test_utils import TestClient, TestServer
+from bot import SubTrackerBot
+
+WEBHOOK_ENV = {
+    'TELEGRAM_BOT_TOKEN': '123456789:ABCdefGhIJKlmNoPQRsTUVwxyZ',
+    'BOT_MODE': 'webhook',
+    'WEBHOOK_URL': 'https://bot.example.com/',
+    'WEBHOOK_SECRET': 'test_secret'
+}
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 12345, "type": "private"},
+        "from": {"id": 12345, "is_bot": False, "first_name": "Test"},
+        "text": "/help"
+    }
+}
+
+class TestWebhookMode:
+    """Тесты для режима приема обновлений через webhook"""
+    
+    @pytest.fixture
+    def bot(self):
+        """Фикстура для создания экземпляра бота в режиме webhook"""
+        with patch.dict('os.environ', WEBHOOK_ENV):
+            return SubTrackerBot()
+    
+    def test_polling_is_default(self):
+        """Тест режима polling по умолчанию"""
+        with patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': WEBHOOK_ENV['TELEGRAM_BOT_TOKEN']}, clear=True):
+            bot = SubTrackerBot()
+        assert bot.update_mode == "polling"
+        assert all(route.method != "POST" for route in bot.app.router.routes())
+    
+    def test_webhook_requires_secret(self):
+        """Тест обязательности секрета в режиме webhook"""
+        env = dict(WEBHOOK_ENV)
+        del env['WEBHOOK_SECRET']
+        with patch.dict('os.environ', env, clear=True):
+            with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+                SubTrackerBot()
+    
+    def test_invalid_mode(self):
+        """Тест недопустимого режима"""
+        with patch.dict('os.environ', {**WEBHOOK_ENV, 'BOT_MODE': 'push'}):
+            with pytest.raises(ValueError, match="BOT_MODE"):
+                SubTrackerBot()
+    
+    @pytest.mark.asyncio
+    async def test_rejects_wrong_secret(self, bot):
+        """Тест отклонения запроса с неверным секретом"""
+        with patch.object(bot.dp, 'feed_raw_update', new=AsyncMock()) as feed:
+            async with TestClient(TestServer(bot.app)) as client:
+                response = await client.post(
+                    "/webhook",
+                    json=UPDATE,
+                    headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}
+                )
+                assert response.status == 401
+            feed.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_accepts_update(self, bot):
+        """Тест приема обновления с верным секретом"""
+        with patch.object(bot.dp, 'feed_raw_update', new=AsyncMock()) as feed:
+            async with TestClient(TestServer(bot.app)) as client:
+                response = await client.post(
+                    "/webhook",
+                    json=UPDATE,
+                    headers={"X-Telegram-Bot-Api-Secret-Token": "test_secret"}
+                )
+                assert response.status == 200
+            feed.assert_called_once()
+            assert feed.call_args.kwargs["update"]["update_id"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_run_webhook_registers_url(self, bot):
+        """Тест регистрации webhook в Telegram"""
+        with patch.object(type(bot.bot), 'set_webhook', new=AsyncMock()) as set_webhook:
+            with patch('bot.asyncio.Event') as event:
+                event.return_value.wait = AsyncMock()
+                await bot.run_webhook()
+        args, kwargs = set_webhook.call_args
+        assert args[0] == "https://bot.example.com/webhook"
+        assert kwargs["secret_token"] == "test_secret"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,179 @@
+import base64
+import heapq
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+# Число недавно истекших чатов, для которых помнится причина выхода
+EXPIRED_MEMORY = 10000
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Время истечения JWT из claim exp (подпись не проверяется; None, если exp нет)"""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    payload = parts[1]
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (ValueError, TypeError):
+        return None
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    if isinstance(exp, bool) or not isinstance(exp, (int, float)):
+        return None
+    return float(exp)
+
+
+class TokenManager(dict):
+    """Токены чатов (chat_id -> JWT) с учетом срока действия
+
+    Остается обычным словарем для кода, который читает и пишет токены напрямую.
+    Сроки хранятся в куче, упорядоченной по времени истечения: истекшие токены
+    удаляются пачкой с вершины кучи, не чаще раза в sweep_interval секунд.
+    Записи кучи для замененных и удаленных токенов пропускаются при обходе.
+    """
+
+    def __init__(
+        self,
+        tokens: Optional[Dict[int, str]] = None,
+        default_ttl: float = 86400.0,
+        refresh_margin: float = 300.0,
+        sweep_interval: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__()
+        # Срок для токенов без exp (не JWT)
+        self.default_ttl = default_ttl
+        # За сколько секунд до истечения сессия считается истекающей
+        self.refresh_margin = refresh_margin
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._expires: Dict[int, float] = {}
+        self._index: List[Tuple[float, int]] = []
+        self._next_sweep = 0.0
+        # Чаты, которые уже предупреждены об истечении текущего токена
+        self._warned: Set[int] = set()
+        # Чаты, чей токен истек (для сообщения о повторном входе)
+        self._expired: Dict[int, None] = {}
+
+        self.evictions = 0
+        if tokens:
+            self.update(tokens)
+
+    def __setitem__(self, chat_id: int, token: str):
+        expires_at = jwt_expiry(token)
+        if expires_at is None:
+            expires_at = self._clock() + self.default_ttl
+        super().__setitem__(chat_id, token)
+        self._expires[chat_id] = expires_at
+        heapq.heappush(self._index, (expires_at, chat_id))
+        self._warned.discard(chat_id)
+        self._expired.pop(chat_id, None)
+        # Записи замененных токенов копятся в куче: перестройка при двукратном избытке
+        if len(self._index) > 2 * len(self._expires) + 64:
+            self._index = [(expires, chat) for chat, expires in self._expires.items()]
+            heapq.heapify(self._index)
+
+    def __delitem__(self, chat_id: int):
+        super().__delitem__(chat_id)
+        self._forget(chat_id)
+
+    def pop(self, chat_id: int, *default: Any) -> Any:
+        self._forget(chat_id)
+        return super().pop(chat_id, *default)
+
+    def popitem(self) -> Tuple[int, str]:
+        chat_id, token = super().popitem()
+        self._forget(chat_id)
+        return chat_id, token
+
+    def setdefault(self, chat_id: int, token: str) -> str:
+        if chat_id not in self:
+            self[chat_id] = token
+        return super().__getitem__(chat_id)
+
+    def update(self, tokens: Any = (), **kwargs: str):
+        items = tokens.items() if hasattr(tokens, "items") else tokens
+        for chat_id, token in items:
+            self[chat_id] = token
+        for chat_id, token in kwargs.items():
+            self[chat_id] = token
+
+    def clear(self):
+        super().clear()
+        self._expires.clear()
+        self._index.clear()
+        self._warned.clear()
+
+    def _forget(self, chat_id: int):
+        # Запись в куче остается и пропускается при очистке
+        self._expires.pop(chat_id, None)
+        self._warned.discard(chat_id)
+
+    def expires_at(self, chat_id: int) -> Optional[float]:
+        return self._expires.get(chat_id)
+
+    def remaining(self, chat_id: int) -> Optional[float]:
+        """Секунды до истечения токена чата (None, если токена нет)"""
+        expires_at = self._expires.get(chat_id)
+        return None if expires_at is None else expires_at - self._clock()
+
+    def is_expired(self, chat_id: int) -> bool:
+        remaining = self.remaining(chat_id)
+        return remaining is not None and remaining <= 0
+
+    def needs_warning(self, chat_id: int) -> bool:
+        """Токен истекает в пределах refresh_margin и чат еще не предупрежден (отметка ставится сразу)"""
+        remaining = self.remaining(chat_id)
+        if remaining is None or remaining <= 0 or remaining > self.refresh_margin or chat_id in self._warned:
+            return False
+        self._warned.add(chat_id)
+        return True
+
+    def was_expired(self, chat_id: int) -> bool:
+        """Токен чата был удален по истечении срока и с тех пор вход не выполнялся"""
+        return chat_id in self._expired
+
+    def expire(self, chat_id: int):
+        """Удаление истекшего токена чата с отметкой для сообщения о повторном входе"""
+        if super().pop(chat_id, None) is not None:
+            self._forget(chat_id)
+            self._remember_expired(chat_id)
+            self.evictions += 1
+
+    def _remember_expired(self, chat_id: int):
+        self._expired[chat_id] = None
+        if len(self._expired) > EXPIRED_MEMORY:
+            del self._expired[next(iter(self._expired))]
+
+    def evict_expired(self, force: bool = False) -> List[int]:
+        """Удаление всех истекших токенов с вершины кучи; возвращает их чаты"""
+        now = self._clock()
+        if not force and now < self._next_sweep:
+            return []
+        self._next_sweep = now + self.sweep_interval
+        evicted = []
+        index = self._index
+        while index and index[0][0] <= now:
+            expires_at, chat_id = heapq.heappop(index)
+            # Запись замененного или удаленного токена
+            if self._expires.get(chat_id) != expires_at:
+                continue
+            super().pop(chat_id, None)
+            self._forget(chat_id)
+            self._remember_expired(chat_id)
+            evicted.append(chat_id)
+        self.evictions += len(evicted)
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Число токенов, истекающих в пределах refresh_margin, и удаленных по сроку"""
+        deadline = self._clock() + self.refresh_margin
+        return {
+            "tokens": len(self),
+            "expiring": sum(1 for expires_at in self._expires.values() if expires_at <= deadline),
+            "evictions": self.evictions,
+            "index_size": len(self._index),
+        }
+